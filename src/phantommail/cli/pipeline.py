@@ -0,0 +1,160 @@
+"""Staged pipeline connecting async workers through bounded queues."""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+# Marks the end of the input for a single worker
+_DONE = object()
+
+
+@dataclass
+class Stage:
+    """A pipeline stage: a pool of workers fed by a bounded queue.
+
+    The handler receives an item and returns the item to pass to the next
+    stage. When the queue of the next stage is full, workers block, which
+    propagates backpressure upstream.
+    """
+
+    name: str
+    handler: Callable[[Any], Awaitable[Any]]
+    workers: int = 1
+    queue_size: int = 16
+    processed: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    queue: asyncio.Queue | None = field(default=None, repr=False)
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of items waiting for a worker of this stage."""
+        return self.queue.qsize() if self.queue is not None else 0
+
+
+class Pipeline:
+    """Run items through a sequence of stages with independent concurrency."""
+
+    def __init__(self, stages: list[Stage]):
+        """Initialize the pipeline.
+
+        Args:
+            stages: The stages in processing order.
+
+        """
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.stages = stages
+        self._started: float | None = None
+        self._finished: float | None = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the pipeline started running."""
+        if self._started is None:
+            return 0.0
+        return (self._finished or time.monotonic()) - self._started
+
+    async def run(
+        self,
+        items: Iterable[Any],
+        on_done: Callable[[Any, BaseException | None], None],
+    ) -> None:
+        """Push every item through all stages.
+
+        Args:
+            items: The input items for the first stage.
+            on_done: Called once per item with the item and None when it left
+                the last stage, or with the exception of the stage that failed.
+
+        """
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+        self._started = time.monotonic()
+        self._finished = None
+
+        workers = []
+        for position, stage in enumerate(self.stages):
+            next_stage = (
+                self.stages[position + 1] if position + 1 < len(self.stages) else None
+            )
+            remaining = [stage.workers]
+            workers.extend(
+                asyncio.create_task(self._work(stage, next_stage, remaining, on_done))
+                for _ in range(stage.workers)
+            )
+
+        tasks = [asyncio.create_task(self._feed(items)), *workers]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._finished = time.monotonic()
+
+    async def _feed(self, items: Iterable[Any]) -> None:
+        """Put the input items on the first queue, then close it."""
+        first = self.stages[0]
+        for item in items:
+            await first.queue.put(item)
+        for _ in range(first.workers):
+            await first.queue.put(_DONE)
+
+    async def _work(
+        self,
+        stage: Stage,
+        next_stage: Stage | None,
+        remaining: list[int],
+        on_done: Callable[[Any, BaseException | None], None],
+    ) -> None:
+        """Process items of one stage until the end of the input."""
+        while True:
+            item = await stage.queue.get()
+            if item is _DONE:
+                break
+
+            started = time.monotonic()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stage.failed += 1
+                on_done(item, e)
+                continue
+            finally:
+                stage.busy_seconds += time.monotonic() - started
+
+            stage.processed += 1
+            if next_stage is None:
+                on_done(result, None)
+            else:
+                await next_stage.queue.put(result)
+
+        # The last worker of a stage to finish closes the next stage
+        remaining[0] -= 1
+        if remaining[0] == 0 and next_stage is not None:
+            for _ in range(next_stage.workers):
+                await next_stage.queue.put(_DONE)
+
+    def stats(self) -> list[dict]:
+        """Return queue depth, throughput and utilisation for every stage.
+
+        Utilisation is the fraction of the elapsed time the stage's workers
+        spent handling items; the stage closest to 100% is the bottleneck.
+        """
+        elapsed = self.elapsed
+        return [
+            {
+                "name": stage.name,
+                "workers": stage.workers,
+                "queue_depth": stage.queue_depth,
+                "queue_size": stage.queue_size,
+                "processed": stage.processed,
+                "failed": stage.failed,
+                "utilisation": (
+                    stage.busy_seconds / (stage.workers * elapsed) if elapsed else 0.0
+                ),
+            }
+            for stage in self.stages
+        ]
@@ -0,0 +1,112 @@
+"""Background producer that keeps the email buffer topped up."""
+
+import asyncio
+
+from phantommail.cli.runner import SELECTABLE_TYPES
+from phantommail.graphs.graph import graph_nodes
+from phantommail.helpers.email_buffer import BufferedEmail, EmailBuffer
+from phantommail.helpers.rate_limiter import TokenBucket
+from phantommail.logger import setup_logger
+
+logger = setup_logger(__name__, level="INFO")
+
+
+class BufferProducer:
+    """Generate emails ahead of time until every type is stocked to capacity.
+
+    The type furthest below capacity is generated next, with the same graph
+    nodes and configuration as a normal run, PDF attachments included.
+    """
+
+    def __init__(
+        self,
+        buffer: EmailBuffer,
+        config: dict,
+        rate: float | None = None,
+        email_types: list[str] | None = None,
+        workers: int = 1,
+    ):
+        """Initialize the producer.
+
+        Args:
+            buffer: The buffer to fill.
+            config: The graph configuration used for generation.
+            rate: Maximum emails generated per second, or None for no limit.
+            email_types: The types to keep in stock, all selectable types by
+                default.
+            workers: Number of emails generated at once.
+
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.buffer = buffer
+        self.config = config
+        self.rate_limiter = TokenBucket(rate) if rate else None
+        self.email_types = email_types or list(SELECTABLE_TYPES)
+        self.workers = workers
+        self.produced = 0
+        self.failed = 0
+        self._pending = dict.fromkeys(self.email_types, 0)
+
+    def _next_type(self) -> str | None:
+        """Return the type furthest below capacity, None when all are full."""
+        deficits = {
+            email_type: deficit - self._pending[email_type]
+            for email_type, deficit in self.buffer.deficits(self.email_types).items()
+        }
+        email_type = max(deficits, key=deficits.get)
+        return email_type if deficits[email_type] > 0 else None
+
+    async def produce(self, email_type: str) -> BufferedEmail:
+        """Generate one email of ``email_type`` and render its attachments."""
+        state = {"email_type": email_type, "messages": []}
+        generate = getattr(graph_nodes, f"generate_{email_type}")
+        state.update(await generate(state, self.config))
+        state.update(await graph_nodes.render_attachments(state, self.config))
+        return BufferedEmail(
+            email_type=email_type,
+            subject=state["subject"],
+            body_html=state["email"],
+            attachments=state.get("attachments") or [],
+            email_attributes=state.get("email_attributes"),
+        )
+
+    async def _work(self, until_full: bool, idle_seconds: float) -> None:
+        """Fill the buffer one email at a time, see run and fill."""
+        while True:
+            email_type = self._next_type()
+            if email_type is None:
+                if until_full:
+                    return
+                await asyncio.sleep(idle_seconds)
+                continue
+
+            self._pending[email_type] += 1
+            try:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.acquire()
+                email = await self.produce(email_type)
+                await asyncio.to_thread(self.buffer.put, email)
+                self.produced += 1
+            except Exception as error:
+                self.failed += 1
+                logger.error(f"Failed to pre-generate a {email_type} email: {error}")
+                if until_full:
+                    return
+                await asyncio.sleep(idle_seconds)
+            finally:
+                self._pending[email_type] -= 1
+
+    async def fill(self) -> int:
+        """Fill every type up to capacity once and return the emails produced."""
+        produced = self.produced
+        await asyncio.gather(
+            *(self._work(True, idle_seconds=1.0) for _ in range(self.workers))
+        )
+        return self.produced - produced
+
+    async def run(self, idle_seconds: float = 5.0) -> None:
+        """Keep the buffer full until cancelled, checking it every ``idle_seconds``."""
+        await asyncio.gather(
+            *(self._work(False, idle_seconds) for _ in range(self.workers))
+        )
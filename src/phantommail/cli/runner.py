@@ -2,10 +2,28 @@
 
 import asyncio
 import random
+from dataclasses import asdict, dataclass
 
 from phantommail.cli.menu import MenuSelection
-from phantommail.graphs.graph import graph
+from phantommail.cli.pipeline import Pipeline, Stage
+from phantommail.fakers.faker_pool import faker_pool, seed_task
+from phantommail.graphs.graph import graph, graph_nodes
+from phantommail.helpers.corpus_export import CorpusExporter
+from phantommail.helpers.email_buffer import EmailBuffer
+from phantommail.helpers.html_to_pdf import shutdown_renderer
+from phantommail.helpers.pdf_cache import get_pdf_cache
+from phantommail.helpers.rate_limiter import AdaptiveLimiter, TokenBucket
+from phantommail.helpers.send_ledger import FINISHED, SendLedger
+from phantommail.llm import ModelRouter
+from phantommail.llm.batching import LLMBatcher
+from phantommail.llm.response_cache import ResponseCache
 from phantommail.logger import setup_logger
+from phantommail.transports import (
+    BatchingTransport,
+    NullSink,
+    Transport,
+    create_transport,
+)
 
 logger = setup_logger(__name__, level="INFO")
 
@@ -21,19 +39,243 @@ SELECTABLE_TYPES = [
     "random",
 ]
 
+# Stages of the pipeline mode, in processing order
+PIPELINE_STAGES = ["generate", "render", "send"]
+
+
+@dataclass
+class EmailJob:
+    """An email travelling through the pipeline stages."""
+
+    index: int
+    email_type: str
+    state: dict
+
 
 class EmailRunner:
     """Orchestrates email generation and sending with progress tracking."""
 
-    def __init__(self, sender_email: str):
+    def __init__(
+        self,
+        sender_email: str,
+        concurrency: int = 1,
+        llm_rate: float | None = None,
+        send_rate: float | None = 2.0,
+        pipeline_workers: dict[str, int] | None = None,
+        queue_size: int = 16,
+        seed: int | None = None,
+        generation_mode: str = "llm",
+        llm_backend: str | None = None,
+        stream_llm: bool = False,
+        buffer: EmailBuffer | None = None,
+        llm_cache: ResponseCache | None = None,
+        llm_batcher: LLMBatcher | None = None,
+        adaptive: bool = False,
+        llm_latency_target: float | None = None,
+        send_latency_target: float | None = None,
+        deadlines: dict[str, float] | None = None,
+        hedge_llm: bool = False,
+        transport: Transport | None = None,
+        send_batch: int | None = None,
+        ledger: SendLedger | None = None,
+        resume: str | None = None,
+        exporter: CorpusExporter | None = None,
+    ):
         """Initialize the email runner.
 
         Args:
             sender_email: The sender email address from config.
+            concurrency: Maximum number of emails generated and sent at once.
+            llm_rate: Maximum LLM calls per second, or None for no limit.
+            send_rate: Maximum sends per second, or None for no limit.
+            pipeline_workers: Worker count per pipeline stage ("generate",
+                "render", "send"). When set, emails run through the staged
+                pipeline instead of one graph invocation each.
+            queue_size: Capacity of each pipeline stage queue.
+            seed: Seed that makes the email types and the fake data of every
+                email reproducible, regardless of concurrency and of the day
+                of the run.
+            generation_mode: "llm" to write emails with the LLM, "slots" to
+                have the LLM fill only the template slots of order and customs
+                emails, or "template" to build them from faker output and the
+                example templates.
+            llm_backend: Chat model backend ("google" or "fake"), defaults
+                to the LLM_BACKEND environment variable.
+            stream_llm: Stream order and customs answers and render their PDF
+                as soon as the attachment HTML is complete.
+            buffer: Pre-generated emails to send before generating new ones,
+                see ``BufferProducer``.
+            llm_cache: Cache of LLM answers, consulted before every call.
+            llm_batcher: Groups the LLM calls of concurrent emails into
+                batches; pair it with a high ``concurrency``.
+            adaptive: Adapt the number of LLM calls and sends in flight to the
+                observed latency and rate limits, up to ``concurrency`` (or the
+                generate and send workers of the pipeline).
+            llm_latency_target: p95 LLM latency in seconds up to which the
+                adaptive limit keeps growing, None for no latency target.
+            send_latency_target: The same for sends.
+            deadlines: Seconds each stage ("generate", "render", "send") of
+                an email may take before it is cancelled and the email fails.
+            hedge_llm: Duplicate LLM calls that run past the p90 latency of
+                their route and keep the first answer.
+            transport: Delivers the emails, ``create_transport()`` by
+                default.
+            send_batch: Send emails without attachments in batch requests of
+                up to this many. The send rate then paces requests instead of
+                emails, and sends are not adaptively limited. Needs a
+                transport with a batch endpoint, i.e. Resend, and no ledger.
+            ledger: Records every email of the run and its send status, so a
+                stopped run can be resumed.
+            resume: Id of a ledger run to continue instead of starting a new
+                one: its sent and dead-lettered emails are skipped, and the
+                emails it generated are sent as they were.
+            exporter: Write the emails and their ground truth to a corpus on
+                disk instead of sending them.
 
         """
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        if resume is not None and ledger is None:
+            raise ValueError("resume needs a ledger")
+        # A batch request carries one idempotency key, not one per email
+        if send_batch and ledger is not None:
+            raise ValueError("send_batch cannot be combined with a ledger")
         self.sender_email = sender_email
-        self.config = {"configurable": {"sender": sender_email}}
+        self.concurrency = concurrency
+        self.pipeline_workers = pipeline_workers
+        self.queue_size = queue_size
+        self.seed = seed
+        self.buffer = buffer
+        self.ledger = ledger
+        self.run_id = resume
+        self.exporter = exporter
+        # Exported emails never reach a transport
+        self.transport = transport or (NullSink() if exporter else create_transport())
+        send_rate_limiter = TokenBucket(send_rate) if send_rate else None
+        # Exported emails are written one by one, batching has nothing to do
+        if send_batch and exporter is None:
+            if not hasattr(self.transport, "send_batch"):
+                raise ValueError("send_batch needs a transport with a batch endpoint")
+            self.transport = BatchingTransport(
+                self.transport, send_batch, rate_limiter=send_rate_limiter
+            )
+            send_rate_limiter = None
+        workers = pipeline_workers or {}
+        self.limiters = {}
+        if adaptive:
+            self.limiters["llm"] = AdaptiveLimiter(
+                workers.get("generate", concurrency), llm_latency_target
+            )
+            # A limit on the emails in flight would cap the batch size
+            if not send_batch:
+                self.limiters["send"] = AdaptiveLimiter(
+                    workers.get("send", concurrency), send_latency_target
+                )
+        self.config = {
+            "configurable": {
+                "sender": sender_email,
+                "llm_rate_limiter": TokenBucket(llm_rate) if llm_rate else None,
+                "send_rate_limiter": send_rate_limiter,
+                "generation_mode": generation_mode,
+                "llm_router": ModelRouter(backend=llm_backend) if llm_backend else None,
+                "stream_llm": stream_llm,
+                "llm_cache": llm_cache,
+                "llm_batcher": llm_batcher,
+                "llm_limiter": self.limiters.get("llm"),
+                "send_limiter": self.limiters.get("send"),
+                "deadlines": deadlines or {},
+                "hedge_llm": hedge_llm,
+                "mail_transport": self.transport,
+                "send_ledger": ledger,
+                "exporter": exporter,
+            }
+        }
+
+    def _plan(self, selection: MenuSelection) -> list[str]:
+        """Determine the email type of every email in the run."""
+        if selection.email_type == "all_random":
+            rng = random.Random(self.seed) if self.seed is not None else random
+            return [rng.choice(SELECTABLE_TYPES) for _ in range(selection.count)]
+        return [selection.email_type] * selection.count
+
+    def _seed_email(self, index: int) -> None:
+        """Seed the Faker data of one email when the run is seeded."""
+        if self.seed is not None:
+            seed_task(f"{self.seed}:{index}")
+
+    def _initial_state(
+        self, selection: MenuSelection, index: int, email_type: str
+    ) -> dict:
+        """Build the graph input for one email."""
+        state = {
+            "recipients": selection.recipients,
+            "email_type": email_type,
+        }
+        if self.ledger is not None:
+            state["idempotency_key"] = SendLedger.key(self.run_id, index)
+        return state
+
+    async def _open_run(self, selection: MenuSelection) -> list[tuple[int, str]]:
+        """Return the index and type of every email left to send.
+
+        With a ledger, a new run is recorded, or the resumed one is read back
+        to skip its finished emails.
+        """
+        self._stored = set()
+        if self.ledger is None:
+            return list(enumerate(self._plan(selection)))
+        if self.run_id is None:
+            plan = self._plan(selection)
+            self.run_id = await asyncio.to_thread(
+                self.ledger.start_run, asdict(selection), plan, self.seed
+            )
+            print(f"\nRecording run {self.run_id} in {self.ledger.path}")
+            return list(enumerate(plan))
+
+        run = await asyncio.to_thread(self.ledger.run, self.run_id)
+        if run is None:
+            raise ValueError(f"No run {self.run_id} in {self.ledger.path}")
+        if self.seed is None:
+            self.seed = run.seed
+        entries = await asyncio.to_thread(self.ledger.entries, self.run_id)
+        todo = [entry for entry in entries if entry.status not in FINISHED]
+        self._stored = {entry.index for entry in todo if entry.stored}
+        print(
+            f"\nResuming run {self.run_id}: {len(entries) - len(todo)} of "
+            f"{len(entries)} email(s) finished, {len(self._stored)} to send as "
+            "generated"
+        )
+        return [(entry.index, entry.email_type) for entry in todo]
+
+    async def _take_stored(self, state: dict, index: int) -> None:
+        """Fill ``state`` with the email a resumed run generated, if any."""
+        if index not in self._stored:
+            return
+        stored = await asyncio.to_thread(self.ledger.stored, state["idempotency_key"])
+        if stored is not None:
+            email, attributes = stored
+            state.update(
+                subject=email.subject,
+                email=email.body_html,
+                attachments=email.attachments or [],
+                attachment_html=[],
+                email_attributes=attributes,
+            )
+
+    async def _take_buffered(self, state: dict) -> None:
+        """Fill ``state`` with a pre-generated email of its type, if one is ready."""
+        if self.buffer is None or state.get("subject"):
+            return
+        email = await asyncio.to_thread(self.buffer.take, state["email_type"])
+        if email is not None:
+            self._buffered += 1
+            state.update(
+                subject=email.subject,
+                email=email.body_html,
+                attachments=email.attachments,
+                attachment_html=[],
+                email_attributes=email.email_attributes,
+            )
 
     async def run(self, selection: MenuSelection) -> dict:
         """Execute email sending based on menu selection.
@@ -51,44 +293,199 @@ class EmailRunner:
             "failed": 0,
             "errors": [],
         }
+        self._errors = []
+        self._done = 0
+        self._buffered = 0
 
-        print(f"\nSending {selection.count} email(s)...\n")
+        todo = await self._open_run(selection)
+        results["total"] = len(todo)
 
-        for i in range(selection.count):
-            # Determine email type for this iteration
-            if selection.email_type == "all_random":
-                email_type = random.choice(SELECTABLE_TYPES)
+        # Build the Faker instances of the common locales before generating
+        await asyncio.to_thread(faker_pool.warm)
+
+        try:
+            if self.pipeline_workers:
+                await self._run_pipeline(selection, todo, results)
             else:
-                email_type = selection.email_type
-
-            # Progress indicator
-            progress = f"[{i + 1}/{selection.count}]"
-            print(f"{progress} Generating {email_type} email...", end=" ", flush=True)
-
-            try:
-                # Invoke the graph
-                await graph.ainvoke(
-                    {
-                        "recipients": selection.recipients,
-                        "email_type": email_type,
-                    },
-                    config=self.config,
-                )
-                print("Sent!")
-                results["success"] += 1
+                await self._run_concurrent(selection, todo, results)
+        finally:
+            # Close the shared Chromium used for PDF attachments
+            await shutdown_renderer()
+            await self.transport.aclose()
+            if self.exporter is not None:
+                await self.exporter.aclose()
+            if self.ledger is not None:
+                await self.ledger.flush()
+
+        results["errors"] = [message for _, message in sorted(self._errors)]
+
+        if self.ledger is not None:
+            results["ledger"] = self.ledger.summary(self.run_id)
+
+        if self.exporter is not None:
+            results["export"] = self.exporter.summary()
+
+        if self.buffer is not None:
+            results["buffered"] = self._buffered
 
-            except Exception as e:
-                print(f"Failed: {e}")
-                results["failed"] += 1
-                results["errors"].append(f"Email {i + 1} ({email_type}): {e!s}")
-                logger.error(f"Failed to send email {i + 1}: {e}")
+        router = self.config["configurable"]["llm_router"] or graph_nodes.router
+        if router.stats:
+            results["llm_routes"] = router.summary()
+        if router.breaker_summary():
+            results["circuit_breakers"] = router.breaker_summary()
 
-            # Small delay between emails to avoid rate limiting
-            if i < selection.count - 1:
-                await asyncio.sleep(0.5)
+        batcher = self.config["configurable"]["llm_batcher"]
+        if batcher is not None and batcher.batches:
+            results["llm_batches"] = (
+                f"{batcher.calls} call(s) in {batcher.batches} batch(es)"
+            )
+
+        if self.limiters:
+            results["limits"] = {
+                name: limiter.summary() for name, limiter in self.limiters.items()
+            }
+
+        if isinstance(self.transport, BatchingTransport) and self.transport.emails:
+            results["send_batches"] = self.transport.summary()
+
+        llm_cache = self.config["configurable"]["llm_cache"]
+        if llm_cache is not None:
+            results["llm_cache"] = llm_cache.stats.summary()
+
+        cache = get_pdf_cache()
+        if cache is not None and (cache.stats.hits or cache.stats.misses):
+            results["pdf_cache"] = cache.stats.summary()
 
         return results
 
+    def _record(
+        self,
+        results: dict,
+        index: int,
+        email_type: str,
+        error: BaseException | None,
+        status: str = "",
+    ) -> None:
+        """Print progress for a finished email and update the results."""
+        self._done += 1
+        progress = f"[{self._done}/{results['total']}] Email {index + 1} ({email_type})"
+        if self.limiters:
+            limits = ", ".join(
+                f"{name} {limiter.current}" for name, limiter in self.limiters.items()
+            )
+            status += f" (limits: {limits})"
+        if error is None:
+            print(f"{progress}: {'Exported' if self.exporter else 'Sent'}!{status}")
+            results["success"] += 1
+        else:
+            print(f"{progress}: Failed: {error}{status}")
+            results["failed"] += 1
+            self._errors.append((index, f"Email {index + 1} ({email_type}): {error!s}"))
+            logger.error(f"Failed to send email {index + 1}: {error}")
+            if self.ledger is not None:
+                self.ledger.failed(SendLedger.key(self.run_id, index), error)
+
+    async def _run_concurrent(
+        self, selection: MenuSelection, todo: list[tuple[int, str]], results: dict
+    ) -> None:
+        """Run one graph invocation per email, ``concurrency`` at a time.
+
+        Pacing is left to the LLM and send rate limiters.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run_one(index: int, email_type: str) -> None:
+            async with semaphore:
+                self._seed_email(index)
+                try:
+                    state = self._initial_state(selection, index, email_type)
+                    await self._take_stored(state, index)
+                    await self._take_buffered(state)
+                    # Invoke the graph
+                    await graph.ainvoke(state, config=self.config)
+                    error = None
+                except Exception as e:
+                    error = e
+            self._record(results, index, email_type, error)
+
+        print(f"\nSending {len(todo)} email(s), {self.concurrency} at a time...\n")
+
+        await asyncio.gather(
+            *(run_one(index, email_type) for index, email_type in todo)
+        )
+
+    async def _run_pipeline(
+        self, selection: MenuSelection, todo: list[tuple[int, str]], results: dict
+    ) -> None:
+        """Run the emails through separate generate, render and send stages.
+
+        Each stage calls the same graph nodes as a graph invocation would, but
+        has its own worker pool and bounded queue so a slow stage does not
+        hold up the others.
+        """
+        handlers = {
+            "generate": self._generate_stage,
+            "render": self._render_stage,
+            "send": self._send_stage,
+        }
+        pipeline = Pipeline(
+            [
+                Stage(
+                    name,
+                    handlers[name],
+                    workers=self.pipeline_workers.get(name, 1),
+                    queue_size=self.queue_size,
+                )
+                for name in PIPELINE_STAGES
+            ]
+        )
+
+        def on_done(job: EmailJob, error: BaseException | None) -> None:
+            depths = ", ".join(
+                f"{stage.name} {stage.queue_depth}" for stage in pipeline.stages
+            )
+            self._record(
+                results, job.index, job.email_type, error, f" (queued: {depths})"
+            )
+
+        jobs = (
+            EmailJob(
+                index,
+                email_type,
+                {**self._initial_state(selection, index, email_type), "messages": []},
+            )
+            for index, email_type in todo
+        )
+
+        workers = ", ".join(
+            f"{stage.name} x{stage.workers}" for stage in pipeline.stages
+        )
+        print(f"\nSending {len(todo)} email(s) through {workers}...\n")
+
+        try:
+            await pipeline.run(jobs, on_done)
+        finally:
+            results["stages"] = pipeline.stats()
+
+    async def _generate_stage(self, job: EmailJob) -> EmailJob:
+        await self._take_stored(job.state, job.index)
+        await self._take_buffered(job.state)
+        self._seed_email(job.index)
+        route = graph_nodes.email_types(job.state, self.config)
+        if route == "buffered":
+            return job
+        generate = getattr(graph_nodes, f"generate_{route}")
+        job.state.update(await generate(job.state, self.config))
+        return job
+
+    async def _render_stage(self, job: EmailJob) -> EmailJob:
+        job.state.update(await graph_nodes.render_attachments(job.state, self.config))
+        return job
+
+    async def _send_stage(self, job: EmailJob) -> EmailJob:
+        await graph_nodes.send_email(job.state, self.config)
+        return job
+
     @staticmethod
     def print_summary(results: dict) -> None:
         """Print a summary of the sending results.
@@ -104,6 +501,43 @@ class EmailRunner:
             f"Total: {results['total']} | Success: {results['success']} | Failed: {results['failed']}"
         )
 
+        for stage in results.get("stages", []):
+            print(
+                f"Stage {stage['name']}: {stage['workers']} worker(s), "
+                f"{stage['processed']} done, {stage['failed']} failed, "
+                f"{stage['utilisation']:.0%} busy"
+            )
+
+        for route in results.get("llm_routes", []):
+            print(f"LLM {route}")
+
+        for breaker in results.get("circuit_breakers", []):
+            print(f"Circuit breaker {breaker}")
+
+        if "buffered" in results:
+            print(f"Buffer: {results['buffered']} email(s) sent from the buffer")
+
+        for name, limit in results.get("limits", {}).items():
+            print(f"Adaptive {name} limit: {limit}")
+
+        if results.get("llm_batches"):
+            print(f"LLM batches: {results['llm_batches']}")
+
+        if results.get("send_batches"):
+            print(f"Send batches: {results['send_batches']}")
+
+        if results.get("llm_cache"):
+            print(f"LLM cache: {results['llm_cache']}")
+
+        if results.get("pdf_cache"):
+            print(f"PDF cache: {results['pdf_cache']}")
+
+        if results.get("ledger"):
+            print(f"Ledger: {results['ledger']}")
+
+        if results.get("export"):
+            print(f"Export: {results['export']}")
+
         if results["errors"]:
             print("\nErrors:")
             for error in results["errors"]:
@@ -1,6 +1,4 @@
-import random
-
-from faker import Faker
+from phantommail.fakers.faker_pool import faker_pool, task_random, task_today
 
 
 class FakeComplaint:
@@ -8,7 +6,7 @@ class FakeComplaint:
 
     def __init__(self):
         """Initialize the fake complaint generator."""
-        self.faker = Faker("en_GB")
+        self.locale = "en_GB"
         self.complaint_templates = [
             "I am writing to express my deep dissatisfaction with the delivery service to {delivery_address}. The truck was supposed to arrive on {expected_date} but it's still not here.",
             "I want to file a formal complaint about the handling of my shipment from {pickup_address}. The delivery person was extremely rude and damaged my package.",
@@ -24,11 +22,13 @@ class FakeComplaint:
             dict: Contains the complaint text and sender information
 
         """
-        template = random.choice(self.complaint_templates)
-        pickup_address = self.faker.address()
-        delivery_address = self.faker.address()
-        expected_date = self.faker.date_this_month()
-        sender_name = self.faker.name()
+        template = task_random().choice(self.complaint_templates)
+        today = task_today()
+        with faker_pool.borrow(self.locale) as faker:
+            pickup_address = faker.address()
+            delivery_address = faker.address()
+            expected_date = faker.date_between_dates(today.replace(day=1), today)
+            sender_name = faker.name()
 
         complaint = template.format(
             pickup_address=pickup_address,
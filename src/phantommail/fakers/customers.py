@@ -0,0 +1,140 @@
+import csv
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from types import MappingProxyType
+
+# Faker locale and writing language for each customer country
+COUNTRY_LANGUAGES = {
+    "Netherlands": ("nl_NL", "Dutch"),
+    "United Kingdom": ("en_GB", "English"),
+    "Sweden": ("en_GB", "English"),
+    "Belgium": ("nl_BE", "Dutch"),
+    "Spain": ("es_ES", "Spanish"),
+    "Germany": ("de_DE", "German"),
+    "Poland": ("en_GB", "English"),
+    "Italy": ("en_GB", "English"),
+    "France": ("fr_FR", "French"),
+    "Austria": ("de_AT", "German"),
+    "Switzerland": ("de_CH", "German"),
+    "Portugal": ("pt_PT", "English"),
+}
+DEFAULT_LANGUAGE = ("en_GB", "English")
+
+CUSTOMERS_CSV = Path(__file__).parent.parent / "assets" / "customers.csv"
+
+
+def website_slug(company_name: str) -> str:
+    """Return the domain name used for a company's (fake) website."""
+    return company_name.lower().replace(" ", "").replace(".", "")
+
+
+@dataclass(frozen=True)
+class Customer:
+    """A customer from the customers CSV with precomputed derived fields."""
+
+    company_name: str
+    vat_number: str
+    address: str
+    city: str
+    postal_code: str
+    country: str
+    email: str
+    phone: str
+    locale: str
+    language: str
+    formatted_address: str
+    website_slug: str
+
+    @property
+    def website(self) -> str:
+        """The customer's (fake) website."""
+        return f"www.{self.website_slug}.com"
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Customer":
+        """Build a customer from a CSV row."""
+        locale, language = COUNTRY_LANGUAGES.get(row["country"], DEFAULT_LANGUAGE)
+        return cls(
+            company_name=row["company_name"],
+            vat_number=row["vat_number"],
+            address=row["address"],
+            city=row["city"],
+            postal_code=row["postal_code"],
+            country=row["country"],
+            email=row["email"],
+            phone=row["phone"],
+            locale=locale,
+            language=language,
+            formatted_address=f"{row['address']}, {row['postal_code']} {row['city']}, {row['country']}",
+            website_slug=website_slug(row["company_name"]),
+        )
+
+
+class CustomerStore:
+    """Immutable, indexed collection of customers shared by all fakers."""
+
+    def __init__(self, customers: Iterable[Customer]):
+        """Initialize the store.
+
+        Args:
+            customers: The customers to index.
+
+        """
+        self._customers = tuple(customers)
+        if not self._customers:
+            raise ValueError("A customer store needs at least one customer")
+
+        by_country: dict[str, list[Customer]] = {}
+        for customer in self._customers:
+            by_country.setdefault(customer.country, []).append(customer)
+        self._by_country = MappingProxyType(
+            {country: tuple(group) for country, group in by_country.items()}
+        )
+
+    @classmethod
+    def from_csv(cls, path: str | Path = CUSTOMERS_CSV) -> "CustomerStore":
+        """Load a store from a customers CSV file."""
+        with open(path, encoding="utf-8") as f:
+            return cls(Customer.from_row(row) for row in csv.DictReader(f))
+
+    def __len__(self) -> int:
+        """Return the number of customers."""
+        return len(self._customers)
+
+    def __iter__(self) -> Iterator[Customer]:
+        """Iterate over all customers."""
+        return iter(self._customers)
+
+    @property
+    def countries(self) -> tuple[str, ...]:
+        """The countries that have at least one customer."""
+        return tuple(self._by_country)
+
+    def by_country(self, country: str) -> tuple[Customer, ...]:
+        """Return the customers located in ``country``."""
+        return self._by_country.get(country, ())
+
+    def random(self, country: str | None = None) -> Customer:
+        """Pick a random customer, optionally restricted to one country.
+
+        The pick is drawn from the task random source, see ``seed_task``.
+        """
+        # faker_pool imports this module for its locales
+        from phantommail.fakers.faker_pool import task_random
+
+        customers = self._customers if country is None else self.by_country(country)
+        if not customers:
+            raise KeyError(f"No customers in {country}")
+        return task_random().choice(customers)
+
+
+@cache
+def get_customer_store() -> CustomerStore:
+    """Return the process-wide customer store, loading the CSV on first use.
+
+    The store is loaded once and shared by all fakers, so creating a faker per
+    email does not read the CSV again.
+    """
+    return CustomerStore.from_csv()
@@ -1,10 +1,9 @@
-import csv
-import random
-from datetime import datetime
-from pathlib import Path
+from datetime import date
 
 from faker import Faker
 
+from phantommail.fakers.customers import get_customer_store
+from phantommail.fakers.faker_pool import faker_pool, task_now, task_random, task_today
 from phantommail.models.customs_document import (
     CustomsDeclaration,
     ItemDetail,
@@ -18,57 +17,53 @@ from phantommail.models.goods import Goods
 class DeclarationGenerator:
     """Generate a fake customs declaration."""
 
-    def __init__(self):
-        """Initialize the declaration generator."""
-        self.faker = Faker()
-
     def _generate_client(self) -> Party:
         """Generate a fake party."""
-        # Select a random customer from the CSV
-
-        # Load customers from CSV
-        self.customers = []
-        csv_path = Path(__file__).parent.parent / "assets" / "customers.csv"
-        with open(csv_path, encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            self.customers = list(reader)
-        customer = random.choice(self.customers)
+        # Select a random customer from the shared customer store
+        customer = get_customer_store().random()
 
         return Party(
-            name=customer["company_name"],
-            address=f"{customer['address']}, {customer['postal_code']} {customer['city']}, {customer['country']}",
-            eori_number=customer["vat_number"],  # Using VAT number as EORI for now
+            name=customer.company_name,
+            address=customer.formatted_address,
+            eori_number=customer.vat_number,  # Using VAT number as EORI for now
         )
 
-    def _generate_transport_info(self) -> TransportInfo:
+    def _generate_transport_info(self, faker: Faker) -> TransportInfo:
         """Generate fake transport information."""
         return TransportInfo(
-            arrival_transport=self.faker.license_plate(),
-            border_transport=self.faker.license_plate(),
-            transport_mode=random.randint(1, 9),
-            place_of_loading=self.faker.city(),
+            arrival_transport=faker.license_plate(),
+            border_transport=faker.license_plate(),
+            transport_mode=task_random().randint(1, 9),
+            place_of_loading=faker.city(),
         )
 
-    def _generate_item_detail(self, goods: Goods, item_number: int) -> ItemDetail:
+    def _generate_item_detail(
+        self, goods: Goods, item_number: int, faker: Faker
+    ) -> ItemDetail:
         """Generate a fake item detail based on a goods object."""
         return ItemDetail(
             item_number=item_number,
             packages=goods.quantity,
-            shipping_marks=self.faker.bothify(text="??-####"),
-            commodity_code=self.faker.numerify(text="########"),
+            shipping_marks=faker.bothify(text="??-####"),
+            commodity_code=faker.numerify(text="########"),
             description_of_goods=goods.description,
             gross_mass_kg=goods.weight,
             net_mass_kg=goods.weight * 0.95,  # Assuming packaging is 5% of weight
         )
 
+    def _generate_date(self, faker: Faker) -> date:
+        """Generate a fake date up to today."""
+        return faker.date_between_dates(date(1970, 1, 1), task_today())
+
     def _generate_tax_line(self) -> TaxLine:
         """Generate a fake tax line."""
-        tax_base = round(random.uniform(100, 10000), 2)
-        tax_rate = random.choice([0, 5, 10, 15, 20])
+        rng = task_random()
+        tax_base = round(rng.uniform(100, 10000), 2)
+        tax_rate = rng.choice([0, 5, 10, 15, 20])
         total_tax = round(tax_base * (tax_rate / 100), 2)
 
         return TaxLine(
-            tax_type=random.choice(["A00", "B00"]),  # A00 = Customs duties, B00 = VAT
+            tax_type=rng.choice(["A00", "B00"]),  # A00 = Customs duties, B00 = VAT
             tax_base=tax_base,
             tax_rate=tax_rate,
             total_tax_assessed=total_tax,
@@ -77,35 +72,37 @@ class DeclarationGenerator:
 
     def generate_declaration(self) -> CustomsDeclaration:
         """Generate a fake customs declaration."""
+        rng = task_random()
         # Generate a random goods item
-        goods = Goods.random()
+        goods = Goods.random(rng)
 
         # Generate tax lines
-        tax_lines = [self._generate_tax_line() for _ in range(random.randint(1, 3))]
+        tax_lines = [self._generate_tax_line() for _ in range(rng.randint(1, 3))]
 
-        return CustomsDeclaration(
-            mrn=f"GB{self.faker.numerify('#' * 16)}",
-            declaration_type=random.choice(["IM", "EX", "CO"]),
-            reference_number=self.faker.bothify(text="??####"),
-            forms_count=1,
-            items_count=1,
-            total_packages=goods.quantity,
-            # Parties
-            exporter=self._generate_client(),
-            importer=self._generate_client(),
-            declarant=self._generate_client(),
-            representative=self._generate_client(),
-            buyer=self._generate_client(),
-            # Transport details
-            transport_info=self._generate_transport_info(),
-            # Items
-            items=[self._generate_item_detail(goods, 1)],
-            # Valuation & taxes
-            invoice_currency=random.choice(["GBP", "EUR", "USD"]),
-            invoice_value=round(random.uniform(1000, 100000), 2),
-            tax_lines=tax_lines,
-            # Acceptance & signature
-            acceptance_date_time=datetime.now().isoformat(),
-            declaration_status="ACCEPTED",
-            place_and_date=f"{self.faker.city()}, {self.faker.date()}",
-        )
+        with faker_pool.borrow("en_GB") as faker:
+            return CustomsDeclaration(
+                mrn=f"GB{faker.numerify('#' * 16)}",
+                declaration_type=rng.choice(["IM", "EX", "CO"]),
+                reference_number=faker.bothify(text="??####"),
+                forms_count=1,
+                items_count=1,
+                total_packages=goods.quantity,
+                # Parties
+                exporter=self._generate_client(),
+                importer=self._generate_client(),
+                declarant=self._generate_client(),
+                representative=self._generate_client(),
+                buyer=self._generate_client(),
+                # Transport details
+                transport_info=self._generate_transport_info(faker),
+                # Items
+                items=[self._generate_item_detail(goods, 1, faker)],
+                # Valuation & taxes
+                invoice_currency=rng.choice(["GBP", "EUR", "USD"]),
+                invoice_value=round(rng.uniform(1000, 100000), 2),
+                tax_lines=tax_lines,
+                # Acceptance & signature
+                acceptance_date_time=task_now().isoformat(),
+                declaration_status="ACCEPTED",
+                place_and_date=f"{faker.city()}, {self._generate_date(faker)}",
+            )
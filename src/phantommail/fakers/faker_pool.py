@@ -0,0 +1,97 @@
+import random
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, datetime
+
+from faker import Faker
+
+from phantommail.fakers.customers import COUNTRY_LANGUAGES
+
+# Locales used by the fakers, warmed up front by ``FakerPool.warm``
+COMMON_LOCALES = sorted({locale for locale, _ in COUNTRY_LANGUAGES.values()})
+
+# Clock of seeded tasks, so dates relative to today do not change between runs
+SEEDED_NOW = datetime(2025, 1, 6, 9, 0)
+
+# Per-task random source used by the fakers and to seed borrowed Faker instances
+_task_rng: ContextVar[random.Random | None] = ContextVar("faker_task_rng", default=None)
+
+
+def seed_task(seed: int | str | None) -> None:
+    """Make fake data in the current asyncio task or thread reproducible.
+
+    Every instance borrowed afterwards in the same context is seeded from a
+    random source derived from ``seed``, which the fakers also draw their own
+    choices from, and the current time is ``SEEDED_NOW``. The values drawn
+    then depend only on the seed and the order of draws within the task, not
+    on other tasks running concurrently or on the day of the run. Pass None
+    to go back to unseeded output.
+    """
+    _task_rng.set(random.Random(seed) if seed is not None else None)
+
+
+def task_random() -> random.Random:
+    """Return the random source of the current task, see ``seed_task``.
+
+    This is the global random module when the task is not seeded.
+    """
+    return _task_rng.get() or random
+
+
+def task_now() -> datetime:
+    """Return the current time, ``SEEDED_NOW`` in a seeded task."""
+    return SEEDED_NOW if _task_rng.get() is not None else datetime.now()
+
+
+def task_today() -> date:
+    """Return the current date, that of ``SEEDED_NOW`` in a seeded task."""
+    return task_now().date()
+
+
+class FakerPool:
+    """Process-wide pool of warmed Faker instances per locale.
+
+    Instances are handed out exclusively through ``borrow`` and returned
+    afterwards, so concurrent asyncio tasks and worker threads never share an
+    instance while using it.
+    """
+
+    def __init__(self):
+        """Initialize an empty pool."""
+        self._idle: dict[str, list[Faker]] = {}
+        self._lock = threading.Lock()
+
+    def warm(self, locales: Iterable[str] = COMMON_LOCALES, size: int = 1) -> None:
+        """Create ``size`` idle instances for each locale ahead of time."""
+        for locale in locales:
+            with self._lock:
+                missing = size - len(self._idle.get(locale, []))
+            fakers = [Faker(locale) for _ in range(missing)]
+            with self._lock:
+                self._idle.setdefault(locale, []).extend(fakers)
+
+    @contextmanager
+    def borrow(self, locale: str) -> Iterator[Faker]:
+        """Check out a Faker instance for ``locale``.
+
+        The instance is reseeded on every checkout, from the task seed set by
+        ``seed_task`` when there is one and from the global random module
+        otherwise.
+        """
+        with self._lock:
+            idle = self._idle.get(locale)
+            faker = idle.pop() if idle else None
+        if faker is None:
+            faker = Faker(locale)
+
+        faker.seed_instance(task_random().getrandbits(64))
+        try:
+            yield faker
+        finally:
+            with self._lock:
+                self._idle.setdefault(locale, []).append(faker)
+
+
+faker_pool = FakerPool()
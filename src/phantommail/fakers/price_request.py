@@ -1,9 +1,7 @@
-import csv
-import random
-from datetime import date, timedelta
-from pathlib import Path
+from datetime import timedelta
 
-from faker import Faker
+from phantommail.fakers.customers import get_customer_store
+from phantommail.fakers.faker_pool import faker_pool, task_random, task_today
 
 
 class PriceRequestGenerator:
@@ -11,27 +9,7 @@ class PriceRequestGenerator:
 
     def __init__(self):
         """Initialize the price request generator."""
-        self.languages = {
-            "Netherlands": ("nl_NL", "Dutch"),
-            "United Kingdom": ("en_GB", "English"),
-            "Sweden": ("en_GB", "English"),
-            "Belgium": ("nl_BE", "Dutch"),
-            "Spain": ("es_ES", "Spanish"),
-            "Germany": ("de_DE", "German"),
-            "Poland": ("en_GB", "English"),
-            "Italy": ("en_GB", "English"),
-            "France": ("fr_FR", "French"),
-            "Austria": ("de_AT", "German"),
-            "Switzerland": ("de_CH", "German"),
-            "Portugal": ("pt_PT", "English"),
-        }
-
-        # Load customers from CSV
-        self.customers = []
-        csv_path = Path(__file__).parent.parent / "assets" / "customers.csv"
-        with open(csv_path, encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            self.customers = list(reader)
+        self.customers = get_customer_store()
 
         # Transport titles by language
         self.titles = {
@@ -108,30 +86,31 @@ class PriceRequestGenerator:
 
         """
         # Select a random customer
-        customer = random.choice(self.customers)
+        customer = self.customers.random()
+        rng = task_random()
 
         # Get language info based on customer country
-        locale, language = self.languages.get(customer["country"], ("en_GB", "English"))
-        faker = Faker(locale)
+        locale, language = customer.locale, customer.language
+        with faker_pool.borrow(locale) as faker:
+            # Generate sender details
+            sender_name = faker.name()
 
-        # Generate sender details
-        sender_name = faker.name()
-        title = random.choice(self.titles[language])
+            # Generate route details
+            origin_city = faker.city()
+            destination_city = faker.city()
 
-        # Generate route details
-        origin_city = faker.city()
-        destination_city = faker.city()
+        title = rng.choice(self.titles[language])
 
         # Generate price details
-        base_price = random.randint(1500, 4000)
-        proposed_price = base_price + random.randint(100, 500)
-        budget_price = base_price - random.randint(100, 400)
+        base_price = rng.randint(1500, 4000)
+        proposed_price = base_price + rng.randint(100, 500)
+        budget_price = base_price - rng.randint(100, 400)
 
         # Generate transport date
-        transport_date = date.today() + timedelta(days=random.randint(7, 30))
+        transport_date = task_today() + timedelta(days=rng.randint(7, 30))
 
         # Select and format price message
-        template = random.choice(self.price_templates[language])
+        template = rng.choice(self.price_templates[language])
         price_message = template.format(
             proposed_price=proposed_price,
             budget_price=budget_price,
@@ -140,7 +119,7 @@ class PriceRequestGenerator:
         )
 
         # Select closing
-        closing = random.choice(self.closings[language])
+        closing = rng.choice(self.closings[language])
 
         # Build signature block
         if language == "German":
@@ -150,37 +129,37 @@ i.A. {sender_name}
 
 {title}
 
-Standort {customer["city"]}
+Standort {customer.city}
 
 
-Telefon {customer["phone"]}
-{customer["email"]}
-www.{customer["company_name"].lower().replace(" ", "").replace(".", "")}.com
+Telefon {customer.phone}
+{customer.email}
+{customer.website}
 
-{customer["company_name"]}
-{customer["address"]}  |  {customer["postal_code"]} {customer["city"]}
+{customer.company_name}
+{customer.address}  |  {customer.postal_code} {customer.city}
 
-USt.-Ident. {customer["vat_number"]}"""
+USt.-Ident. {customer.vat_number}"""
         else:
             signature = f"""{closing}
 
 {sender_name}
 {title}
 
-{customer["company_name"]}
-{customer["address"]}
-{customer["postal_code"]} {customer["city"]}
-{customer["country"]}
+{customer.company_name}
+{customer.address}
+{customer.postal_code} {customer.city}
+{customer.country}
 
-Phone: {customer["phone"]}
-Email: {customer["email"]}
-VAT: {customer["vat_number"]}"""
+Phone: {customer.phone}
+Email: {customer.email}
+VAT: {customer.vat_number}"""
 
         return {
             "price_message": price_message,
             "sender_name": sender_name,
             "sender_title": title,
-            "company": customer["company_name"],
+            "company": customer.company_name,
             "language": language,
             "origin": origin_city,
             "destination": destination_city,
@@ -1,6 +1,4 @@
-import random
-
-from faker import Faker
+from phantommail.fakers.faker_pool import faker_pool, task_random
 
 
 class TransportQuestionGenerator:
@@ -9,7 +7,7 @@ class TransportQuestionGenerator:
     def __init__(self):
         """Initialize the transport question generator."""
         # Using a single locale for simplicity, you can add more locales if needed.
-        self.faker = Faker("en_GB")
+        self.locale = "en_GB"
         self.question_templates = [
             "What is the scheduled pickup time at {pickup_address}?",
             "When will the goods be delivered to {delivery_address}?",
@@ -25,14 +23,15 @@ class TransportQuestionGenerator:
             dict: Contains the question text and sender information
 
         """
-        template = random.choice(self.question_templates)
+        template = task_random().choice(self.question_templates)
         # Generate fake details to populate the question
-        pickup_address = self.faker.address()
-        delivery_address = self.faker.address()
-        pickup_city = self.faker.city()
-        delivery_city = self.faker.city()
-        pickup_company = self.faker.company()
-        sender_name = self.faker.name()
+        with faker_pool.borrow(self.locale) as faker:
+            pickup_address = faker.address()
+            delivery_address = faker.address()
+            pickup_city = faker.city()
+            delivery_city = faker.city()
+            pickup_company = faker.company()
+            sender_name = faker.name()
 
         question = template.format(
             pickup_address=pickup_address,
@@ -1,9 +1,7 @@
-import csv
-import random
-from datetime import date, timedelta
-from pathlib import Path
+from datetime import timedelta
 
-from faker import Faker
+from phantommail.fakers.customers import get_customer_store
+from phantommail.fakers.faker_pool import faker_pool, task_random, task_today
 
 
 class RandomPromotionalGenerator:
@@ -11,27 +9,7 @@ class RandomPromotionalGenerator:
 
     def __init__(self):
         """Initialize the random promotional generator."""
-        self.languages = {
-            "Netherlands": ("nl_NL", "Dutch"),
-            "United Kingdom": ("en_GB", "English"),
-            "Sweden": ("en_GB", "English"),
-            "Belgium": ("nl_BE", "Dutch"),
-            "Spain": ("es_ES", "Spanish"),
-            "Germany": ("de_DE", "German"),
-            "Poland": ("en_GB", "English"),
-            "Italy": ("en_GB", "English"),
-            "France": ("fr_FR", "French"),
-            "Austria": ("de_AT", "German"),
-            "Switzerland": ("de_CH", "German"),
-            "Portugal": ("pt_PT", "English"),
-        }
-
-        # Load customers from CSV
-        self.customers = []
-        csv_path = Path(__file__).parent.parent / "assets" / "customers.csv"
-        with open(csv_path, encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            self.customers = list(reader)
+        self.customers = get_customer_store()
 
         # Promotional themes by language
         self.promo_themes = {
@@ -183,31 +161,32 @@ class RandomPromotionalGenerator:
 
         """
         # Select a random customer
-        customer = random.choice(self.customers)
+        customer = self.customers.random()
+        rng = task_random()
 
         # Get language info based on customer country
-        locale, language = self.languages.get(customer["country"], ("en_GB", "English"))
-        faker = Faker(locale)
+        locale, language = customer.locale, customer.language
 
         # Select promotional theme
         promo_themes = self.promo_themes.get(language, self.promo_themes["English"])
-        promo = random.choice(promo_themes)
+        promo = rng.choice(promo_themes)
 
         # Generate discount if needed
-        discount = random.randint(10, 30)
+        discount = rng.randint(10, 30)
         promo_content = promo["content"].format(discount=discount)
         promo_benefit = promo["benefit"].format(discount=discount)
 
         # Generate validity period
-        start_date = date.today()
-        end_date = start_date + timedelta(days=random.randint(14, 30))
+        start_date = task_today()
+        end_date = start_date + timedelta(days=rng.randint(14, 30))
 
         # Generate sender details
-        sender_name = faker.name()
-        title = random.choice(self.titles.get(language, self.titles["English"]))
+        with faker_pool.borrow(locale) as faker:
+            sender_name = faker.name()
+        title = rng.choice(self.titles.get(language, self.titles["English"]))
 
         # Select closing
-        closing = random.choice(self.closings.get(language, self.closings["English"]))
+        closing = rng.choice(self.closings.get(language, self.closings["English"]))
 
         # Build signature
         signature = f"""{closing}
@@ -215,14 +194,14 @@ class RandomPromotionalGenerator:
 {sender_name}
 {title}
 
-{customer["company_name"]}
-{customer["address"]}
-{customer["postal_code"]} {customer["city"]}
-{customer["country"]}
+{customer.company_name}
+{customer.address}
+{customer.postal_code} {customer.city}
+{customer.country}
 
-Phone: {customer["phone"]}
-Email: {customer["email"]}
-Web: www.{customer["company_name"].lower().replace(" ", "").replace(".", "")}.com"""
+Phone: {customer.phone}
+Email: {customer.email}
+Web: {customer.website}"""
 
         # Format validity text by language
         validity_text = {
@@ -241,7 +220,7 @@ Web: www.{customer["company_name"].lower().replace(" ", "").replace(".", "")}.co
             "validity": validity_text.get(language, validity_text["English"]),
             "sender_name": sender_name,
             "sender_title": title,
-            "company": customer["company_name"],
+            "company": customer.company_name,
             "language": language,
             "signature": signature,
             "closing": closing,
@@ -1,11 +1,10 @@
-import csv
-import random
-from datetime import date, timedelta
-from pathlib import Path
+from datetime import timedelta
 from typing import List
 
 from faker import Faker
 
+from phantommail.fakers.customers import get_customer_store
+from phantommail.fakers.faker_pool import faker_pool, task_random, task_today
 from phantommail.models.goods import Goods
 from phantommail.models.transport import Address, Client, TransportOrder
 
@@ -26,33 +25,30 @@ class TransportOrderGenerator:
             "United Kingdom": "en_GB",
             "Portugal": "pt_PT",
         }
-        # Initialize Faker instances
-        self.fake_pickup = Faker(random.choice(list(self.european_countries.values())))
-        self.fake_delivery = Faker("en_GB")
-
-        # Load customers from CSV
-        self.customers = []
-        csv_path = Path(__file__).parent.parent / "assets" / "customers.csv"
-        with open(csv_path, encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            self.customers = list(reader)
-
-    def generate_client(self) -> Client:
+        # Locales of the Faker instances borrowed per order
+        self.pickup_locale = task_random().choice(
+            list(self.european_countries.values())
+        )
+        self.delivery_locale = "en_GB"
+
+        self.customers = get_customer_store()
+
+    def generate_client(self, faker_instance: Faker) -> Client:
         """Generate a fake client."""
         # Select a random customer from the CSV
-        customer = random.choice(self.customers)
+        customer = self.customers.random()
 
         return Client(
-            name=customer["company_name"],
-            sender_name=self.fake_pickup.name(),  # Generate a random contact person
-            company=customer["company_name"],
-            vat_number=customer["vat_number"],
-            address=customer["address"],
-            city=customer["city"],
-            postal_code=customer["postal_code"],
-            country=customer["country"],
-            email=customer["email"],
-            phone=customer["phone"],
+            name=customer.company_name,
+            sender_name=faker_instance.name(),  # Generate a random contact person
+            company=customer.company_name,
+            vat_number=customer.vat_number,
+            address=customer.address,
+            city=customer.city,
+            postal_code=customer.postal_code,
+            country=customer.country,
+            email=customer.email,
+            phone=customer.phone,
         )
 
     def generate_address(self, faker_instance: Faker) -> Address:
@@ -69,27 +65,32 @@ class TransportOrderGenerator:
 
     def generate(self) -> TransportOrder:
         """Generate a fake transport order."""
-        client = self.generate_client()
-        pickup_address = self.generate_address(self.fake_pickup)
-        delivery_address = self.generate_address(self.fake_delivery)
-
-        loading_stops = self.generate_stops(random.randint(0, 1), self.fake_pickup)
-        unloading_stops = self.generate_stops(random.randint(0, 1), self.fake_delivery)
+        rng = task_random()
+        with (
+            faker_pool.borrow(self.pickup_locale) as fake_pickup,
+            faker_pool.borrow(self.delivery_locale) as fake_delivery,
+        ):
+            client = self.generate_client(fake_pickup)
+            pickup_address = self.generate_address(fake_pickup)
+            delivery_address = self.generate_address(fake_delivery)
+
+            loading_stops = self.generate_stops(rng.randint(0, 1), fake_pickup)
+            unloading_stops = self.generate_stops(rng.randint(0, 1), fake_delivery)
 
         # Generate loading date between tomorrow and 10 days from now
-        tomorrow = date.today() + timedelta(days=1)
-        loading_date = tomorrow + timedelta(days=random.randint(0, 9))
+        tomorrow = task_today() + timedelta(days=1)
+        loading_date = tomorrow + timedelta(days=rng.randint(0, 9))
 
         # Generate unloading date at least 1 day after loading, up to 5 days later
-        unloading_date = loading_date + timedelta(days=random.randint(1, 5))
+        unloading_date = loading_date + timedelta(days=rng.randint(1, 5))
 
         # Generate loading metres and pallet count
-        loading_metres = random.randint(3, 12)  # Random metres between 3 and 12
-        pallet_count = random.randint(1, 5)  # Random pallet count between 1 and 5
+        loading_metres = rng.randint(3, 12)  # Random metres between 3 and 12
+        pallet_count = rng.randint(1, 5)  # Random pallet count between 1 and 5
 
         return TransportOrder(
             client=client,
-            goods=Goods.random(),
+            goods=Goods.random(rng),
             pickup_address=pickup_address,
             delivery_address=delivery_address,
             intermediate_loading_stops=loading_stops,
@@ -1,8 +1,5 @@
-import csv
-import random
-from pathlib import Path
-
-from faker import Faker
+from phantommail.fakers.customers import get_customer_store
+from phantommail.fakers.faker_pool import faker_pool, task_random
 
 
 class UpdateOrderGenerator:
@@ -10,27 +7,7 @@ class UpdateOrderGenerator:
 
     def __init__(self):
         """Initialize the update order generator."""
-        self.languages = {
-            "Netherlands": ("nl_NL", "Dutch"),
-            "United Kingdom": ("en_GB", "English"),
-            "Sweden": ("en_GB", "English"),
-            "Belgium": ("nl_BE", "Dutch"),
-            "Spain": ("es_ES", "Spanish"),
-            "Germany": ("de_DE", "German"),
-            "Poland": ("en_GB", "English"),
-            "Italy": ("en_GB", "English"),
-            "France": ("fr_FR", "French"),
-            "Austria": ("de_AT", "German"),
-            "Switzerland": ("de_CH", "German"),
-            "Portugal": ("pt_PT", "English"),
-        }
-
-        # Load customers from CSV
-        self.customers = []
-        csv_path = Path(__file__).parent.parent / "assets" / "customers.csv"
-        with open(csv_path, encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            self.customers = list(reader)
+        self.customers = get_customer_store()
 
         # Update questions by language
         self.question_templates = {
@@ -131,23 +108,23 @@ class UpdateOrderGenerator:
 
         """
         # Select a random customer
-        customer = random.choice(self.customers)
+        customer = self.customers.random()
+        rng = task_random()
 
         # Get language info based on customer country
-        locale, language = self.languages.get(customer["country"], ("en_GB", "English"))
-        faker = Faker(locale)
-
+        locale, language = customer.locale, customer.language
         # Generate sender details
-        sender_name = faker.name()
-        title = random.choice(self.titles[language])
+        with faker_pool.borrow(locale) as faker:
+            sender_name = faker.name()
+        title = rng.choice(self.titles[language])
 
         # Generate reference numbers
-        order_ref = f"{random.randint(20250000, 20259999)}/{random.randint(1, 99):02d}"
-        tracking_ref = f"VTR{random.randint(100000, 999999)}"
+        order_ref = f"{rng.randint(20250000, 20259999)}/{rng.randint(1, 99):02d}"
+        tracking_ref = f"VTR{rng.randint(100000, 999999)}"
 
         # Select greeting and question
-        greeting = random.choice(self.greetings[language])
-        question = random.choice(self.question_templates[language])
+        greeting = rng.choice(self.greetings[language])
+        question = rng.choice(self.question_templates[language])
 
         # Get closing signature
         closing = self.closing_signatures[language]
@@ -171,16 +148,16 @@ class UpdateOrderGenerator:
 
 {name_line}
 
-Telefon: {customer["phone"]}
-E-Mail: {customer["email"]}
+Telefon: {customer.phone}
+E-Mail: {customer.email}
 
-{customer["company_name"]} | {customer["address"]} | {customer["postal_code"]} {customer["city"]} | {customer["country"]}"""
+{customer.company_name} | {customer.address} | {customer.postal_code} {customer.city} | {customer.country}"""
 
         # Add additional company info for German companies
         if language == "German":
             signature += f"""
 
-USt.-Id Nr.: {customer["vat_number"]}"""
+USt.-Id Nr.: {customer.vat_number}"""
 
         # Format the complete message
         formatted_message = f"""{greeting},
@@ -194,7 +171,7 @@ USt.-Id Nr.: {customer["vat_number"]}"""
             "question": question,
             "sender_name": sender_name,
             "sender_title": title,
-            "company": customer["company_name"],
+            "company": customer.company_name,
             "language": language,
             "order_ref": order_ref,
             "tracking_ref": tracking_ref,
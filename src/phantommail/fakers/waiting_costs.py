@@ -1,9 +1,7 @@
-import csv
-import random
-from datetime import date, timedelta
-from pathlib import Path
+from datetime import timedelta
 
-from faker import Faker
+from phantommail.fakers.customers import get_customer_store
+from phantommail.fakers.faker_pool import faker_pool, task_random, task_today
 
 
 class WaitingCostsGenerator:
@@ -11,27 +9,7 @@ class WaitingCostsGenerator:
 
     def __init__(self):
         """Initialize the waiting costs generator."""
-        self.languages = {
-            "Netherlands": ("nl_NL", "Dutch"),
-            "United Kingdom": ("en_GB", "English"),
-            "Sweden": ("en_GB", "English"),
-            "Belgium": ("nl_BE", "Dutch"),
-            "Spain": ("es_ES", "Spanish"),
-            "Germany": ("de_DE", "German"),
-            "Poland": ("en_GB", "English"),
-            "Italy": ("en_GB", "English"),
-            "France": ("fr_FR", "French"),
-            "Austria": ("de_AT", "German"),
-            "Switzerland": ("de_CH", "German"),
-            "Portugal": ("pt_PT", "English"),
-        }
-
-        # Load customers from CSV
-        self.customers = []
-        csv_path = Path(__file__).parent.parent / "assets" / "customers.csv"
-        with open(csv_path, encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            self.customers = list(reader)
+        self.customers = get_customer_store()
 
         # Waiting reasons
         self.waiting_reasons = {
@@ -143,35 +121,37 @@ class WaitingCostsGenerator:
 
         """
         # Select a random customer
-        customer = random.choice(self.customers)
+        customer = self.customers.random()
+        rng = task_random()
 
         # Get language info based on customer country
-        locale, language = self.languages.get(customer["country"], ("en_GB", "English"))
-        faker = Faker(locale)
+        locale, language = customer.locale, customer.language
+        with faker_pool.borrow(locale) as faker:
+            # Generate scenario details
+            delivery_city = faker.city()
+            destination_company = faker.company()
+
+            # Generate sender details for the dispute
+            sender_name = faker.name()
 
-        # Generate scenario details
-        delivery_city = faker.city()
-        destination_company = faker.company()
-        delivery_date = date.today() - timedelta(days=random.randint(1, 7))
+        delivery_date = task_today() - timedelta(days=rng.randint(1, 7))
 
         # Generate reference numbers
-        order_ref = f"{random.randint(20250000, 20259999)}/{random.randint(1, 99):02d}"
-        delivery_ref = str(random.randint(50000000, 59999999))
-        internal_ref = str(random.randint(700000, 799999))
-        tracking_ref = f"VTR{random.randint(100000, 999999)}"
+        order_ref = f"{rng.randint(20250000, 20259999)}/{rng.randint(1, 99):02d}"
+        delivery_ref = str(rng.randint(50000000, 59999999))
+        internal_ref = str(rng.randint(700000, 799999))
+        tracking_ref = f"VTR{rng.randint(100000, 999999)}"
 
         # Generate waiting details
-        waiting_hours = random.randint(3, 8)
-        cost_per_hour = random.randint(50, 75)
+        waiting_hours = rng.randint(3, 8)
+        cost_per_hour = rng.randint(50, 75)
         total_cost = waiting_hours * cost_per_hour
 
         # Select waiting reason
-        waiting_reason = random.choice(
+        waiting_reason = rng.choice(
             self.waiting_reasons.get(language, self.waiting_reasons["English"])
         )
 
-        # Generate sender details for the dispute
-        sender_name = faker.name()
         titles = {
             "English": [
                 "Logistics Manager",
@@ -191,16 +171,16 @@ class WaitingCostsGenerator:
                 "Responsable Supply Chain",
             ],
         }
-        sender_title = random.choice(titles.get(language, titles["English"]))
+        sender_title = rng.choice(titles.get(language, titles["English"]))
 
         # Select dispute message
-        dispute_template = random.choice(self.dispute_templates[language])
+        dispute_template = rng.choice(self.dispute_templates[language])
         dispute_message = dispute_template.format(
             destination_company=destination_company
         )
 
         # Select closing
-        closing_message = random.choice(self.closings[language])
+        closing_message = rng.choice(self.closings[language])
 
         # Build signature
         if language == "English":
@@ -221,13 +201,13 @@ class WaitingCostsGenerator:
 {sender_name}
 {sender_title}
 
-{customer["company_name"]}
-{customer["address"]}
-{customer["postal_code"]} {customer["city"]}
-{customer["country"]}
+{customer.company_name}
+{customer.address}
+{customer.postal_code} {customer.city}
+{customer.country}
 
-Phone: {customer["phone"]}
-Email: {customer["email"]}"""
+Phone: {customer.phone}
+Email: {customer.email}"""
 
         # Format the complete dispute message
         formatted_message = f"""{dispute_message}
@@ -253,7 +233,7 @@ Email: {customer["email"]}"""
             "closing_message": closing_message,
             "sender_name": sender_name,
             "sender_title": sender_title,
-            "company": customer["company_name"],
+            "company": customer.company_name,
             "language": language,
             "signature": signature,
             "formatted_message": formatted_message,
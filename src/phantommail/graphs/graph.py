@@ -1,10 +1,17 @@
-from typing import TypedDict
+from typing import Literal, NotRequired, TypedDict
 
 from dotenv import load_dotenv
 from langgraph.graph import END, START, StateGraph
 
 from phantommail.graphs.nodes import GraphNodes
 from phantommail.graphs.state import FakeEmailState
+from phantommail.helpers.corpus_export import CorpusExporter
+from phantommail.helpers.rate_limiter import AdaptiveLimiter, TokenBucket
+from phantommail.helpers.send_ledger import SendLedger
+from phantommail.llm import ChatModel, ModelRouter
+from phantommail.llm.batching import LLMBatcher
+from phantommail.llm.response_cache import ResponseCache
+from phantommail.transports import Transport
 
 # Load environment variables before initializing nodes
 load_dotenv()
@@ -12,6 +19,21 @@ load_dotenv()
 
 class ConfigSchema(TypedDict):
     sender: str
+    llm_rate_limiter: NotRequired[TokenBucket | None]
+    send_rate_limiter: NotRequired[TokenBucket | None]
+    llm_limiter: NotRequired[AdaptiveLimiter | None]
+    send_limiter: NotRequired[AdaptiveLimiter | None]
+    generation_mode: NotRequired[Literal["llm", "slots", "template"]]
+    llm: NotRequired[ChatModel | None]
+    llm_router: NotRequired[ModelRouter | None]
+    stream_llm: NotRequired[bool]
+    llm_cache: NotRequired[ResponseCache | None]
+    llm_batcher: NotRequired[LLMBatcher | None]
+    deadlines: NotRequired[dict[str, float]]
+    hedge_llm: NotRequired[bool]
+    mail_transport: NotRequired[Transport | None]
+    send_ledger: NotRequired[SendLedger | None]
+    exporter: NotRequired[CorpusExporter | None]
 
 
 graph_nodes = GraphNodes()
@@ -25,6 +47,7 @@ graph.add_node("generate_price_request", graph_nodes.generate_price_request)
 graph.add_node("generate_waiting_costs", graph_nodes.generate_waiting_costs)
 graph.add_node("generate_update_order", graph_nodes.generate_update_order)
 graph.add_node("generate_random", graph_nodes.generate_random)
+graph.add_node("render_attachments", graph_nodes.render_attachments)
 graph.add_node("send_email", graph_nodes.send_email)
 
 graph.add_conditional_edges(
@@ -39,17 +62,19 @@ graph.add_conditional_edges(
         "waiting_costs": "generate_waiting_costs",
         "update_order": "generate_update_order",
         "random": "generate_random",
+        "buffered": "render_attachments",
     },
 )
 
-graph.add_edge("generate_order", "send_email")
-graph.add_edge("generate_declaration", "send_email")
-graph.add_edge("generate_question", "send_email")
-graph.add_edge("generate_complaint", "send_email")
-graph.add_edge("generate_price_request", "send_email")
-graph.add_edge("generate_waiting_costs", "send_email")
-graph.add_edge("generate_update_order", "send_email")
-graph.add_edge("generate_random", "send_email")
+graph.add_edge("generate_order", "render_attachments")
+graph.add_edge("generate_declaration", "render_attachments")
+graph.add_edge("generate_question", "render_attachments")
+graph.add_edge("generate_complaint", "render_attachments")
+graph.add_edge("generate_price_request", "render_attachments")
+graph.add_edge("generate_waiting_costs", "render_attachments")
+graph.add_edge("generate_update_order", "render_attachments")
+graph.add_edge("generate_random", "render_attachments")
+graph.add_edge("render_attachments", "send_email")
 graph.add_edge("send_email", END)
 
 
@@ -1,38 +1,147 @@
-import random
-from importlib import resources
+import asyncio
+import functools
+import time
+from collections.abc import Callable
+from functools import cached_property
+from typing import Any
 
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
 
 from phantommail.fakers.complaint import FakeComplaint
 from phantommail.fakers.declaration import DeclarationGenerator
+from phantommail.fakers.faker_pool import task_random
 from phantommail.fakers.price_request import PriceRequestGenerator
 from phantommail.fakers.question import TransportQuestionGenerator
 from phantommail.fakers.random_promotional import RandomPromotionalGenerator
 from phantommail.fakers.transport import TransportOrderGenerator
 from phantommail.fakers.update_order import UpdateOrderGenerator
 from phantommail.fakers.waiting_costs import WaitingCostsGenerator
+from phantommail.graphs.prompts import (
+    COMPLAINT_PROMPT,
+    PRICE_REQUEST_PROMPT,
+    PROMOTIONAL_PROMPT,
+    QUESTION_PROMPT,
+    UPDATE_ORDER_PROMPT,
+    WAITING_COSTS_PROMPT,
+    declaration_prompt,
+    order_prompt,
+    slot_prompt,
+    slot_schema,
+)
 from phantommail.graphs.state import FakeEmailState
 from phantommail.helpers.html_to_pdf import create_pdf
+from phantommail.helpers.template_emails import (
+    declaration_email,
+    order_email,
+    text_email,
+)
+from phantommail.llm import ChatModel, ModelRouter, Route
+from phantommail.llm.circuit_breaker import ModelsUnavailable
+from phantommail.llm.context_cache import is_cache_miss
+from phantommail.llm.streaming import JsonObjectStream, can_stream, stream_json
 from phantommail.logger import setup_logger
-from phantommail.models.email import Email, FullEmail
+from phantommail.models.email import Attachment, Email, FullEmail
 from phantommail.send_email import send
 
 logger = setup_logger(__name__)
 
+# Streamed answers write the attachment first, so its PDF can be rendered
+# while the body and subject are still coming in
+STREAM_FIRST = ("attachment_html",)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage of an email runs past its deadline."""
+
+
+def _deadline(stage: str):
+    """Bound a node by the deadline of ``stage`` in the config, if any.
+
+    ``deadlines`` in the config maps the stages "generate", "render" and
+    "send" to seconds. A node that runs longer is cancelled, and with it the
+    LLM calls, hedges and renders it started.
+    """
+
+    def decorate(node):
+        @functools.wraps(node)
+        async def bounded(self, state: FakeEmailState, config):
+            seconds = (config["configurable"].get("deadlines") or {}).get(stage)
+            if seconds is None:
+                return await node(self, state, config)
+            try:
+                async with asyncio.timeout(seconds):
+                    return await node(self, state, config)
+            except TimeoutError as error:
+                raise DeadlineExceeded(
+                    f"The {stage} stage exceeded its {seconds:g}s deadline"
+                ) from error
+
+        return bounded
+
+    return decorate
+
+
+class _EarlyAttachment:
+    """Render a streamed attachment_html as soon as the field is complete."""
+
+    def __init__(self):
+        """Initialize without a render in flight."""
+        self.html: str | None = None
+        self.task: asyncio.Task | None = None
+
+    def on_field(self, name: str, value: Any) -> None:
+        """Start the render when attachment_html arrives, see _generate_email."""
+        if name == "attachment_html" and value and self.task is None:
+            self.html = value
+            self.task = asyncio.create_task(create_pdf(value))
+
+    async def attachments(self, html: str | None) -> list[Attachment] | None:
+        """Return the rendered attachment for ``html``, None if it was not rendered."""
+        if self.task is None or html != self.html:
+            self.cancel()
+            return None
+        return [Attachment(filename="attachment_0.pdf", content=await self.task)]
+
+    def cancel(self) -> None:
+        """Drop a render whose email failed."""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
 
 class GraphNodes:
     """The nodes for the fake email graph."""
 
     def __init__(self):
         """Initialize the graph nodes."""
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-pro",
-            temperature=0.5,
-        )
+        # Structured-output runnables by chat model and schema, see _structured
+        self._structured_runnables: dict[tuple, tuple[ChatModel, Runnable]] = {}
+
+    @cached_property
+    def router(self) -> ModelRouter:
+        """The per-route chat models of the LLM_BACKEND, created on first use."""
+        return ModelRouter()
+
+    @staticmethod
+    def _use_templates(config) -> bool:
+        """Whether emails are built from the templates instead of the LLM."""
+        return config["configurable"].get("generation_mode") == "template"
+
+    @staticmethod
+    def _fill_slots(config) -> bool:
+        """Whether the LLM only writes slot values that the templates render."""
+        return config["configurable"].get("generation_mode") == "slots"
 
     def email_types(self, state: FakeEmailState, config):
-        """Get the email types."""
+        """Get the email types.
+
+        Emails taken from the pre-generation buffer arrive with their subject
+        and body already set and route to "buffered", skipping generation.
+        """
+        if state.get("subject") and state.get("email"):
+            return "buffered"
+
         types = [
             "order",
             "question",
@@ -47,29 +156,224 @@ class GraphNodes:
         if "email_type" in state and state["email_type"] in types:
             return state["email_type"]
 
-        return random.choice(types)
-
+        return task_random().choice(types)
+
+    def _structured(self, llm: ChatModel, schema: type[BaseModel] = Email) -> Runnable:
+        """Return ``llm`` with structured output, built once per model and schema."""
+        key = (id(llm), schema)
+        cached = self._structured_runnables.get(key)
+        if cached is None or cached[0] is not llm:
+            cached = (llm, llm.with_structured_output(schema))
+            self._structured_runnables[key] = cached
+        return cached[1]
+
+    async def _generate_email(
+        self,
+        prompt: ChatPromptTemplate,
+        values: dict,
+        config,
+        route: str,
+        cache_prefix: bool = False,
+        schema: type[BaseModel] = Email,
+        on_field: Callable[[str, Any], None] | None = None,
+        template: Callable[[], BaseModel] | None = None,
+    ) -> BaseModel:
+        """Generate an email with structured output, paced by the LLM rate limiter.
+
+        Only ``values`` are formatted into the precompiled ``prompt``. The chat
+        model comes from the routing table entry ``route`` (an email type, or
+        "<type>.attachment" when the call also writes an attachment). A router
+        passed as ``llm_router`` in the config replaces the default one, a chat
+        model passed as ``llm`` replaces the routed model.
+
+        With ``cache_prefix`` the system message of the prompt is registered
+        with the router's context cache and only the rest is sent per call. A
+        cache the provider has dropped is created again and the call retried.
+        Answers are looked up in the ``llm_cache`` of the config first, if any.
+        Only answers of the route's own model are stored there: fallback and
+        template answers are not cached, so a replay misses for those calls.
+        With an ``llm_batcher`` in the config the call joins a batch with the
+        calls of other emails for the same route.
+        An ``llm_limiter`` in the config bounds the calls in flight and retries
+        the ones the provider rejects as overloaded.
+        With ``hedge_llm`` set, a call still running after the p90 latency of
+        its route is duplicated and the first answer wins. Latencies, and the
+        hedge delay, count from when the call got past the limiters; only the
+        route's own model is recorded and hedged, not its fallbacks.
+
+        A routed model that fails, or whose circuit breaker is open, hands the
+        call to the next model of the router's fallback chain. When none is
+        left, ``template()`` builds the answer without the LLM, if given.
+
+        ``schema`` is the structured output, an ``Email`` by default. When
+        ``stream_llm`` is set in the config and ``on_field`` is given, the
+        answer is streamed and ``on_field(name, value)`` is called as soon as
+        each field is complete, attachment_html first.
+        """
+        router = config["configurable"].get("llm_router") or self.router
+        llm = config["configurable"].get("llm")
+        messages = prompt.format_messages(**values)
+
+        response_cache = config["configurable"].get("llm_cache")
+        if response_cache is not None:
+            if llm is None:
+                model, temperature = (
+                    router.route(route).model,
+                    router.route(route).temperature,
+                )
+            else:
+                model = getattr(llm, "model", None) or type(llm).__name__
+                temperature = getattr(llm, "temperature", None)
+            cache_key = response_cache.make_key(model, temperature, schema, messages)
+            # SQLite blocks, the cache is read and written in a worker thread
+            cached = await asyncio.to_thread(response_cache.get, cache_key, schema)
+            if cached is not None:
+                return cached
+
+        if not config["configurable"].get("stream_llm"):
+            on_field = None
+
+        rate_limiter = config["configurable"].get("llm_rate_limiter")
+        batcher = config["configurable"].get("llm_batcher")
+        limiter = config["configurable"].get("llm_limiter")
+
+        async def call(
+            candidate: Route, served: asyncio.Event
+        ) -> tuple[BaseModel, float]:
+            if rate_limiter is not None:
+                await rate_limiter.acquire()
+            # The limiter slot is held, time spent queueing is not latency
+            started = time.monotonic()
+            served.set()
+            if batcher is not None:
+                response = await batcher.generate(router, route, schema, messages, llm)
+            elif cache_prefix and llm is None:
+                response = await self._generate_with_cached_prefix(
+                    router, candidate, messages, schema, on_field
+                )
+            else:
+                response = await self._invoke(
+                    llm or router.client(candidate), schema, messages, on_field
+                )
+            return response, started
+
+        async def attempt(
+            candidate: Route, served: asyncio.Event
+        ) -> tuple[BaseModel, float]:
+            if limiter is None:
+                response, started = await call(candidate, served)
+            else:
+                response, started = await limiter.run(lambda: call(candidate, served))
+            if response is None:
+                raise ValueError(f"{candidate.model} returned no structured output")
+            return response, started
+
+        # Only routed models have circuit breakers and fallbacks, a configured
+        # ``llm`` or a batch is called as is
+        routed = llm is None and batcher is None
+        chain = router.chain(route) if routed else [router.route(route)]
+        # Batched calls wait for their batch on purpose, hedging them is moot
+        hedge = config["configurable"].get("hedge_llm") and batcher is None
+
+        error = None
+        for position, candidate in enumerate(chain):
+            breaker = router.breaker(candidate.model) if routed else None
+            if breaker is not None and not breaker.allow():
+                continue
+            # The route's statistics describe its own model, not the fallbacks
+            primary = position == 0
+            served = asyncio.Event()
+            try:
+                if hedge and primary:
+                    response, started = await router.hedged(
+                        route,
+                        lambda candidate=candidate: attempt(candidate, served),
+                        served=served,
+                    )
+                else:
+                    response, started = await attempt(candidate, served)
+            except Exception as exc:
+                if primary:
+                    router.record(route, 0.0, failed=True)
+                if breaker is None:
+                    raise
+                breaker.record(False)
+                logger.warning(f"{candidate.model} failed for {route}: {exc}")
+                error = exc
+                continue
+            if primary:
+                router.record(route, time.monotonic() - started)
+            if breaker is not None:
+                breaker.record(True)
+            if position:
+                router.route_stats(route).fallbacks += 1
+            # The key names the route's model, a fallback's answer is not its
+            elif response_cache is not None:
+                await asyncio.to_thread(response_cache.put, cache_key, response)
+            return response
+
+        if template is None:
+            if error is not None:
+                raise error
+            raise ModelsUnavailable(f"Every model for {route} is switched off")
+        logger.warning(f"No model available for {route}, building it from templates")
+        router.route_stats(route).templated += 1
+        return template()
+
+    async def _generate_with_cached_prefix(
+        self,
+        router: ModelRouter,
+        route: Route,
+        messages: list,
+        schema: type[BaseModel],
+        on_field: Callable[[str, Any], None] | None,
+    ) -> BaseModel:
+        """Call the model with the system message as cached context, see _generate_email."""
+        prefix, request = messages[0].content, messages[1:]
+        # Creating a cache is a blocking API call, made once per prefix
+        llm = await asyncio.to_thread(router.cached_client, route, prefix)
+        if llm is not None:
+            try:
+                return await self._invoke(llm, schema, request, on_field)
+            except Exception as error:
+                if not is_cache_miss(error):
+                    raise
+                logger.info(
+                    f"Cached prompt prefix expired for {route.model}, recreating"
+                )
+                router.invalidate_prefix(route, prefix, llm)
+            llm = await asyncio.to_thread(router.cached_client, route, prefix)
+        if llm is None:
+            return await self._invoke(router.client(route), schema, messages, on_field)
+        return await self._invoke(llm, schema, request, on_field)
+
+    async def _invoke(
+        self,
+        llm: ChatModel,
+        schema: type[BaseModel],
+        messages: list,
+        on_field: Callable[[str, Any], None] | None,
+    ) -> BaseModel:
+        """Make one structured-output call, streamed when ``on_field`` is given."""
+        if on_field is None or not can_stream(llm):
+            return await self._structured(llm, schema).ainvoke(messages)
+
+        parser = JsonObjectStream()
+        async for text in stream_json(llm, schema, messages, STREAM_FIRST):
+            for name, value in parser.feed(text):
+                on_field(name, value)
+        return schema.model_validate(parser.result())
+
+    @_deadline("generate")
     async def generate_declaration(self, state: FakeEmailState, config):
         """Generate a fake customs declaration email."""
         declaration_generator = DeclarationGenerator()
-        declaration = declaration_generator.generate_declaration().model_dump()
+        customs_declaration = declaration_generator.generate_declaration()
+        declaration = customs_declaration.model_dump()
 
         logger.info(f"Generated customs declaration: {declaration}")
 
-        example_number = random.randint(1, 2)
-
-        # Read example templates
-        email_html = (
-            resources.files("phantommail.examples")
-            .joinpath(f"customs_{example_number}_email.html")
-            .read_text()
-        )
-
-        pdf_html = (
-            resources.files("phantommail.examples")
-            .joinpath(f"customs_{example_number}_pdf.html")
-            .read_text()
-        )
+        example_number = task_random().randint(1, 2)
 
         # Format declaration details for use in prompts
         declaration_details = f"""
@@ -106,280 +410,293 @@ class GraphNodes:
         - Status: {declaration["declaration_status"]}
         """
 
-        prompt = f"""Generate a fake customs declaration email based on the following data.
-        
-        IMPORTANT: Replace ALL references in BOTH the email HTML and PDF HTML templates with the actual data:
-        - Replace all MRN numbers, company names, addresses, contact details with the declaration information
-        - Replace dates, values, and goods descriptions with realistic values based on the declaration
-        - Replace any placeholder text with appropriate content based on the customs declaration
-        - Ensure both the email and PDF appear to come from the exporter company
-        - Make sure the PDF contains detailed customs information matching the declaration
-        - Don't put customs declaration in the subject but make it very abstract"
-        
-        The customs declaration is being sent to:
-        Vectrans NV
-        Kipdorpbrug 1
-        2000 Antwerpen
-        VAT: BE 1234.567.89
-
-        Declaration details:
-        {declaration_details}
-
-        Create an email body and attachment in the following style:
-        <body_html>
-        {email_html}
-        </body_html>
-
-        <attachment_html>
-        {pdf_html}
-        </attachment_html>
-        """
-
-        llm_with_tools = self.llm.with_structured_output(Email)
-
-        response = await llm_with_tools.ainvoke(
-            [
-                HumanMessage(content=prompt),
-            ]
-        )
+        early = _EarlyAttachment()
+        if self._use_templates(config):
+            response = declaration_email(customs_declaration, example_number)
+        elif self._fill_slots(config):
+            schema = slot_schema("customs", example_number)
+            values = await self._generate_email(
+                slot_prompt("customs", example_number),
+                {"details": declaration_details},
+                config,
+                route="declaration",
+                schema=schema,
+                # No slot values render the template with the fake data alone
+                template=lambda: schema(subject=""),
+            )
+            response = declaration_email(
+                customs_declaration,
+                example_number,
+                values.model_dump(exclude={"subject"}),
+                values.subject,
+            )
+        else:
+            try:
+                response = await self._generate_email(
+                    declaration_prompt(example_number),
+                    {"declaration_details": declaration_details},
+                    config,
+                    route="declaration.attachment",
+                    cache_prefix=True,
+                    on_field=early.on_field,
+                    template=lambda: declaration_email(
+                        customs_declaration, example_number
+                    ),
+                )
+            except BaseException:
+                early.cancel()
+                raise
 
         response = response.model_dump()
 
-        # Create PDF attachment
-        pdf = await create_pdf(response["attachment_html"])
-
         logger.info(f"Response from model: {response}")
 
-        return {
-            "attachments": [pdf],
+        # The PDF attachment is rendered by the render_attachments node, unless
+        # it was already rendered while the answer was streaming
+        result = {
+            "attachment_html": [response["attachment_html"]],
             "email": response["body_html"],
             "subject": response["subject"],
+            "email_attributes": customs_declaration.model_dump(mode="json"),
         }
+        attachments = await early.attachments(response["attachment_html"])
+        if attachments is not None:
+            result.update(attachments=attachments, attachment_html=[])
+        return result
 
+    @_deadline("generate")
     async def generate_question(self, state: FakeEmailState, config):
         """Generate a fake question email."""
         question_generator = TransportQuestionGenerator()
         question = question_generator.generate_question()
 
-        instruction = SystemMessage(
-            content="You are an assistant that generates fake emails. The emails are meant for Vectrix Logistcs NV"
-        )
-
-        prompt = HumanMessage(
-            content=f"""Generate a fake question email based on the following data. Write all details in the body.\n
-        {question}
-        """
-        )
+        def template() -> Email:
+            return text_email(
+                "Question about a transport", question["formatted_message"]
+            )
 
-        messages = [instruction, prompt]
-        llm_with_tools = self.llm.with_structured_output(Email)
-        response = await llm_with_tools.ainvoke(messages)
+        if self._use_templates(config):
+            response = template()
+        else:
+            response = await self._generate_email(
+                QUESTION_PROMPT,
+                {"question": question},
+                config,
+                route="question",
+                template=template,
+            )
         response = response.model_dump()
 
-        return {"email": response["body_html"], "subject": response["subject"]}
+        return {
+            "email": response["body_html"],
+            "subject": response["subject"],
+            "email_attributes": question,
+        }
 
+    @_deadline("generate")
     async def generate_complaint(self, state: FakeEmailState, config):
         """Generate a fake complaint email."""
         complaint_generator = FakeComplaint()
         complaint = complaint_generator.generate_complaint()
 
-        instruction = SystemMessage(
-            content="You are an assistant that generates fake emails. The emails are meant for Vectrix Logistcs NV"
-        )
+        def template() -> Email:
+            return text_email(
+                "Complaint about my delivery", complaint["formatted_message"]
+            )
 
-        prompt = HumanMessage(
-            content=f"""Generate a fake complaint email based on the following data. Write all details in the body.\n
-        {complaint}
-        """
-        )
-        messages = [instruction, prompt]
-        llm_with_tools = self.llm.with_structured_output(Email)
-        response = await llm_with_tools.ainvoke(messages)
+        if self._use_templates(config):
+            response = template()
+        else:
+            response = await self._generate_email(
+                COMPLAINT_PROMPT,
+                {"complaint": complaint},
+                config,
+                route="complaint",
+                template=template,
+            )
         response = response.model_dump()
 
-        return {"email": response["body_html"], "subject": response["subject"]}
+        return {
+            "email": response["body_html"],
+            "subject": response["subject"],
+            "email_attributes": complaint,
+        }
 
+    @_deadline("generate")
     async def generate_price_request(self, state: FakeEmailState, config):
         """Generate a fake price request email."""
         price_request_generator = PriceRequestGenerator()
         price_request = price_request_generator.generate_price_request()
 
-        instruction = SystemMessage(
-            content="You are an assistant that generates fake price negotiation emails for transport services. The emails are meant for Vectrix Logistics NV"
-        )
-
-        prompt = HumanMessage(
-            content=f"""Generate a professional price negotiation email based on the following data. 
-        
-        IMPORTANT:
-        - Use the exact company details and signature provided
-        - Write in {price_request["language"]} language
-        - Include the transport route: {price_request["origin"]} to {price_request["destination"]}
-        - Include the transport date: {price_request["transport_date"]}
-        - Make the subject abstract but related to price inquiry (e.g., "Transport inquiry {price_request["origin"]}-{price_request["destination"]}")
-        - Include the price negotiation message naturally in the email body
-        - End with the complete signature block provided
-        
-        Price request details:
-        {price_request["formatted_message"]}
-        """
-        )
+        def template() -> Email:
+            return text_email(
+                f"Transport inquiry {price_request['origin']}-{price_request['destination']}",
+                price_request["formatted_message"],
+            )
 
-        messages = [instruction, prompt]
-        llm_with_tools = self.llm.with_structured_output(Email)
-        response = await llm_with_tools.ainvoke(messages)
+        if self._use_templates(config):
+            response = template()
+        else:
+            response = await self._generate_email(
+                PRICE_REQUEST_PROMPT,
+                {
+                    key: price_request[key]
+                    for key in [
+                        "language",
+                        "origin",
+                        "destination",
+                        "transport_date",
+                        "formatted_message",
+                    ]
+                },
+                config,
+                route="price_request",
+                template=template,
+            )
         response = response.model_dump()
 
-        return {"email": response["body_html"], "subject": response["subject"]}
+        return {
+            "email": response["body_html"],
+            "subject": response["subject"],
+            "email_attributes": price_request,
+        }
 
+    @_deadline("generate")
     async def generate_waiting_costs(self, state: FakeEmailState, config):
         """Generate a fake waiting costs dispute email."""
         waiting_costs_generator = WaitingCostsGenerator()
         waiting_costs_data = waiting_costs_generator.generate_waiting_costs_scenario()
+        scenario = waiting_costs_data["scenario"]
 
-        instruction = SystemMessage(
-            content="You are an assistant that generates fake dispute emails responding to waiting cost charges from Vectrans logistics company. The emails should professionally dispute the charges while maintaining a business relationship."
-        )
-
-        prompt = HumanMessage(
-            content=f"""Generate a professional dispute email based on the following waiting costs scenario.
-        
-        IMPORTANT:
-        - Vectrans is charging waiting costs for a delivery issue
-        - The customer is disputing these charges
-        - Use the exact dispute message and signature provided
-        - Write in {waiting_costs_data["language"]} language
-        - Make the subject reference the delivery issue (e.g., "RE: Waiting costs - Delivery {waiting_costs_data["scenario"]["delivery_date"]} {waiting_costs_data["scenario"]["delivery_city"]}")
-        - Include the reference numbers in the email
-        - Maintain a professional but firm tone
-        
-        Waiting costs scenario:
-        - Delivery location: {waiting_costs_data["scenario"]["delivery_city"]} - {waiting_costs_data["scenario"]["destination_company"]}
-        - Delivery date: {waiting_costs_data["scenario"]["delivery_date"]}
-        - Order reference: {waiting_costs_data["scenario"]["order_ref"]}
-        - Delivery reference: {waiting_costs_data["scenario"]["delivery_ref"]}
-        - Tracking: {waiting_costs_data["scenario"]["tracking_ref"]}
-        - Issue: Driver could not unload because {waiting_costs_data["scenario"]["waiting_reason"]}
-        - Waiting time: {waiting_costs_data["scenario"]["waiting_hours"]} hours
-        - Charged amount: {waiting_costs_data["scenario"]["total_cost"]}€
-        
-        Dispute response:
-        {waiting_costs_data["formatted_message"]}
-        """
-        )
+        def template() -> Email:
+            return text_email(
+                f"RE: Waiting costs - Delivery {scenario['delivery_date']} {scenario['delivery_city']}",
+                waiting_costs_data["formatted_message"],
+            )
 
-        messages = [instruction, prompt]
-        llm_with_tools = self.llm.with_structured_output(Email)
-        response = await llm_with_tools.ainvoke(messages)
+        if self._use_templates(config):
+            response = template()
+        else:
+            response = await self._generate_email(
+                WAITING_COSTS_PROMPT,
+                {
+                    **scenario,
+                    "language": waiting_costs_data["language"],
+                    "formatted_message": waiting_costs_data["formatted_message"],
+                },
+                config,
+                route="waiting_costs",
+                template=template,
+            )
         response = response.model_dump()
 
-        return {"email": response["body_html"], "subject": response["subject"]}
+        return {
+            "email": response["body_html"],
+            "subject": response["subject"],
+            "email_attributes": waiting_costs_data,
+        }
 
+    @_deadline("generate")
     async def generate_update_order(self, state: FakeEmailState, config):
         """Generate a fake update order question email."""
         update_order_generator = UpdateOrderGenerator()
         update_data = update_order_generator.generate_update_order_question()
 
-        instruction = SystemMessage(
-            content="You are an assistant that generates fake update request emails about existing transport orders. The emails are meant for Vectrans NV"
-        )
-
-        prompt = HumanMessage(
-            content=f"""Generate a brief professional email asking for an update about a transport order.
-        
-        IMPORTANT:
-        - Keep the email very brief and direct
-        - Use the exact greeting, question, and signature provided
-        - Write in {update_data["language"]} language
-        - Make the subject reference the order (e.g., "Order {update_data["order_ref"]} - Update request" or "Transport {update_data["tracking_ref"]} - Information needed")
-        - The body should contain only the greeting, question, and signature
-        - Do NOT add extra explanations or context
-        
-        Order references:
-        - Order: {update_data["order_ref"]}
-        - Tracking: {update_data["tracking_ref"]}
-        
-        Email content:
-        {update_data["formatted_message"]}
-        """
-        )
+        def template() -> Email:
+            return text_email(
+                f"Order {update_data['order_ref']} - Update request",
+                update_data["formatted_message"],
+            )
 
-        messages = [instruction, prompt]
-        llm_with_tools = self.llm.with_structured_output(Email)
-        response = await llm_with_tools.ainvoke(messages)
+        if self._use_templates(config):
+            response = template()
+        else:
+            response = await self._generate_email(
+                UPDATE_ORDER_PROMPT,
+                {
+                    key: update_data[key]
+                    for key in [
+                        "language",
+                        "order_ref",
+                        "tracking_ref",
+                        "formatted_message",
+                    ]
+                },
+                config,
+                route="update_order",
+                template=template,
+            )
         response = response.model_dump()
 
-        return {"email": response["body_html"], "subject": response["subject"]}
+        return {
+            "email": response["body_html"],
+            "subject": response["subject"],
+            "email_attributes": update_data,
+        }
 
+    @_deadline("generate")
     async def generate_random(self, state: FakeEmailState, config):
         """Generate a random promotional email."""
         promo_generator = RandomPromotionalGenerator()
         promo_data = promo_generator.generate_promotional_email()
 
-        instruction = SystemMessage(
-            content="You are an assistant that generates fake promotional emails for logistics and transport services. The emails are meant for Vectrans NV to promote their services."
-        )
-
-        prompt = HumanMessage(
-            content=f"""Generate a professional promotional email based on the following content.
-        
-        IMPORTANT:
-        - Create an engaging promotional email in {promo_data["language"]} language
-        - Use the promotional title as inspiration for the subject line
-        - Include the promotional content, benefit, and call-to-action
-        - Add the validity period prominently
-        - Use professional but engaging marketing language
-        - End with the complete signature provided
-        - Make it look like a real promotional email from a logistics company
-        
-        Promotional content:
-        - Title: {promo_data["promo_title"]}
-        - Content: {promo_data["promo_content"]}
-        - Key benefit: {promo_data["promo_benefit"]}
-        - Call to action: {promo_data["promo_cta"]}
-        - Validity: {promo_data["validity"]}
-        
-        Sender:
-        {promo_data["signature"]}
-        """
-        )
+        def template() -> Email:
+            return text_email(
+                promo_data["promo_title"],
+                "\n\n".join(
+                    promo_data[key]
+                    for key in [
+                        "promo_content",
+                        "promo_benefit",
+                        "promo_cta",
+                        "validity",
+                        "signature",
+                    ]
+                ),
+            )
 
-        messages = [instruction, prompt]
-        llm_with_tools = self.llm.with_structured_output(Email)
-        response = await llm_with_tools.ainvoke(messages)
+        if self._use_templates(config):
+            response = template()
+        else:
+            response = await self._generate_email(
+                PROMOTIONAL_PROMPT,
+                {
+                    key: promo_data[key]
+                    for key in [
+                        "language",
+                        "promo_title",
+                        "promo_content",
+                        "promo_benefit",
+                        "promo_cta",
+                        "validity",
+                        "signature",
+                    ]
+                },
+                config,
+                route="random",
+                template=template,
+            )
         response = response.model_dump()
 
-        return {"email": response["body_html"], "subject": response["subject"]}
+        return {
+            "email": response["body_html"],
+            "subject": response["subject"],
+            "email_attributes": promo_data,
+        }
 
+    @_deadline("generate")
     async def generate_order(self, state: FakeEmailState, config):
         """Generate a fake transport order email."""
         transport_order_generator = TransportOrderGenerator()
-        transport_order = transport_order_generator.generate().model_dump()
+        order = transport_order_generator.generate()
+        transport_order = order.model_dump()
 
         logger.info(f"Generated transport order: {transport_order}")
 
         # Randomly select an order template (1-6)
-        order_number = random.randint(1, 6)
+        order_number = task_random().randint(1, 6)
         logger.info(f"Selected order template: order_{order_number}")
 
-        # Read HTML templates
-        email_html = (
-            resources.files("phantommail.examples")
-            .joinpath(f"order_{order_number}_email.html")
-            .read_text()
-        )
-
-        # Check if PDF template exists for this order
-        if order_number in [1, 6]:  # Order 1 and 6 don't have a PDF template
-            # Order 1 doesn't have a PDF template
-            pdf_html = "no attachment"
-        else:
-            pdf_html = (
-                resources.files("phantommail.examples")
-                .joinpath(f"order_{order_number}_pdf.html")
-                .read_text()
-            )
-
         # Format transport details for use in prompts
         if order_number != 6:
             transport_details = f"""
@@ -427,97 +744,136 @@ class GraphNodes:
             - Phone: {transport_order["client"]["phone"]}
             """
 
-        if pdf_html == "no attachment":
-            prompt = f"""Generate a fake transport order email based on the following data. 
-        
-        IMPORTANT: Replace ALL references in the HTML template with the actual data provided below:
-        - Replace all company names, addresses, contact details with the sender's information
-        - Replace order numbers, dates, and transport details with realistic values
-        - Replace any placeholder text with appropriate content based on the transport order
-        - Ensure the email appears to come from the sender company listed below
-        - If no pickup, delivery or stops information is provided, DO NOT INCLUDE it in the email!
-
-        The transport is send to the following logistics company:
-        Vectrans NV
-        Kipdorpbrug 1
-        2000 Antwerpen
-        VAT: BE 1234.567.89
-
-
-        Transport details:
-        {transport_details}
-
-        Create an email body in the following style:
-        <body_html>
-        {email_html}
-        </body_html>
-
-        <attachment_html>
-        no attachment
-        </attachment_html>
-        """
+        early = _EarlyAttachment()
+        if self._use_templates(config):
+            response = order_email(order, order_number)
+        elif self._fill_slots(config):
+            schema = slot_schema("order", order_number)
+            values = await self._generate_email(
+                slot_prompt("order", order_number),
+                {"details": transport_details},
+                config,
+                route="order",
+                schema=schema,
+                # No slot values render the template with the fake data alone
+                template=lambda: schema(subject=""),
+            )
+            response = order_email(
+                order,
+                order_number,
+                values.model_dump(exclude={"subject"}),
+                values.subject,
+            )
         else:
-            prompt = f"""Generate a fake transport order email based on the following data.
-        
-        IMPORTANT: Replace ALL references in BOTH the email HTML and attachment HTML templates with the actual data:
-        - Replace all company names, addresses, contact details with the sender's information
-        - Replace order numbers, dates, and transport details with realistic values
-        - Replace any placeholder text with appropriate content based on the transport order
-        - Ensure both the email and PDF attachment appear to come from the sender company
-        - Make sure the attachment contains detailed transport information matching the email
-        
-        Transport details:
-        {transport_details}
-
-        Create an email body and attachment in the following style:
-        <body_html>
-        {email_html}
-        </body_html>
-
-        <attachment_html>
-        {pdf_html}
-        </attachment_html>
-        """
-
-        llm_with_tools = self.llm.with_structured_output(Email)
-
-        response = await llm_with_tools.ainvoke(
-            [
-                HumanMessage(content=prompt),
-            ]
-        )
-
-        if response is None:
-            logger.error("LLM returned None for structured output in generate_order")
-            raise ValueError("LLM failed to generate structured output for order email")
+            try:
+                response = await self._generate_email(
+                    order_prompt(order_number),
+                    {"transport_details": transport_details},
+                    config,
+                    # Order 1 and 6 don't have a PDF template
+                    route="order" if order_number in [1, 6] else "order.attachment",
+                    cache_prefix=True,
+                    on_field=None if order_number in [1, 6] else early.on_field,
+                    template=lambda: order_email(order, order_number),
+                )
+            except BaseException:
+                early.cancel()
+                raise
 
         response = response.model_dump()
 
         # Check if we need to create a PDF attachment based on order number
         if order_number not in [1, 6]:  # Only orders 2-5 have PDF templates
-            pdf = await create_pdf(response["attachment_html"])
-            attachments = [pdf]
+            attachment_html = [response["attachment_html"]]
         else:
-            attachments = []
+            attachment_html = []
 
         logger.info(f"Response from model: {response}")
 
-        return {
-            "attachments": attachments,
+        result = {
+            "attachment_html": attachment_html,
             "email": response["body_html"],
             "subject": response["subject"],
+            "email_attributes": order.model_dump(mode="json"),
         }
+        attachments = await early.attachments(response["attachment_html"])
+        if attachments is not None:
+            result.update(attachments=attachments, attachment_html=[])
+        return result
+
+    @_deadline("render")
+    async def render_attachments(self, state: FakeEmailState, config):
+        """Render the pending attachment HTML documents to PDF attachments."""
+        attachments = list(state.get("attachments") or [])
+        for html in state.get("attachment_html") or []:
+            attachments.append(
+                Attachment(
+                    filename=f"attachment_{len(attachments)}.pdf",
+                    content=await create_pdf(html),
+                )
+            )
 
+        return {"attachments": attachments, "attachment_html": []}
+
+    @_deadline("send")
     async def send_email(self, state: FakeEmailState, config):
-        """Send an email."""
+        """Send an email through the ``mail_transport`` of the config.
+
+        Without one, the email goes through the Resend SDK in a worker thread.
+        With a ``send_ledger``, the email is stored under its idempotency key
+        before it is sent, and marked sent afterwards. An error of the Resend
+        SDK is then recorded as a failed attempt and raised. With an ``exporter``,
+        the email and its ground truth are written to the corpus instead.
+        """
+        key = state.get("idempotency_key")
         email = FullEmail(
             sender=config["configurable"].get("sender"),
             to=state["recipients"],
             attachments=state.get("attachments", []),
             body_html=state["email"],
             subject=state["subject"],
+            idempotency_key=key,
         )
 
-        send(email)
+        ledger = config["configurable"].get("send_ledger")
+        recorded = ledger is not None and key is not None
+        if recorded:
+            await ledger.generated(key, email, state.get("email_attributes"))
+
+        rate_limiter = config["configurable"].get("send_rate_limiter")
+        limiter = config["configurable"].get("send_limiter")
+        transport = config["configurable"].get("mail_transport")
+
+        async def deliver() -> str:
+            if rate_limiter is not None:
+                await rate_limiter.acquire()
+            if transport is not None:
+                return await transport.send(email)
+            # The Resend SDK blocks, keep it off the event loop. Errors must
+            # surface for the limiter to back off on them, and for the ledger
+            # to record them as failures rather than as message ids.
+            return await asyncio.to_thread(
+                send, email, raise_errors=limiter is not None or recorded
+            )
 
+        exporter = config["configurable"].get("exporter")
+        if exporter is not None:
+            message_id = await exporter.write(
+                email, state.get("email_type"), state.get("email_attributes")
+            )
+        else:
+            try:
+                if limiter is None:
+                    message_id = await deliver()
+                else:
+                    message_id = await limiter.run(deliver)
+            except Exception as error:
+                # Transport errors are recorded by the runner, which always
+                # has a transport
+                if transport is None and recorded:
+                    ledger.failed(key, error)
+                raise
+
+        if recorded:
+            await ledger.sent(key, message_id)
         return {"messages": state["messages"]}
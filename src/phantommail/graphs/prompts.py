@@ -0,0 +1,323 @@
+"""Prompt templates for the graph nodes, built once per process.
+
+The static part of every prompt (instructions and the example HTML templates)
+goes first, in the system message, so all prompts of a kind share the same
+prefix. Only the fields drawn from the fakers are formatted in per email.
+"""
+
+import html
+import re
+from functools import cache
+from typing import Literal
+
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field, create_model
+
+from phantommail.helpers.templates import load_template
+
+# The logistics company the orders and declarations are sent to
+VECTRANS_ADDRESS = """Vectrans NV
+Kipdorpbrug 1
+2000 Antwerpen
+VAT: BE 1234.567.89"""
+
+
+@cache
+def declaration_prompt(example_number: int) -> ChatPromptTemplate:
+    """Return the prompt for a customs email in the style of example ``example_number``.
+
+    Variables: ``declaration_details``.
+    """
+    email_html = load_template(f"customs_{example_number}_email.html").example()
+    pdf_html = load_template(f"customs_{example_number}_pdf.html").example()
+
+    instructions = f"""Generate a fake customs declaration email based on the declaration details you are given.
+
+IMPORTANT: Replace ALL references in BOTH the email HTML and PDF HTML templates with the actual data:
+- Replace all MRN numbers, company names, addresses, contact details with the declaration information
+- Replace dates, values, and goods descriptions with realistic values based on the declaration
+- Replace any placeholder text with appropriate content based on the customs declaration
+- Ensure both the email and PDF appear to come from the exporter company
+- Make sure the PDF contains detailed customs information matching the declaration
+- Don't put customs declaration in the subject but make it very abstract
+
+The customs declaration is being sent to:
+{VECTRANS_ADDRESS}
+
+Create an email body and attachment in the following style:
+<body_html>
+{email_html}
+</body_html>
+
+<attachment_html>
+{pdf_html}
+</attachment_html>
+"""
+    return ChatPromptTemplate.from_messages(
+        [
+            SystemMessage(content=instructions),
+            ("human", "Declaration details:\n{declaration_details}"),
+        ]
+    )
+
+
+@cache
+def order_prompt(order_number: int) -> ChatPromptTemplate:
+    """Return the prompt for a transport order in the style of example ``order_number``.
+
+    Orders 1 and 6 have no PDF attachment. Variables: ``transport_details``.
+    """
+    email_html = load_template(f"order_{order_number}_email.html").example()
+
+    if order_number in [1, 6]:
+        instructions = f"""Generate a fake transport order email based on the transport details you are given.
+
+IMPORTANT: Replace ALL references in the HTML template with the actual data provided:
+- Replace all company names, addresses, contact details with the sender's information
+- Replace order numbers, dates, and transport details with realistic values
+- Replace any placeholder text with appropriate content based on the transport order
+- Ensure the email appears to come from the sender company
+- If no pickup, delivery or stops information is provided, DO NOT INCLUDE it in the email!
+
+The transport is send to the following logistics company:
+{VECTRANS_ADDRESS}
+
+Create an email body in the following style:
+<body_html>
+{email_html}
+</body_html>
+
+<attachment_html>
+no attachment
+</attachment_html>
+"""
+    else:
+        pdf_html = load_template(f"order_{order_number}_pdf.html").example()
+        instructions = f"""Generate a fake transport order email based on the transport details you are given.
+
+IMPORTANT: Replace ALL references in BOTH the email HTML and attachment HTML templates with the actual data:
+- Replace all company names, addresses, contact details with the sender's information
+- Replace order numbers, dates, and transport details with realistic values
+- Replace any placeholder text with appropriate content based on the transport order
+- Ensure both the email and PDF attachment appear to come from the sender company
+- Make sure the attachment contains detailed transport information matching the email
+
+Create an email body and attachment in the following style:
+<body_html>
+{email_html}
+</body_html>
+
+<attachment_html>
+{pdf_html}
+</attachment_html>
+"""
+
+    return ChatPromptTemplate.from_messages(
+        [
+            SystemMessage(content=instructions),
+            ("human", "Transport details:\n{transport_details}"),
+        ]
+    )
+
+
+def _slot_template_names(kind: Literal["order", "customs"], number: int) -> list[str]:
+    """Return the templates an order or customs email of example ``number`` uses."""
+    names = [f"{kind}_{number}_email.html"]
+    # Order 1 and 6 don't have a PDF template
+    if kind == "customs" or number not in [1, 6]:
+        names.append(f"{kind}_{number}_pdf.html")
+    return names
+
+
+def _slot_defaults(kind: Literal["order", "customs"], number: int) -> dict[str, str]:
+    """Return every slot of the templates with its example value as plain text."""
+    defaults: dict[str, str] = {}
+    for name in _slot_template_names(kind, number):
+        for slot, default in load_template(name).defaults.items():
+            text = re.sub(r"<br\s*/?>", "\n", default)
+            text = html.unescape(re.sub(r"<[^>]+>", "", text))
+            lines = [line.strip() for line in text.splitlines() if line.strip()]
+            defaults.setdefault(slot, " / ".join(lines))
+    return dict(sorted(defaults.items()))
+
+
+@cache
+def slot_schema(kind: Literal["order", "customs"], number: int) -> type[BaseModel]:
+    """Return the structured output for the slots of an order or customs example.
+
+    A subject plus one optional text field per slot; slots left empty keep the
+    value derived from the fake data.
+    """
+    fields = {
+        "subject": (str, Field(description="The subject of the email")),
+    }
+    for slot, default in _slot_defaults(kind, number).items():
+        fields[slot] = (
+            str | None,
+            Field(default=None, description=f"Plain text, e.g. {default!r}"),
+        )
+    return create_model(f"{kind.capitalize()}{number}Slots", **fields)
+
+
+@cache
+def slot_prompt(kind: Literal["order", "customs"], number: int) -> ChatPromptTemplate:
+    """Return the prompt asking only for the slot values of an example.
+
+    The HTML is rendered locally from the template, so the model writes a few
+    hundred tokens instead of whole documents. Variables: ``details``.
+    """
+    if kind == "order":
+        description = "a transport order email sent to the logistics company"
+        subject = "Transport order TO-482913"
+    else:
+        description = (
+            "an email with customs export documents sent to the logistics company"
+        )
+        subject = "Documents RF002745"
+
+    slots = "\n".join(
+        f"- {slot}: {default}" for slot, default in _slot_defaults(kind, number).items()
+    )
+    instructions = f"""You fill in the fields of {description}.
+
+The email and its attachment are rendered from a fixed HTML template, you only provide the values:
+- Write a short, abstract subject (e.g., "{subject}")
+- Give every field a value consistent with the details you are given
+- Invent realistic values (references, dates, prices) where the details have none
+- Use plain text without HTML, put each line of an address on its own line
+
+The recipient is:
+{VECTRANS_ADDRESS}
+
+Fields, with an example value:
+{slots}
+"""
+    return ChatPromptTemplate.from_messages(
+        [SystemMessage(content=instructions), ("human", "Details:\n{details}")]
+    )
+
+
+QUESTION_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        SystemMessage(
+            content="You are an assistant that generates fake emails. The emails are meant for Vectrix Logistcs NV"
+        ),
+        (
+            "human",
+            "Generate a fake question email based on the following data. "
+            "Write all details in the body.\n\n{question}",
+        ),
+    ]
+)
+
+COMPLAINT_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        SystemMessage(
+            content="You are an assistant that generates fake emails. The emails are meant for Vectrix Logistcs NV"
+        ),
+        (
+            "human",
+            "Generate a fake complaint email based on the following data. "
+            "Write all details in the body.\n\n{complaint}",
+        ),
+    ]
+)
+
+PRICE_REQUEST_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        SystemMessage(
+            content="""You are an assistant that generates fake price negotiation emails for transport services. The emails are meant for Vectrix Logistics NV
+
+Generate professional price negotiation emails. Use the exact company details and signature provided, include the price negotiation message naturally in the email body and end with the complete signature block provided."""
+        ),
+        (
+            "human",
+            """IMPORTANT:
+- Write in {language} language
+- Include the transport route: {origin} to {destination}
+- Include the transport date: {transport_date}
+- Make the subject abstract but related to price inquiry (e.g., "Transport inquiry {origin}-{destination}")
+
+Price request details:
+{formatted_message}""",
+        ),
+    ]
+)
+
+WAITING_COSTS_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        SystemMessage(
+            content="""You are an assistant that generates fake dispute emails responding to waiting cost charges from Vectrans logistics company. The emails should professionally dispute the charges while maintaining a business relationship.
+
+Vectrans is charging waiting costs for a delivery issue and the customer is disputing these charges. Use the exact dispute message and signature provided, include the reference numbers in the email and maintain a professional but firm tone."""
+        ),
+        (
+            "human",
+            """IMPORTANT:
+- Write in {language} language
+- Make the subject reference the delivery issue (e.g., "RE: Waiting costs - Delivery {delivery_date} {delivery_city}")
+
+Waiting costs scenario:
+- Delivery location: {delivery_city} - {destination_company}
+- Delivery date: {delivery_date}
+- Order reference: {order_ref}
+- Delivery reference: {delivery_ref}
+- Tracking: {tracking_ref}
+- Issue: Driver could not unload because {waiting_reason}
+- Waiting time: {waiting_hours} hours
+- Charged amount: {total_cost}€
+
+Dispute response:
+{formatted_message}""",
+        ),
+    ]
+)
+
+UPDATE_ORDER_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        SystemMessage(
+            content="""You are an assistant that generates fake update request emails about existing transport orders. The emails are meant for Vectrans NV
+
+Generate brief professional emails asking for an update about a transport order. Keep the email very brief and direct and use the exact greeting, question, and signature provided. The body should contain only the greeting, question, and signature. Do NOT add extra explanations or context."""
+        ),
+        (
+            "human",
+            """IMPORTANT:
+- Write in {language} language
+- Make the subject reference the order (e.g., "Order {order_ref} - Update request" or "Transport {tracking_ref} - Information needed")
+
+Order references:
+- Order: {order_ref}
+- Tracking: {tracking_ref}
+
+Email content:
+{formatted_message}""",
+        ),
+    ]
+)
+
+PROMOTIONAL_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        SystemMessage(
+            content="""You are an assistant that generates fake promotional emails for logistics and transport services. The emails are meant for Vectrans NV to promote their services.
+
+Generate professional promotional emails. Use the promotional title as inspiration for the subject line, include the promotional content, benefit, and call-to-action, add the validity period prominently, use professional but engaging marketing language and end with the complete signature provided. Make it look like a real promotional email from a logistics company."""
+        ),
+        (
+            "human",
+            """IMPORTANT:
+- Create an engaging promotional email in {language} language
+
+Promotional content:
+- Title: {promo_title}
+- Content: {promo_content}
+- Key benefit: {promo_benefit}
+- Call to action: {promo_cta}
+- Validity: {validity}
+
+Sender:
+{signature}""",
+        ),
+    ]
+)
@@ -0,0 +1,301 @@
+"""Stream generated emails and their ground truth to a sharded corpus on disk."""
+
+import asyncio
+import gzip
+import io
+import json
+import lzma
+import os
+import tarfile
+import threading
+import time
+from email.generator import BytesGenerator
+from email.message import EmailMessage
+from pathlib import Path
+from typing import IO, Any
+
+from phantommail.logger import setup_logger
+from phantommail.models.email import FullEmail
+from phantommail.transports.mime import to_mime
+
+logger = setup_logger(__name__)
+
+# Formats accepted by ``CorpusExporter``
+EXPORT_FORMATS = ("jsonl", "mbox", "eml")
+
+# Compressions accepted by ``CorpusExporter``, with their file extension
+COMPRESSIONS = {"gzip": ".gz", "xz": ".xz", "none": ""}
+
+# Suffix of the emails file of a shard, per format
+SHARD_SUFFIXES = {"jsonl": ".jsonl", "mbox": ".mbox", "eml": ".tar"}
+
+
+def _record(email: FullEmail, message_id: str, email_type: str | None) -> dict:
+    """Return the JSONL record of an email, attachments base64-encoded."""
+    return {
+        "message_id": message_id,
+        "email_type": email_type,
+        "sender": email.sender,
+        "to": email.to,
+        "cc": email.cc,
+        "subject": email.subject,
+        "body_html": email.body_html,
+        "attachments": [
+            {
+                "filename": attachment.filename,
+                "content_type": attachment.content_type,
+                "content": attachment.to_base64(),
+            }
+            for attachment in email.attachments or []
+        ],
+    }
+
+
+def _json_line(record: dict) -> bytes:
+    """Encode ``record`` as one JSONL line, dates and decimals as strings."""
+    return (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode()
+
+
+class _Shard:
+    """The open files of one shard, written as ``.part`` until complete."""
+
+    def __init__(self, paths: list[Path], compression: str, tar: bool):
+        self.paths = paths
+        self.files: list[IO[bytes]] = []
+        for path in paths:
+            part = path.with_name(path.name + ".part")
+            if compression == "gzip":
+                self.files.append(gzip.open(part, "wb"))
+            elif compression == "xz":
+                self.files.append(lzma.open(part, "wb"))
+            else:
+                self.files.append(open(part, "wb"))
+        # Stream mode writes every member as it comes, nothing is kept around
+        self.tar = tarfile.open(fileobj=self.files[0], mode="w|") if tar else None
+        self.emails = 0
+
+    @property
+    def out(self) -> IO[bytes]:
+        """The emails file."""
+        return self.files[0]
+
+    @property
+    def truth(self) -> IO[bytes]:
+        """The ground truth file, the emails file itself for JSONL."""
+        return self.files[-1]
+
+    def close(self) -> None:
+        """Finish the files and give them their final names."""
+        if self.tar is not None:
+            self.tar.close()
+        for path, file in zip(self.paths, self.files, strict=True):
+            file.close()
+            path.with_name(path.name + ".part").replace(path)
+
+
+class CorpusExporter:
+    """Write generated emails to a sharded, compressed corpus, one at a time.
+
+    Every ``shard_size`` emails go to a new shard. With "jsonl" a shard is one
+    JSONL file holding the email fields, the attachments base64-encoded and
+    the ``ground_truth`` the email was written from, e.g. the transport order
+    or customs declaration. With "mbox" the emails of a shard form an mbox
+    file, and with "eml" they are .eml members of a tar archive; both come
+    with a ground truth JSONL file matching the emails on their Message-ID.
+    Files are written under a ``.part`` name until their shard is complete,
+    and ``manifest.json`` lists the complete shards.
+
+    Emails are written as they arrive, so memory does not grow with the size
+    of the corpus. An export into a directory holding one continues after
+    its last shard.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        format: str = "jsonl",
+        shard_size: int = 1000,
+        compression: str = "gzip",
+    ):
+        """Initialize the exporter, creating the directory if missing.
+
+        Args:
+            directory: Where the shards and the manifest are written.
+            format: "jsonl", "mbox" or "eml".
+            shard_size: Emails per shard.
+            compression: "gzip", "xz" or "none".
+
+        """
+        if format not in EXPORT_FORMATS:
+            raise ValueError(
+                f"Unknown export format {format!r}, "
+                f"expected one of {', '.join(EXPORT_FORMATS)}"
+            )
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression {compression!r}, "
+                f"expected one of {', '.join(COMPRESSIONS)}"
+            )
+        if shard_size < 1:
+            raise ValueError("shard_size must be at least 1")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.format = format
+        self.shard_size = shard_size
+        self.compression = compression
+        self.exported = 0
+        self._manifest = self._read_manifest()
+        self._next_shard = len(self._manifest["shards"])
+        self._shard: _Shard | None = None
+        # Emails are written from worker threads, one at a time
+        self._lock = threading.Lock()
+
+    def _read_manifest(self) -> dict[str, Any]:
+        """Return the manifest of the corpus already in the directory, if any."""
+        path = self.directory / "manifest.json"
+        if path.exists():
+            manifest = json.loads(path.read_text())
+            if (manifest["format"], manifest["compression"]) != (
+                self.format,
+                self.compression,
+            ):
+                raise ValueError(
+                    f"{self.directory} holds a {manifest['format']} corpus "
+                    f"compressed with {manifest['compression']}"
+                )
+            return manifest
+        return {
+            "format": self.format,
+            "compression": self.compression,
+            "emails": 0,
+            "shards": [],
+        }
+
+    def _open_shard(self) -> _Shard:
+        """Start the next shard."""
+        number = self._next_shard
+        self._next_shard += 1
+        extension = COMPRESSIONS[self.compression]
+        paths = [
+            self.directory
+            / f"emails-{number:05d}{SHARD_SUFFIXES[self.format]}{extension}"
+        ]
+        if self.format != "jsonl":
+            paths.append(self.directory / f"ground-truth-{number:05d}.jsonl{extension}")
+        return _Shard(paths, self.compression, tar=self.format == "eml")
+
+    def _close_shard(self) -> None:
+        """Complete the current shard and record it in the manifest."""
+        shard, self._shard = self._shard, None
+        if shard is None:
+            return
+        shard.close()
+        entry = {"emails": shard.paths[0].name, "count": shard.emails}
+        if len(shard.paths) > 1:
+            entry["ground_truth"] = shard.paths[1].name
+        self._manifest["shards"].append(entry)
+        self._manifest["emails"] += shard.emails
+        manifest = self.directory / "manifest.json"
+        temporary = manifest.with_suffix(".tmp")
+        temporary.write_text(json.dumps(self._manifest, indent=2))
+        temporary.replace(manifest)
+
+    def _write_message(self, shard: _Shard, message: EmailMessage) -> str | None:
+        """Write ``message`` to an mbox or tar shard, returning its member name."""
+        if self.format == "mbox":
+            shard.out.write(
+                f"From MAILER-DAEMON {time.asctime(time.gmtime())}\n".encode()
+            )
+            # Body lines starting with "From " are quoted, as mbox readers expect
+            BytesGenerator(
+                shard.out, mangle_from_=True, policy=message.policy.clone(linesep="\n")
+            ).flatten(message)
+            shard.out.write(b"\n")
+            return None
+        data = bytes(message)
+        name = f"{self.exported:08d}.eml"
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        shard.tar.addfile(info, io.BytesIO(data))
+        return name
+
+    def _write(
+        self, email: FullEmail, email_type: str | None, ground_truth: dict | None
+    ) -> str:
+        """Append one email to the current shard, see ``write``."""
+        message = to_mime(email)
+        message_id = message["Message-ID"]
+        with self._lock:
+            if self._shard is None:
+                self._shard = self._open_shard()
+            shard = self._shard
+            if self.format == "jsonl":
+                record = _record(email, message_id, email_type)
+                shard.out.write(_json_line({**record, "ground_truth": ground_truth}))
+            else:
+                if email_type is not None:
+                    message["X-PhantomMail-Type"] = email_type
+                name = self._write_message(shard, message)
+                truth = {"message_id": message_id, "email_type": email_type}
+                if name is not None:
+                    truth["file"] = name
+                shard.truth.write(_json_line({**truth, "ground_truth": ground_truth}))
+            shard.emails += 1
+            self.exported += 1
+            if shard.emails >= self.shard_size:
+                self._close_shard()
+        return message_id
+
+    async def write(
+        self,
+        email: FullEmail,
+        email_type: str | None = None,
+        ground_truth: dict | None = None,
+    ) -> str:
+        """Add ``email`` to the corpus and return its Message-ID.
+
+        Args:
+            email: The generated email, attachments rendered.
+            email_type: The type it was generated as.
+            ground_truth: The fake data it was written from.
+
+        """
+        return await asyncio.to_thread(self._write, email, email_type, ground_truth)
+
+    async def aclose(self) -> None:
+        """Complete the last shard."""
+        await asyncio.to_thread(self._close)
+
+    def _close(self) -> None:
+        """Complete the last shard under the lock."""
+        with self._lock:
+            self._close_shard()
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary."""
+        return (
+            f"{self.exported} email(s) to {len(self._manifest['shards'])} "
+            f"{self.format} shard(s) in {self.directory}"
+        )
+
+
+def create_exporter(
+    directory: str | Path | None,
+    format: str = "jsonl",
+    shard_size: int | None = None,
+    compression: str | None = None,
+) -> CorpusExporter | None:
+    """Create the corpus exporter, or None without a directory.
+
+    ``EXPORT_SHARD_SIZE`` (default 1000) and ``EXPORT_COMPRESSION`` (default
+    gzip) apply when not given.
+    """
+    if directory is None:
+        return None
+    return CorpusExporter(
+        directory,
+        format,
+        shard_size or int(os.environ.get("EXPORT_SHARD_SIZE", "1000")),
+        compression or os.environ.get("EXPORT_COMPRESSION", "gzip"),
+    )
@@ -0,0 +1,133 @@
+import itertools
+import os
+import threading
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from phantommail.logger import setup_logger
+from phantommail.models.email import Attachment
+
+logger = setup_logger(__name__)
+
+
+class BufferedEmail(BaseModel):
+    """A generated email waiting in the buffer, with its attachments rendered."""
+
+    email_type: str = Field(..., description="The email type it was generated as")
+    subject: str = Field(..., description="The subject line of the email")
+    body_html: str = Field(..., description="The HTML content of the email body")
+    attachments: list[Attachment] = Field(
+        default_factory=list, description="The rendered attachments"
+    )
+    email_attributes: dict | None = Field(
+        None, description="The fake data the email was written from"
+    )
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        description="When the email was generated",
+    )
+
+
+class EmailBuffer:
+    """A bounded, persisted stock of ready-to-send emails per email type.
+
+    Every email is a JSON file in a directory per type, so the stock survives
+    restarts and can be filled by a separate producer process. An email is
+    claimed by renaming its file before reading it, which is atomic, so two
+    consumers never send the same email.
+    """
+
+    def __init__(self, directory: str | Path, capacity: int = 20):
+        """Initialize the buffer.
+
+        Args:
+            directory: Where the buffered emails are stored.
+            capacity: Maximum number of emails kept per type.
+
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.directory = Path(directory)
+        self.capacity = capacity
+        self.taken = 0
+        self._names = itertools.count()
+        self._lock = threading.Lock()
+
+    def _type_directory(self, email_type: str) -> Path:
+        """Return the directory holding the emails of one type."""
+        return self.directory / email_type
+
+    def _files(self, email_type: str) -> list[Path]:
+        """Return the buffered emails of a type, oldest first."""
+        directory = self._type_directory(email_type)
+        if not directory.is_dir():
+            return []
+        return sorted(directory.glob("*.json"))
+
+    def count(self, email_type: str) -> int:
+        """Return the number of emails of ``email_type`` in the buffer."""
+        return len(self._files(email_type))
+
+    def deficits(self, email_types: list[str]) -> dict[str, int]:
+        """Return how many emails each type is short of the capacity."""
+        return {
+            email_type: self.capacity - self.count(email_type)
+            for email_type in email_types
+        }
+
+    def put(self, email: BufferedEmail) -> bool:
+        """Store an email, returning False when its type is already full."""
+        with self._lock:
+            if self.count(email.email_type) >= self.capacity:
+                return False
+            directory = self._type_directory(email.email_type)
+            directory.mkdir(parents=True, exist_ok=True)
+            # Names sort by creation time, so the oldest email is taken first
+            name = f"{time.time_ns():020d}-{os.getpid()}-{next(self._names)}"
+            temporary = directory / f"{name}.tmp"
+            temporary.write_text(email.model_dump_json())
+            temporary.replace(directory / f"{name}.json")
+            return True
+
+    def take(self, email_type: str) -> BufferedEmail | None:
+        """Remove and return the oldest email of ``email_type``, None if empty."""
+        for path in self._files(email_type):
+            claimed = path.with_suffix(".taken")
+            try:
+                path.rename(claimed)
+            except FileNotFoundError:
+                # Claimed by another consumer in the meantime
+                continue
+            try:
+                email = BufferedEmail.model_validate_json(claimed.read_text())
+            except ValueError as error:
+                logger.warning(f"Dropping unreadable buffered email {path}: {error}")
+                continue
+            finally:
+                claimed.unlink(missing_ok=True)
+            self.taken += 1
+            return email
+        return None
+
+
+_buffer: EmailBuffer | None = None
+
+
+def get_email_buffer() -> EmailBuffer:
+    """Return the process-wide email buffer.
+
+    Configured through ``EMAIL_BUFFER_DIR`` and ``EMAIL_BUFFER_SIZE`` (emails
+    kept per type, default 20).
+    """
+    global _buffer
+    if _buffer is None:
+        directory = os.environ.get(
+            "EMAIL_BUFFER_DIR", Path.home() / ".cache" / "phantommail" / "buffer"
+        )
+        _buffer = EmailBuffer(
+            directory, capacity=int(os.environ.get("EMAIL_BUFFER_SIZE", "20"))
+        )
+    return _buffer
@@ -1,16 +1,187 @@
-import base64
+import asyncio
+import os
+import time
 
-from playwright.async_api import async_playwright
+from playwright.async_api import Browser, Playwright, async_playwright
 
+from phantommail.helpers.pdf_cache import get_pdf_cache
+from phantommail.logger import setup_logger
 
-async def create_pdf(html_content: str) -> str:
-    """Convert HTML content to PDF bytes and encode as base64 string using Playwright.
+logger = setup_logger(__name__)
+
+# Generate PDF with A4 format and no margins (handled by CSS)
+PDF_OPTIONS = {
+    "format": "A4",
+    "margin": {"top": "0", "right": "0", "bottom": "0", "left": "0"},
+    "print_background": True,  # Include CSS backgrounds
+    "scale": 1.0,
+}
+
+
+class _BrowserSlot:
+    """A launched Chromium browser and its bookkeeping."""
+
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.renders = 0
+        self.active = 0
+        self.retired = False
+
+
+class PdfRenderer:
+    """Long-lived HTML to PDF renderer backed by a shared headless Chromium.
+
+    Chromium is launched once and reused for every render. Each render gets its
+    own browser context, and the number of renders in flight is bounded by
+    ``max_pages``. The browser is recycled after ``max_renders_per_browser``
+    renders or when it crashes; retired browsers are closed once the renders
+    still using them have finished.
+    """
+
+    def __init__(self, max_pages: int = 4, max_renders_per_browser: int = 200):
+        """Initialize the renderer.
+
+        Args:
+            max_pages: Maximum number of pages rendering concurrently.
+            max_renders_per_browser: Number of renders after which the browser
+                is replaced by a fresh one.
+
+        """
+        if max_pages < 1:
+            raise ValueError("max_pages must be at least 1")
+        self.max_pages = max_pages
+        self.max_renders_per_browser = max_renders_per_browser
+        self._playwright: Playwright | None = None
+        self._slot: _BrowserSlot | None = None
+        self._launch_lock = asyncio.Lock()
+        self._pages = asyncio.Semaphore(max_pages)
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        """Return a usable browser, launching or recycling it when needed."""
+        async with self._launch_lock:
+            slot = self._slot
+            if slot is not None and (
+                not slot.browser.is_connected()
+                or slot.renders >= self.max_renders_per_browser
+            ):
+                await self._retire(slot)
+                slot = None
+
+            if slot is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                browser = await self._playwright.chromium.launch(headless=True)
+                slot = _BrowserSlot(browser)
+                self._slot = slot
+                logger.info("Launched Chromium for PDF rendering")
+
+            slot.renders += 1
+            slot.active += 1
+            return slot
+
+    async def _retire(self, slot: _BrowserSlot) -> None:
+        """Take a browser out of rotation and close it once it is idle."""
+        slot.retired = True
+        if self._slot is slot:
+            self._slot = None
+        if slot.active == 0:
+            await self._close_browser(slot)
+
+    async def _release_slot(self, slot: _BrowserSlot) -> None:
+        """Mark a render on ``slot`` as finished."""
+        slot.active -= 1
+        if slot.retired and slot.active == 0:
+            await self._close_browser(slot)
+
+    @staticmethod
+    async def _close_browser(slot: _BrowserSlot) -> None:
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            logger.warning(f"Error while closing Chromium: {e}")
+
+    async def render(self, html: str, **pdf_options) -> bytes:
+        """Render a full HTML document to PDF bytes.
+
+        A crashed browser is replaced and the render is retried once.
+
+        Args:
+            html: The HTML document to render.
+            **pdf_options: Keyword arguments passed to ``page.pdf``.
+
+        Returns:
+            bytes: The rendered PDF.
+
+        """
+        async with self._pages:
+            for attempt in (1, 2):
+                slot = await self._acquire_slot()
+                try:
+                    context = await slot.browser.new_context()
+                    try:
+                        page = await context.new_page()
+                        await page.set_content(html)
+                        return await page.pdf(**pdf_options)
+                    finally:
+                        if slot.browser.is_connected():
+                            await context.close()
+                except Exception:
+                    crashed = not slot.browser.is_connected()
+                    if crashed:
+                        async with self._launch_lock:
+                            await self._retire(slot)
+                    if not crashed or attempt == 2:
+                        raise
+                    logger.warning("Chromium crashed, relaunching and retrying")
+                finally:
+                    await self._release_slot(slot)
+
+    async def close(self) -> None:
+        """Close the browser and stop Playwright."""
+        async with self._launch_lock:
+            if self._slot is not None:
+                await self._retire(self._slot)
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+
+_renderer: PdfRenderer | None = None
+
+
+def get_renderer() -> PdfRenderer:
+    """Return the process-wide PDF renderer, creating it on first use.
+
+    The pool size and recycle interval are read from the ``PDF_POOL_SIZE`` and
+    ``PDF_MAX_RENDERS_PER_BROWSER`` environment variables.
+    """
+    global _renderer
+    if _renderer is None:
+        _renderer = PdfRenderer(
+            max_pages=int(os.environ.get("PDF_POOL_SIZE", "4")),
+            max_renders_per_browser=int(
+                os.environ.get("PDF_MAX_RENDERS_PER_BROWSER", "200")
+            ),
+        )
+    return _renderer
+
+
+async def shutdown_renderer() -> None:
+    """Close the process-wide PDF renderer if it was started."""
+    global _renderer
+    if _renderer is not None:
+        renderer, _renderer = _renderer, None
+        await renderer.close()
+
+
+async def create_pdf(html_content: str) -> bytes:
+    """Convert HTML content to PDF bytes using Playwright.
 
     Args:
         html_content (str): The HTML content to convert
 
     Returns:
-        str: Base64 encoded PDF string
+        bytes: The rendered PDF
 
     """
     # Add CSS for A4 page format and table scaling
@@ -51,29 +222,18 @@ async def create_pdf(html_content: str) -> str:
         </html>
     """
 
-    # Use async Playwright API
-    async with async_playwright() as p:
-        # Launch headless Chromium browser
-        browser = await p.chromium.launch(headless=True)
+    # Identical documents are served from the render cache, whose disk tier
+    # is read and written in a worker thread to keep the event loop free
+    cache = get_pdf_cache()
+    key = cache.make_key(a4_styled_html, PDF_OPTIONS) if cache is not None else None
+    pdf_bytes = await asyncio.to_thread(cache.get, key) if cache is not None else None
 
-        try:
-            # Create a new page
-            page = await browser.new_page()
-
-            # Set the HTML content
-            await page.set_content(a4_styled_html)
-
-            # Generate PDF with A4 format and no margins (handled by CSS)
-            pdf_bytes = await page.pdf(
-                format="A4",
-                margin={"top": "0", "right": "0", "bottom": "0", "left": "0"},
-                print_background=True,  # Include CSS backgrounds
-                scale=1.0,
+    if pdf_bytes is None:
+        started = time.perf_counter()
+        pdf_bytes = await get_renderer().render(a4_styled_html, **PDF_OPTIONS)
+        if cache is not None:
+            await asyncio.to_thread(
+                cache.put, key, pdf_bytes, time.perf_counter() - started
             )
 
-            # Encode PDF bytes to base64
-            return base64.b64encode(pdf_bytes).decode("utf-8")
-
-        finally:
-            # Ensure browser is closed
-            await browser.close()
+    return pdf_bytes
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from phantommail.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Fraction of its budget the disk tier is trimmed to once it grows past it, so
+# an eviction makes room for many renders instead of one
+DISK_LOW_WATER = 0.9
+
+
+@dataclass
+class PdfCacheStats:
+    """Hit/miss counters for the PDF render cache."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    render_seconds: float = 0.0
+
+    @property
+    def hits(self) -> int:
+        """Total number of cache hits across both tiers."""
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def saved_seconds(self) -> float:
+        """Estimated render time saved, based on the mean render time of misses."""
+        if self.misses == 0:
+            return 0.0
+        return self.hits * self.render_seconds / self.misses
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary."""
+        return (
+            f"{self.hits} hit(s) ({self.memory_hits} memory, {self.disk_hits} disk), "
+            f"{self.misses} miss(es), ~{self.saved_seconds:.1f}s render time saved"
+        )
+
+
+class PdfCache:
+    """Content-addressed cache for rendered PDFs.
+
+    Entries are keyed by a hash of the final HTML document and the render
+    options. A small in-memory LRU sits in front of a size-bounded directory on
+    disk; the disk tier evicts the least recently used files (by mtime, which
+    is refreshed on every hit) once it grows past ``max_disk_bytes``, down to
+    ``DISK_LOW_WATER`` of it. The cache may be used from worker threads.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None,
+        max_disk_bytes: int = 512 * 1024 * 1024,
+        max_memory_bytes: int = 64 * 1024 * 1024,
+    ):
+        """Initialize the cache.
+
+        Args:
+            directory: Directory for the disk tier, or None for memory only.
+            max_disk_bytes: Size budget for the disk tier.
+            max_memory_bytes: Size budget for the in-memory tier.
+
+        """
+        self.directory = Path(directory) if directory is not None else None
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_bytes = max_memory_bytes
+        self.stats = PdfCacheStats()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: dict[str, int] | None = None
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(html: str, options: dict) -> str:
+        """Return the cache key for an HTML document rendered with ``options``."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(html.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached PDF for ``key``, or None on a miss."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.stats.memory_hits += 1
+                return data
+
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                data = path.read_bytes()
+                os.utime(path)
+            except FileNotFoundError:
+                data = None
+            if data is not None:
+                self._remember(key, data)
+                with self._lock:
+                    self.stats.disk_hits += 1
+                return data
+
+        with self._lock:
+            self.stats.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes, render_seconds: float = 0.0) -> None:
+        """Store a rendered PDF in both tiers.
+
+        Args:
+            key: The key from ``make_key``.
+            data: The PDF bytes.
+            render_seconds: How long the render took, used for the saved-time estimate.
+
+        """
+        with self._lock:
+            self.stats.render_seconds += render_seconds
+        self._remember(key, data)
+        if self.directory is None:
+            return
+
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # A unique name per write, threads of one process may store the
+            # same key at once
+            tmp = tempfile.NamedTemporaryFile(
+                dir=path.parent, prefix=f"{key}.", suffix=".tmp", delete=False
+            )
+            try:
+                with tmp:
+                    tmp.write(data)
+                os.replace(tmp.name, path)
+            except OSError:
+                Path(tmp.name).unlink(missing_ok=True)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write PDF cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            index = self._load_disk_index()
+            self._disk_bytes += len(data) - index.get(key, 0)
+            index[key] = len(data)
+            if self._disk_bytes > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _remember(self, key: str, data: bytes) -> None:
+        """Insert into the memory tier, evicting least recently used entries."""
+        if len(data) > self.max_memory_bytes:
+            return
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= len(previous)
+            self._memory[key] = data
+            self._memory_bytes += len(data)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _load_disk_index(self) -> dict[str, int]:
+        """Scan the cache directory once to learn the size of the disk tier."""
+        if self._disk_index is None:
+            self._disk_index = {}
+            self._disk_bytes = 0
+            if self.directory.exists():
+                for path in self.directory.glob("*/*.pdf"):
+                    size = path.stat().st_size
+                    self._disk_index[path.stem] = size
+                    self._disk_bytes += size
+        return self._disk_index
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files down to the low-water mark."""
+        entries = []
+        for key in self._disk_index:
+            try:
+                entries.append((self._path(key).stat().st_mtime, key))
+            except FileNotFoundError:
+                entries.append((0.0, key))
+        entries.sort()
+
+        low_water = self.max_disk_bytes * DISK_LOW_WATER
+        for _, key in entries:
+            if self._disk_bytes <= low_water:
+                break
+            self._disk_bytes -= self._disk_index.pop(key)
+            self._path(key).unlink(missing_ok=True)
+
+
+_cache: PdfCache | None = None
+
+
+def get_pdf_cache() -> PdfCache | None:
+    """Return the process-wide PDF cache, or None when it is disabled.
+
+    Configured through ``PDF_CACHE`` ("off" disables it), ``PDF_CACHE_DIR``,
+    ``PDF_CACHE_MAX_MB`` and ``PDF_CACHE_MEMORY_MB``.
+    """
+    global _cache
+    if os.environ.get("PDF_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    if _cache is None:
+        directory = os.environ.get(
+            "PDF_CACHE_DIR", Path.home() / ".cache" / "phantommail" / "pdf"
+        )
+        _cache = PdfCache(
+            directory,
+            max_disk_bytes=int(os.environ.get("PDF_CACHE_MAX_MB", "512")) * 1024 * 1024,
+            max_memory_bytes=int(os.environ.get("PDF_CACHE_MEMORY_MB", "64"))
+            * 1024
+            * 1024,
+        )
+    return _cache
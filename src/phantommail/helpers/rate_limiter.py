@@ -0,0 +1,241 @@
+import asyncio
+import itertools
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from langchain_core.exceptions import ModelRateLimitError, ModelTimeoutError
+
+T = TypeVar("T")
+
+# HTTP statuses with which a service says it is overloaded
+OVERLOAD_STATUSES = (429, 503)
+
+
+class TokenBucket:
+    """Asyncio token bucket for pacing calls to an external service.
+
+    Tokens are added continuously at ``rate`` per second up to ``capacity``.
+    Each ``acquire`` takes one token, waiting until one is available. Waiters
+    are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        """Initialize the bucket.
+
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum burst size, defaults to ``max(1, rate)``.
+
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` are available and take them.
+
+        Raises:
+            ValueError: When ``tokens`` exceeds the capacity, as the bucket
+                never holds that many.
+
+        """
+        if tokens > self.capacity:
+            raise ValueError(
+                f"Cannot acquire {tokens} tokens from a bucket of {self.capacity}"
+            )
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+def _causes(error: BaseException):
+    """Yield ``error`` and the exceptions it was raised from.
+
+    Provider SDKs are wrapped by LangChain, e.g. a Gemini 429 arrives as a
+    ``ModelRateLimitError`` raised from the ``ClientError`` that holds the
+    status and the response headers.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        # Responses are passed in too, they have no cause
+        error = getattr(error, "__cause__", None) or getattr(error, "__context__", None)
+
+
+def _status(error: BaseException) -> int | None:
+    """Return the HTTP status an error or its cause carries, if any."""
+    for cause in _causes(error):
+        for source in (cause, getattr(cause, "response", None)):
+            for name in ("code", "status_code"):
+                value = getattr(source, name, None)
+                try:
+                    return int(value)
+                except (TypeError, ValueError):
+                    continue
+    return None
+
+
+def is_overload(error: BaseException) -> bool:
+    """Whether ``error`` is a rate limit, an overloaded service or a timeout."""
+    return (
+        isinstance(error, (TimeoutError, ModelRateLimitError, ModelTimeoutError))
+        or "Timeout" in type(error).__name__
+        or _status(error) in OVERLOAD_STATUSES
+    )
+
+
+def retry_after(error: BaseException) -> float | None:
+    """Return the seconds to wait that an error suggests, from Retry-After."""
+    value = None
+    for cause in _causes(error):
+        value = getattr(cause, "retry_after", None)
+        if value is not None:
+            break
+        for source in (cause, getattr(cause, "response", None)):
+            headers = getattr(source, "headers", None) or {}
+            value = next(
+                (v for k, v in headers.items() if k.lower() == "retry-after"), None
+            )
+            if value is not None:
+                break
+        if value is not None:
+            break
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that follows the capacity of an external service.
+
+    The limit grows while the p95 latency of recent calls stays under
+    ``target_latency``: by one per call until the first back-off (slow start),
+    then by one per ``limit`` calls. A rate limit, overload or timeout cuts it
+    by ``backoff`` and, with a Retry-After, pauses new calls for that long.
+    Calls started before a back-off do not cut the limit again.
+    """
+
+    def __init__(
+        self,
+        maximum: int,
+        target_latency: float | None = None,
+        minimum: int = 1,
+        backoff: float = 0.5,
+        retries: int = 3,
+        window: int = 50,
+    ):
+        """Initialize the limiter.
+
+        Args:
+            maximum: Highest number of calls in flight.
+            target_latency: p95 latency in seconds above which the limit stops
+                growing, or None to grow until the service pushes back.
+            minimum: Lowest number of calls in flight, also the initial limit.
+            backoff: Factor the limit is multiplied by on overload.
+            retries: Times ``run`` repeats a call rejected by overload.
+            window: Number of recent latencies the p95 is taken over.
+
+        """
+        if not 1 <= minimum <= maximum:
+            raise ValueError("limits must satisfy 1 <= minimum <= maximum")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+        self.maximum = maximum
+        self.minimum = minimum
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.retries = retries
+        self.limit = float(minimum)
+        self.in_flight = 0
+        self.backoffs = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._slow_start = True
+        self._paused_until = 0.0
+        self._last_backoff = float("-inf")
+        self._released = asyncio.Event()
+
+    @property
+    def current(self) -> int:
+        """The number of calls currently allowed in flight."""
+        return int(self.limit)
+
+    def p95(self) -> float:
+        """Return the p95 latency of the recent successful calls."""
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    async def acquire(self) -> float:
+        """Wait for a free slot and take it, returning the start time of the call."""
+        while True:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            if self.in_flight < self.current:
+                self.in_flight += 1
+                return now
+            self._released.clear()
+            await self._released.wait()
+
+    def release(self, started: float, error: BaseException | None = None) -> None:
+        """Free the slot of a call and adapt the limit to how it went."""
+        self.in_flight -= 1
+        now = time.monotonic()
+        if error is None:
+            self._latencies.append(now - started)
+            if self.target_latency is None or self.p95() <= self.target_latency:
+                step = 1.0 if self._slow_start else 1.0 / self.limit
+                self.limit = min(float(self.maximum), self.limit + step)
+            else:
+                self._slow_start = False
+        elif is_overload(error):
+            if started >= self._last_backoff:
+                self.limit = max(float(self.minimum), self.limit * self.backoff)
+                self._slow_start = False
+                self._last_backoff = now
+                self.backoffs += 1
+            delay = retry_after(error)
+            if delay:
+                self._paused_until = max(self._paused_until, now + delay)
+        self._released.set()
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Run ``call`` in a slot, retrying it when the service is overloaded."""
+        for attempt in itertools.count():
+            started = await self.acquire()
+            try:
+                result = await call()
+            except BaseException as error:
+                # Cancellations only free the slot, they say nothing about load
+                self.release(started, error)
+                if attempt >= self.retries or not is_overload(error):
+                    raise
+                continue
+            self.release(started)
+            return result
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary."""
+        return (
+            f"limit {self.current}, p95 {self.p95():.1f}s, {self.backoffs} back-off(s)"
+        )
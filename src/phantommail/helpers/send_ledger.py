@@ -0,0 +1,347 @@
+"""Durable record of the emails of a run, so a stopped run can be resumed."""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from phantommail.logger import setup_logger
+from phantommail.models.email import FullEmail
+from phantommail.transports.base import DeliveryError
+
+logger = setup_logger(__name__)
+
+# Statuses after which an email is not sent again
+FINISHED = ("sent", "dead")
+
+
+@dataclass
+class LedgerRun:
+    """A run recorded in the ledger."""
+
+    run_id: str
+    selection: dict
+    seed: int | None
+
+
+@dataclass
+class LedgerEntry:
+    """The ledger row of one planned email."""
+
+    index: int
+    email_type: str
+    key: str
+    status: str
+    stored: bool
+
+
+class SendLedger:
+    """SQLite (WAL) ledger of every planned email and its send status.
+
+    A run records its selection and the email type of every email up front,
+    each under an idempotency key that the transports pass on to the mail
+    service. Before an email is sent its generated subject, body,
+    attachments and the fake data it was written from are stored, and
+    afterwards its message id, so a resumed run
+    skips what was sent and sends what was generated as is, under the same
+    key. An email that failed permanently, or ``max_attempts`` times, moves
+    to the dead letters and is not retried.
+
+    Writes are queued and committed together, once ``batch_size`` are
+    waiting or ``flush_interval`` seconds after the first. Storing a
+    generated email and recording a send wait for their commit, which they
+    share with every other write waiting at that moment, so the ledger never
+    runs behind the sends and a sent email is never sent again on resume.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        batch_size: int = 256,
+        flush_interval: float = 0.5,
+        max_attempts: int = 3,
+    ):
+        """Initialize the ledger.
+
+        Args:
+            path: The SQLite database file, created if missing.
+            batch_size: Queued writes that trigger a commit.
+            flush_interval: Seconds a queued write waits at most.
+            max_attempts: Failed attempts after which an email is dead.
+
+        """
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.commits = 0
+        self.writes = 0
+        self._pending: list[tuple[str, tuple, asyncio.Future | None]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flushing: asyncio.Task | None = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "run_id TEXT PRIMARY KEY, selection TEXT NOT NULL, seed INTEGER, "
+            "created REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS emails ("
+            "key TEXT PRIMARY KEY, run_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "email_type TEXT NOT NULL, status TEXT NOT NULL, email TEXT, "
+            "message_id TEXT, attempts INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "updated REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS emails_run ON emails (run_id, idx);"
+            "CREATE TABLE IF NOT EXISTS dead_letters ("
+            "key TEXT PRIMARY KEY, run_id TEXT NOT NULL, idx INTEGER NOT NULL, "
+            "email_type TEXT NOT NULL, email TEXT, error TEXT, "
+            "failed REAL NOT NULL);"
+        )
+        columns = {
+            row[1] for row in self._connection.execute("PRAGMA table_info(emails)")
+        }
+        # Ledgers created before the fake data was stored lack its column
+        if "attributes" not in columns:
+            self._connection.execute("ALTER TABLE emails ADD COLUMN attributes TEXT")
+
+    @staticmethod
+    def key(run_id: str, index: int) -> str:
+        """Return the idempotency key of email ``index`` of a run."""
+        return f"{run_id}-{index}"
+
+    def start_run(
+        self, selection: dict, email_types: list[str], seed: int | None = None
+    ) -> str:
+        """Record a new run and its planned emails, returning the run id."""
+        run_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                "INSERT INTO runs (run_id, selection, seed, created) "
+                "VALUES (?, ?, ?, ?)",
+                (run_id, json.dumps(selection), seed, now),
+            )
+            self._connection.executemany(
+                "INSERT INTO emails (key, run_id, idx, email_type, status, updated) "
+                "VALUES (?, ?, ?, ?, 'planned', ?)",
+                (
+                    (self.key(run_id, index), run_id, index, email_type, now)
+                    for index, email_type in enumerate(email_types)
+                ),
+            )
+            self._connection.execute("COMMIT")
+        return run_id
+
+    def run(self, run_id: str | None = None) -> LedgerRun | None:
+        """Return the run ``run_id``, by default the latest one."""
+        query = "SELECT run_id, selection, seed FROM runs "
+        with self._lock:
+            if run_id is None:
+                row = self._connection.execute(
+                    query + "ORDER BY created DESC LIMIT 1"
+                ).fetchone()
+            else:
+                row = self._connection.execute(
+                    query + "WHERE run_id = ?", (run_id,)
+                ).fetchone()
+        if row is None:
+            return None
+        return LedgerRun(row[0], json.loads(row[1]), row[2])
+
+    def entries(self, run_id: str) -> list[LedgerEntry]:
+        """Return the planned emails of a run, in order."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT idx, email_type, key, status, email IS NOT NULL "
+                "FROM emails WHERE run_id = ? ORDER BY idx",
+                (run_id,),
+            ).fetchall()
+        return [LedgerEntry(*row[:4], stored=bool(row[4])) for row in rows]
+
+    def email(self, key: str) -> FullEmail | None:
+        """Return the stored email of ``key``, None if it was not generated."""
+        stored = self.stored(key)
+        return stored[0] if stored is not None else None
+
+    def stored(self, key: str) -> tuple[FullEmail, dict | None] | None:
+        """Return the stored email of ``key`` and its fake data, if generated."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT email, attributes FROM emails WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] is None:
+            return None
+        attributes = json.loads(row[1]) if row[1] is not None else None
+        return FullEmail.model_validate_json(row[0]), attributes
+
+    def counts(self, run_id: str) -> dict[str, int]:
+        """Return the number of emails of a run per status."""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT status, COUNT(*) FROM emails WHERE run_id = ? GROUP BY status",
+                (run_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def dead_letters(self, run_id: str) -> list[tuple[int, str, str]]:
+        """Return the index, email type and error of the dead emails of a run."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT idx, email_type, error FROM dead_letters "
+                "WHERE run_id = ? ORDER BY idx",
+                (run_id,),
+            ).fetchall()
+
+    async def generated(
+        self, key: str, email: FullEmail, attributes: dict | None = None
+    ) -> None:
+        """Store the email about to be sent, returning once it is committed.
+
+        ``attributes`` is the fake data the email was written from, kept for
+        a resumed run that exports its emails.
+        """
+        await self._queue(
+            "UPDATE emails SET status = 'generated', email = ?, attributes = ?, "
+            "updated = ? WHERE key = ? AND status NOT IN ('sent', 'dead')",
+            (
+                email.model_dump_json(),
+                json.dumps(attributes, default=str) if attributes is not None else None,
+                time.time(),
+                key,
+            ),
+            durable=True,
+        )
+
+    async def sent(self, key: str, message_id: str | None) -> None:
+        """Record that the email of ``key`` was sent, once it is committed."""
+        await self._queue(
+            "UPDATE emails SET status = 'sent', message_id = ?, error = NULL, "
+            "updated = ? WHERE key = ?",
+            (message_id, time.time(), key),
+            durable=True,
+        )
+
+    def failed(self, key: str, error: BaseException) -> None:
+        """Record a failed attempt, moving the email to the dead letters if final."""
+        permanent = isinstance(error, DeliveryError) and error.permanent
+        now = time.time()
+        self._queue(
+            "UPDATE emails SET attempts = attempts + 1, error = ?, updated = ?, "
+            "status = CASE WHEN ? OR attempts + 1 >= ? THEN 'dead' ELSE 'failed' END "
+            "WHERE key = ? AND status != 'sent'",
+            (str(error), now, permanent, self.max_attempts, key),
+        )
+        self._queue(
+            "INSERT OR REPLACE INTO dead_letters "
+            "(key, run_id, idx, email_type, email, error, failed) "
+            "SELECT key, run_id, idx, email_type, email, error, ? FROM emails "
+            "WHERE key = ? AND status = 'dead'",
+            (now, key),
+        )
+
+    def _queue(self, sql: str, parameters: tuple, durable: bool = False):
+        """Queue a write, returning a future of its commit when ``durable``."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future() if durable else None
+        self._pending.append((sql, parameters, future))
+        if durable or len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        """Start committing the queued writes, unless a commit is under way."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        # The running commit picks up what was queued in the meantime
+        if self._flushing is None and self._pending:
+            self._flushing = asyncio.create_task(self._commit_pending())
+
+    async def _commit_pending(self) -> None:
+        """Commit the queued writes, a batch at a time, until none are left."""
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                try:
+                    await asyncio.to_thread(self._commit, batch)
+                    error = None
+                except Exception as e:
+                    logger.error(f"Failed to write {len(batch)} ledger row(s): {e}")
+                    error = e
+                for _, _, future in batch:
+                    if future is None or future.done():
+                        continue
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+        finally:
+            self._flushing = None
+
+    def _commit(self, batch: list[tuple[str, tuple, asyncio.Future | None]]) -> None:
+        """Run a batch of writes in one transaction."""
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                for sql, parameters, _ in batch:
+                    self._connection.execute(sql, parameters)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+        self.commits += 1
+        self.writes += len(batch)
+
+    async def flush(self) -> None:
+        """Commit every queued write."""
+        self._flush()
+        if self._flushing is not None:
+            await asyncio.shield(self._flushing)
+
+    def summary(self, run_id: str) -> str:
+        """Return a one-line human readable summary of a run."""
+        counts = self.counts(run_id)
+        return (
+            f"run {run_id}, {counts.get('sent', 0)} sent, "
+            f"{counts.get('failed', 0)} to retry, "
+            f"{counts.get('dead', 0)} dead-lettered, "
+            f"{self.writes} write(s) in {self.commits} commit(s)"
+        )
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+
+def create_send_ledger(enabled: bool = False) -> SendLedger | None:
+    """Create the send ledger, or None when it is off.
+
+    The ledger is on when ``enabled`` or with ``SEND_LEDGER=on``, and is
+    stored at ``SEND_LEDGER_PATH``. ``SEND_LEDGER_MAX_ATTEMPTS`` sets the
+    failed attempts after which an email is dead-lettered (default 3).
+    """
+    enabled = enabled or os.environ.get("SEND_LEDGER", "off").lower() in (
+        "on",
+        "1",
+        "true",
+    )
+    if not enabled:
+        return None
+    path = os.environ.get(
+        "SEND_LEDGER_PATH", Path.home() / ".cache" / "phantommail" / "ledger.sqlite"
+    )
+    return SendLedger(
+        path, max_attempts=int(os.environ.get("SEND_LEDGER_MAX_ATTEMPTS", "3"))
+    )
@@ -0,0 +1,184 @@
+"""Build emails straight from faker output, without an LLM round trip.
+
+Order and customs emails fill the slots of the example templates, the other
+email types turn the message text of their faker into a simple HTML body.
+"""
+
+import html
+import re
+from collections.abc import Mapping
+from datetime import datetime
+
+from phantommail.fakers.customers import website_slug
+from phantommail.fakers.faker_pool import faker_pool, task_random
+from phantommail.helpers.templates import load_template
+from phantommail.models.customs_document import CustomsDeclaration, Party
+from phantommail.models.email import Email
+from phantommail.models.transport import TransportOrder
+
+DATE_FORMAT = "%d.%m.%Y"
+
+
+def text_to_html(text: str) -> str:
+    """Turn plain text into HTML paragraphs, keeping single line breaks."""
+    paragraphs = [part.strip() for part in re.split(r"\n\s*\n", text) if part.strip()]
+    return "\n".join(
+        f"<p>{html.escape(paragraph).replace(chr(10), '<br>')}</p>"
+        for paragraph in paragraphs
+    )
+
+
+def text_email(subject: str, text: str) -> Email:
+    """Build an email without attachment from plain text."""
+    return Email(subject=subject, body_html=text_to_html(text))
+
+
+def _city(address: str) -> str:
+    """Return the city from the last line of a Faker address."""
+    last_line = address.strip().splitlines()[-1]
+    words = [word for word in last_line.split() if not any(c.isdigit() for c in word)]
+    return " ".join(words) or last_line
+
+
+def order_slots(order: TransportOrder) -> dict[str, str]:
+    """Return the values for the slots of the order templates."""
+    client = order.client
+    rng = task_random()
+    return {
+        "order_ref": f"{rng.choice(['TO', 'FR', 'ORD'])}-{rng.randint(100000, 999999)}",
+        "customer_ref": f"PO{rng.randint(10000000, 99999999)}",
+        "sender_name": client.sender_name,
+        "client_company": client.company,
+        "client_street": client.address,
+        "client_postal_code": client.postal_code,
+        "client_city": client.city,
+        "client_country": client.country,
+        "client_email": client.email,
+        "client_phone": client.phone,
+        "client_website": f"www.{website_slug(client.company)}.com",
+        "client_vat": client.vat_number,
+        "pickup_company": order.pickup_address.company,
+        "pickup_address": order.pickup_address.address,
+        "pickup_city": _city(order.pickup_address.address),
+        "pickup_country": order.pickup_address.country,
+        "delivery_company": order.delivery_address.company,
+        "delivery_address": order.delivery_address.address,
+        "delivery_country": order.delivery_address.country,
+        "loading_date": order.loading_date.strftime(DATE_FORMAT),
+        "unloading_date": order.unloading_date.strftime(DATE_FORMAT),
+        "goods_description": order.goods.description,
+        "goods_quantity": str(order.goods.quantity),
+        "weight_kg": f"{order.goods.weight:.0f}",
+        "loading_metres": f"{order.loading_metres:.2f}",
+        "pallet_count": str(order.pallet_count),
+        "freight_price": f"{order.loading_metres * rng.uniform(90, 160):.2f}",
+    }
+
+
+def _merge(slots: dict[str, str], values: Mapping[str, object] | None) -> dict:
+    """Override ``slots`` with the non-empty ``values``."""
+    return slots | {name: value for name, value in (values or {}).items() if value}
+
+
+def order_email(
+    order: TransportOrder,
+    template_number: int,
+    values: Mapping[str, object] | None = None,
+    subject: str | None = None,
+) -> Email:
+    """Fill the email (and PDF, if the template has one) of an order template.
+
+    ``values`` (e.g. slot values written by the LLM) take precedence over the
+    values derived from ``order``.
+    """
+    slots = _merge(order_slots(order), values)
+    attachment_html = None
+    if template_number not in [1, 6]:
+        attachment_html = load_template(f"order_{template_number}_pdf.html").render(
+            slots
+        )
+
+    return Email(
+        subject=subject or f"Transport order {slots['order_ref']}",
+        body_html=load_template(f"order_{template_number}_email.html").render(slots),
+        attachment_html=attachment_html,
+    )
+
+
+def _party_slots(role: str, party: Party | None) -> dict[str, str]:
+    """Return the name, address and EORI slots of a declaration party."""
+    if party is None:
+        return {}
+    return {
+        f"{role}_name": party.name,
+        f"{role}_address": "\n".join((party.address or "").split(", ")),
+        f"{role}_eori": party.eori_number or "",
+    }
+
+
+def declaration_slots(declaration: CustomsDeclaration) -> dict[str, str]:
+    """Return the values for the slots of the customs templates."""
+    with faker_pool.borrow("en_GB") as faker:
+        sender_name = faker.first_name()
+
+    slots = {
+        "sender_name": sender_name,
+        "mrn": declaration.mrn,
+        "declaration_type": declaration.declaration_type,
+        "reference_number": declaration.reference_number or "",
+        "total_packages": str(declaration.total_packages or 0),
+        "invoice_currency": declaration.invoice_currency or "",
+        "invoice_value": f"{declaration.invoice_value or 0:.2f}",
+        "declaration_status": declaration.declaration_status or "",
+        "place_and_date": declaration.place_and_date or "",
+    }
+    if declaration.acceptance_date_time:
+        accepted = datetime.fromisoformat(declaration.acceptance_date_time)
+        slots["acceptance_date"] = accepted.strftime("%d/%m/%Y %H:%M")
+
+    for role in ["exporter", "importer", "declarant", "representative", "buyer"]:
+        slots.update(_party_slots(role, getattr(declaration, role)))
+
+    transport = declaration.transport_info
+    if transport is not None:
+        slots.update(
+            {
+                "transport_mode": str(transport.transport_mode or ""),
+                "place_of_loading": transport.place_of_loading or "",
+                "arrival_transport": transport.arrival_transport or "",
+                "border_transport": transport.border_transport or "",
+            }
+        )
+
+    if declaration.items:
+        item = declaration.items[0]
+        slots.update(
+            {
+                "item_description": item.description_of_goods or "",
+                "item_gross_mass": f"{item.gross_mass_kg or 0:.0f}",
+                "item_net_mass": f"{item.net_mass_kg or 0:.0f}",
+                "commodity_code": item.commodity_code or "",
+            }
+        )
+
+    return slots
+
+
+def declaration_email(
+    declaration: CustomsDeclaration,
+    template_number: int,
+    values: Mapping[str, object] | None = None,
+    subject: str | None = None,
+) -> Email:
+    """Fill the email and PDF of a customs template.
+
+    ``values`` take precedence over the values derived from ``declaration``.
+    """
+    slots = _merge(declaration_slots(declaration), values)
+    return Email(
+        subject=subject or f"Documents {slots['reference_number'] or slots['mrn']}",
+        body_html=load_template(f"customs_{template_number}_email.html").render(slots),
+        attachment_html=load_template(f"customs_{template_number}_pdf.html").render(
+            slots
+        ),
+    )
@@ -0,0 +1,71 @@
+import html
+import re
+from collections.abc import Mapping
+from functools import cache
+from importlib import resources
+
+# A slot in an example template: {{name|default}}, the default may span lines
+SLOT_PATTERN = re.compile(r"\{\{(\w+)\|(.*?)\}\}", re.DOTALL)
+
+
+class SlotTemplate:
+    """An HTML example template with named slots.
+
+    Slots are written as ``{{name|default}}``. The default is the original
+    example text, so ``example()`` gives back the plain HTML used in prompts
+    and ``render()`` swaps in generated values without an LLM.
+    """
+
+    def __init__(self, source: str):
+        """Parse the template once.
+
+        Args:
+            source: The annotated HTML.
+
+        """
+        self._parts: list[str | tuple[str, str]] = []
+        position = 0
+        for match in SLOT_PATTERN.finditer(source):
+            self._parts.append(source[position : match.start()])
+            self._parts.append((match.group(1), match.group(2)))
+            position = match.end()
+        self._parts.append(source[position:])
+
+        self.slots = frozenset(
+            part[0] for part in self._parts if isinstance(part, tuple)
+        )
+        # The default of the first occurrence of every slot
+        self.defaults: dict[str, str] = {}
+        for part in self._parts:
+            if isinstance(part, tuple):
+                self.defaults.setdefault(part[0], part[1])
+        self._example = self.render({})
+
+    def example(self) -> str:
+        """Return the template with every slot set to its default."""
+        return self._example
+
+    def render(self, values: Mapping[str, object]) -> str:
+        """Fill the slots with ``values``.
+
+        Values are HTML-escaped and newlines become ``<br>``. Slots without a
+        value keep their default.
+        """
+        rendered = []
+        for part in self._parts:
+            if isinstance(part, str):
+                rendered.append(part)
+            elif part[0] in values:
+                value = html.escape(str(values[part[0]]))
+                rendered.append(value.replace("\n", "<br>"))
+            else:
+                rendered.append(part[1])
+        return "".join(rendered)
+
+
+@cache
+def load_template(name: str) -> SlotTemplate:
+    """Load and parse an example template from ``phantommail.examples``."""
+    return SlotTemplate(
+        resources.files("phantommail.examples").joinpath(name).read_text()
+    )
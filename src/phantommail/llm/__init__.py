@@ -0,0 +1,16 @@
+"""Chat model backends for the phantommail package."""
+
+from phantommail.llm.backends import LLM_BACKENDS, ChatModel, create_chat_model
+from phantommail.llm.fake import FakeChatModel, FakeLLMError
+from phantommail.llm.routing import ModelRouter, Route, load_routes
+
+__all__ = [
+    "LLM_BACKENDS",
+    "ChatModel",
+    "create_chat_model",
+    "FakeChatModel",
+    "FakeLLMError",
+    "ModelRouter",
+    "Route",
+    "load_routes",
+]
@@ -0,0 +1,59 @@
+import os
+from typing import TYPE_CHECKING, Protocol
+
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+
+from phantommail.llm.fake import FakeChatModel
+
+if TYPE_CHECKING:
+    from phantommail.llm.routing import Route
+
+# Backends accepted by ``create_chat_model`` and the LLM_BACKEND variable
+LLM_BACKENDS = ("google", "fake")
+
+
+class ChatModel(Protocol):
+    """What the graph nodes need from a chat model."""
+
+    def with_structured_output(self, schema: type[BaseModel]) -> Runnable:
+        """Return a runnable that answers with instances of ``schema``."""
+        ...
+
+
+def create_chat_model(
+    backend: str | None = None,
+    route: "Route | None" = None,
+    cached_content: str | None = None,
+) -> ChatModel:
+    """Create the chat model for ``backend``.
+
+    Args:
+        backend: "google" for Gemini or "fake" for the offline stand-in.
+            Defaults to the LLM_BACKEND environment variable, then "google".
+        route: Model name, temperature and timeout, gemini-2.5-pro at 0.5 by
+            default. The fake backend ignores it.
+        cached_content: Name of a cached prompt prefix to send with every
+            call, see ``phantommail.llm.context_cache``.
+
+    """
+    backend = backend or os.environ.get("LLM_BACKEND", "google")
+    if backend == "google":
+        # Imported here so the fake backend works without the Google packages
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        if route is None:
+            return ChatGoogleGenerativeAI(
+                model="gemini-2.5-pro", temperature=0.5, cached_content=cached_content
+            )
+        return ChatGoogleGenerativeAI(
+            model=route.model,
+            temperature=route.temperature,
+            timeout=route.timeout,
+            cached_content=cached_content,
+        )
+    if backend == "fake":
+        return FakeChatModel.from_env(cached_content)
+    raise ValueError(
+        f"Unknown LLM backend {backend!r}, expected one of {', '.join(LLM_BACKENDS)}"
+    )
@@ -0,0 +1,364 @@
+"""Group the LLM calls of many emails into batches.
+
+``LLMBatcher`` collects the pending calls of concurrent emails, groups them by
+route and output schema, and submits each group at once: through the chat
+model's ``abatch`` or, for bulk runs, an offline batch job that takes JSONL in
+and gives JSONL out. The answers are handed back to the email that asked.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Protocol
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from pydantic import BaseModel
+
+from phantommail.llm.backends import ChatModel, create_chat_model
+from phantommail.llm.routing import ModelRouter, Route
+from phantommail.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def request_line(custom_id: str, messages: list[BaseMessage]) -> str:
+    """Return the JSONL line of one request of a batch job."""
+    return json.dumps(
+        {
+            "custom_id": custom_id,
+            "messages": [
+                {"role": message.type, "content": message.content}
+                for message in messages
+            ],
+        }
+    )
+
+
+def request_messages(request: dict) -> list[BaseMessage]:
+    """Return the chat messages of a parsed request line."""
+    return [
+        SystemMessage(content=message["content"])
+        if message["role"] == "system"
+        else HumanMessage(content=message["content"])
+        for message in request["messages"]
+    ]
+
+
+class BatchJobs(Protocol):
+    """An offline batch interface: JSONL requests in, JSONL results out.
+
+    Every result line holds the ``custom_id`` of its request and either the
+    structured ``response`` or an ``error`` message.
+    """
+
+    async def submit(
+        self, route: Route, schema: type[BaseModel], lines: list[str]
+    ) -> str:
+        """Start a job for the request ``lines`` and return its id."""
+        ...
+
+    async def results(self, job_id: str) -> list[str] | None:
+        """Return the result lines of a finished job, None while it runs."""
+        ...
+
+
+class LocalBatchJobs:
+    """Stand-in for a provider batch API that runs the jobs in the process.
+
+    The request and result files are written to ``directory`` so a job can be
+    inspected like one downloaded from the provider.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        chat_model: Callable[[Route], ChatModel] | None = None,
+    ):
+        """Initialize the stand-in.
+
+        Args:
+            directory: Where the JSONL files of the jobs are written.
+            chat_model: Creates the model answering the requests of a route,
+                the fake backend by default.
+
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chat_model = chat_model or (lambda route: create_chat_model("fake", route))
+        self._ids = itertools.count(1)
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def submit(
+        self, route: Route, schema: type[BaseModel], lines: list[str]
+    ) -> str:
+        """Write the request file and start answering it in the background."""
+        job_id = f"local-{next(self._ids)}"
+        (self.directory / f"{job_id}.input.jsonl").write_text("\n".join(lines) + "\n")
+        self._tasks[job_id] = asyncio.create_task(self._run(job_id, route, schema))
+        return job_id
+
+    async def _run(self, job_id: str, route: Route, schema: type[BaseModel]) -> None:
+        """Answer every request of a job and write the result file."""
+        lines = (self.directory / f"{job_id}.input.jsonl").read_text().splitlines()
+        requests = [json.loads(line) for line in lines]
+        answers = (
+            await self.chat_model(route)
+            .with_structured_output(schema)
+            .abatch(
+                [request_messages(request) for request in requests],
+                return_exceptions=True,
+            )
+        )
+        results = [
+            {"custom_id": request["custom_id"], "error": str(answer)}
+            if isinstance(answer, Exception)
+            else {"custom_id": request["custom_id"], "response": answer.model_dump()}
+            for request, answer in zip(requests, answers, strict=True)
+        ]
+        (self.directory / f"{job_id}.output.jsonl").write_text(
+            "".join(json.dumps(result) + "\n" for result in results)
+        )
+
+    async def results(self, job_id: str) -> list[str] | None:
+        """Return the result lines once the job has finished."""
+        task = self._tasks[job_id]
+        if not task.done():
+            return None
+        del self._tasks[job_id]
+        task.result()
+        return (self.directory / f"{job_id}.output.jsonl").read_text().splitlines()
+
+
+class GeminiBatchJobs:
+    """Batch jobs on the Gemini Batch API, with the requests sent inline.
+
+    Batch jobs cost half the price of regular calls but may take up to a day,
+    so they suit bulk corpus generation, not interactive runs.
+    """
+
+    def __init__(self):
+        """Initialize the jobs, the API client is created on first use."""
+        self._client = None
+
+    async def submit(
+        self, route: Route, schema: type[BaseModel], lines: list[str]
+    ) -> str:
+        """Create a batch job with one inline request per line."""
+        from google import genai
+
+        if self._client is None:
+            self._client = genai.Client()
+
+        requests = []
+        for line in lines:
+            request = json.loads(line)
+            system = [
+                m["content"] for m in request["messages"] if m["role"] == "system"
+            ]
+            requests.append(
+                {
+                    "contents": [
+                        {"role": "user", "parts": [{"text": message["content"]}]}
+                        for message in request["messages"]
+                        if message["role"] != "system"
+                    ],
+                    "config": {
+                        "system_instruction": "\n".join(system) or None,
+                        "temperature": route.temperature,
+                        "response_mime_type": "application/json",
+                        "response_json_schema": schema.model_json_schema(),
+                    },
+                    "metadata": {"custom_id": request["custom_id"]},
+                }
+            )
+        job = await self._client.aio.batches.create(model=route.model, src=requests)
+        return job.name
+
+    async def results(self, job_id: str) -> list[str] | None:
+        """Return the result lines once the job has left the queue."""
+        job = await self._client.aio.batches.get(name=job_id)
+        state = job.state.name if job.state is not None else ""
+        if state not in (
+            "JOB_STATE_SUCCEEDED",
+            "JOB_STATE_PARTIALLY_SUCCEEDED",
+            "JOB_STATE_FAILED",
+            "JOB_STATE_CANCELLED",
+            "JOB_STATE_EXPIRED",
+        ):
+            return None
+        if job.dest is None or not job.dest.inlined_responses:
+            raise RuntimeError(f"Batch job {job_id} ended as {state}")
+
+        results = []
+        for answer in job.dest.inlined_responses:
+            custom_id = (answer.metadata or {}).get("custom_id")
+            if answer.error is not None or answer.response is None:
+                results.append({"custom_id": custom_id, "error": str(answer.error)})
+            else:
+                response = json.loads(answer.response.text)
+                results.append({"custom_id": custom_id, "response": response})
+        return [json.dumps(result) for result in results]
+
+
+class _Pending:
+    """The calls collected for one route and schema."""
+
+    def __init__(self):
+        self.messages: list[list[BaseMessage]] = []
+        self.futures: list[asyncio.Future] = []
+        self.flush: asyncio.TimerHandle | None = None
+
+
+def create_batch_jobs(backend: str | None = None) -> BatchJobs:
+    """Create the offline batch interface that goes with a chat model backend.
+
+    The fake backend uses ``LocalBatchJobs`` writing to LLM_BATCH_DIR.
+    """
+    backend = backend or os.environ.get("LLM_BACKEND", "google")
+    if backend == "fake":
+        return LocalBatchJobs(
+            os.environ.get(
+                "LLM_BATCH_DIR", Path.home() / ".cache" / "phantommail" / "batches"
+            )
+        )
+    return GeminiBatchJobs()
+
+
+class LLMBatcher:
+    """Collect concurrent structured-output calls and submit them in batches.
+
+    A batch is submitted once it holds ``max_batch`` calls or ``max_wait``
+    seconds after its first call. Without ``jobs`` a batch goes through the
+    chat model's ``abatch``; with ``jobs`` it becomes one offline batch job,
+    polled every ``poll_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = 32,
+        max_wait: float = 0.5,
+        jobs: BatchJobs | None = None,
+        poll_interval: float = 10.0,
+    ):
+        """Initialize the batcher."""
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.jobs = jobs
+        self.poll_interval = poll_interval
+        self.batches = 0
+        self.calls = 0
+        self._pending: dict[tuple, _Pending] = {}
+        self._running: set[asyncio.Task] = set()
+        self._ids = itertools.count()
+
+    async def generate(
+        self,
+        router: ModelRouter,
+        route: str,
+        schema: type[BaseModel],
+        messages: list[BaseMessage],
+        llm: ChatModel | None = None,
+    ) -> BaseModel:
+        """Queue one call and wait for its answer.
+
+        Args:
+            router: Provides the chat model and settings of ``route``.
+            route: The routing table entry of the call.
+            schema: The structured output.
+            messages: The prompt.
+            llm: A chat model replacing the routed one.
+
+        """
+        key = (id(llm) if llm is not None else router.route(route), schema)
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = _Pending()
+            pending.flush = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush, key, router, route, schema, llm
+            )
+        future = asyncio.get_running_loop().create_future()
+        pending.messages.append(messages)
+        pending.futures.append(future)
+        self.calls += 1
+        if len(pending.messages) >= self.max_batch:
+            self._flush(key, router, route, schema, llm)
+        return await future
+
+    def _flush(self, key, router, route, schema, llm) -> None:
+        """Submit the calls collected under ``key``."""
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        pending.flush.cancel()
+        self.batches += 1
+        task = asyncio.create_task(self._submit(pending, router, route, schema, llm))
+        # Keep a reference until the batch is done, the loop only holds weak ones
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _submit(
+        self,
+        pending: _Pending,
+        router: ModelRouter,
+        route: str,
+        schema: type[BaseModel],
+        llm: ChatModel | None,
+    ) -> None:
+        """Run one batch and hand every answer to the call that asked for it."""
+        try:
+            if self.jobs is None:
+                structured = (llm or router.client(route)).with_structured_output(
+                    schema
+                )
+                answers = await structured.abatch(
+                    pending.messages, return_exceptions=True
+                )
+            else:
+                answers = await self._run_job(
+                    router.route(route), schema, pending.messages
+                )
+        except Exception as error:
+            answers = [error] * len(pending.futures)
+
+        for future, answer in zip(pending.futures, answers, strict=True):
+            if future.done():
+                continue
+            if isinstance(answer, BaseException):
+                future.set_exception(answer)
+            else:
+                future.set_result(answer)
+
+    async def _run_job(
+        self, route: Route, schema: type[BaseModel], batch: list[list[BaseMessage]]
+    ) -> list[Any]:
+        """Run a batch as an offline job and return the answers in request order."""
+        custom_ids = [f"request-{next(self._ids)}" for _ in batch]
+        job_id = await self.jobs.submit(
+            route,
+            schema,
+            [
+                request_line(custom_id, messages)
+                for custom_id, messages in zip(custom_ids, batch, strict=True)
+            ],
+        )
+        logger.info(f"Submitted batch job {job_id} with {len(batch)} request(s)")
+
+        while (lines := await self.jobs.results(job_id)) is None:
+            await asyncio.sleep(self.poll_interval)
+
+        by_id = {}
+        for line in lines:
+            result = json.loads(line)
+            if "error" in result:
+                by_id[result["custom_id"]] = RuntimeError(result["error"])
+            else:
+                by_id[result["custom_id"]] = schema.model_validate(result["response"])
+        return [
+            by_id.get(custom_id, RuntimeError(f"No result for {custom_id} in {job_id}"))
+            for custom_id in custom_ids
+        ]
@@ -0,0 +1,137 @@
+"""Stop calling a model that keeps failing, and try it again after a pause."""
+
+import os
+import time
+from collections import deque
+from typing import Literal
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+class ModelsUnavailable(RuntimeError):
+    """Raised when every model of a fallback chain is switched off."""
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one model.
+
+    Closed, the breaker lets every call through and keeps the outcome of the
+    last ``window`` calls. Once ``min_calls`` outcomes are known and the share
+    of failures among them reaches ``failure_threshold``, it opens and refuses
+    calls for ``reset_timeout`` seconds. It is then half-open and lets a single
+    trial call through: a success closes it, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        window: int = 20,
+        min_calls: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """Initialize a closed breaker.
+
+        Args:
+            failure_threshold: Share of failed calls (0..1) that opens it.
+            window: Number of recent calls the share is taken over.
+            min_calls: Calls needed in the window before it can open.
+            reset_timeout: Seconds it stays open before a trial call.
+
+        """
+        if not 0 < failure_threshold <= 1:
+            raise ValueError("failure_threshold must be in (0, 1]")
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.calls = 0
+        self.failures = 0
+        self.refused = 0
+        self.opened = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._state: BreakerState = "closed"
+        self._opened_at = 0.0
+        self._trial_started: float | None = None
+
+    @classmethod
+    def from_env(cls) -> "CircuitBreaker":
+        """Configure a breaker from the LLM_BREAKER_* environment variables.
+
+        LLM_BREAKER_THRESHOLD, LLM_BREAKER_WINDOW, LLM_BREAKER_MIN_CALLS and
+        LLM_BREAKER_RESET (seconds) map to the constructor arguments.
+        """
+        return cls(
+            failure_threshold=float(os.environ.get("LLM_BREAKER_THRESHOLD", "0.5")),
+            window=int(os.environ.get("LLM_BREAKER_WINDOW", "20")),
+            min_calls=int(os.environ.get("LLM_BREAKER_MIN_CALLS", "5")),
+            reset_timeout=float(os.environ.get("LLM_BREAKER_RESET", "30")),
+        )
+
+    @property
+    def state(self) -> BreakerState:
+        """The current state, half-open once an open breaker has waited enough."""
+        if (
+            self._state == "open"
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = "half_open"
+            self._trial_started = None
+        return self._state
+
+    def failure_rate(self) -> float:
+        """Return the share of failures among the recent calls."""
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def allow(self) -> bool:
+        """Whether a call may go through now, counting the refused ones."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open":
+            now = time.monotonic()
+            # A trial that never reported back, e.g. cancelled by a deadline,
+            # must not keep the breaker half-open forever
+            if (
+                self._trial_started is None
+                or now - self._trial_started >= self.reset_timeout
+            ):
+                self._trial_started = now
+                return True
+        self.refused += 1
+        return False
+
+    def record(self, success: bool) -> None:
+        """Record the outcome of a call that ``allow`` let through."""
+        self.calls += 1
+        if not success:
+            self.failures += 1
+
+        state = self.state
+        if state == "half_open":
+            if success:
+                self._state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open()
+        elif state == "closed":
+            self._outcomes.append(success)
+            if (
+                len(self._outcomes) >= self.min_calls
+                and self.failure_rate() >= self.failure_threshold
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        """Start refusing calls."""
+        self._state = "open"
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary."""
+        return (
+            f"{self.state}, {self.calls} call(s), {self.failures} failed, "
+            f"{self.refused} refused, opened {self.opened} time(s)"
+        )
@@ -0,0 +1,199 @@
+"""Register the static prompt prefixes once with the provider and reuse them.
+
+The order and customs prompts start with a system message holding the whole
+example HTML templates, identical for every email built from the same
+example. A context cache uploads such a prefix once, and later calls only send
+the cache name and the per-email part of the prompt.
+"""
+
+import abc
+import hashlib
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Protocol
+
+from phantommail.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Cached prefixes are renewed this many seconds before the provider drops them,
+# so a call never references a cache that expires while it runs
+REFRESH_MARGIN = 60.0
+
+
+class ContextCache(Protocol):
+    """Hand out provider cache names for static prompt prefixes."""
+
+    def get(self, model: str, prefix: str) -> str | None:
+        """Return the cache name of ``prefix`` for ``model``, creating it if needed.
+
+        None means the prefix could not be cached and must be sent in full.
+        """
+        ...
+
+    def invalidate(self, model: str, prefix: str) -> None:
+        """Forget the cache of ``prefix``, so the next ``get`` creates a new one."""
+        ...
+
+
+@dataclass
+class CachedPrefix:
+    """A prefix registered with the provider."""
+
+    name: str | None
+    expires_at: float
+
+
+class _TTLContextCache(abc.ABC):
+    """Bookkeeping shared by the context caches: one entry per model and prefix.
+
+    Creating a cache is a provider round trip, so it runs outside the lock on
+    the entries: concurrent calls for the same prefix wait for one creation,
+    while those for other prefixes go ahead.
+    """
+
+    def __init__(self, ttl: float = 3600.0):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds the provider keeps a cached prefix.
+
+        """
+        self.ttl = ttl
+        self.created = 0
+        self._entries: dict[tuple[str, str], CachedPrefix] = {}
+        self._creating: dict[tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _create(self, model: str, prefix: str) -> str:
+        """Register ``prefix`` with the provider and return the cache name."""
+
+    def _fresh(self, key: tuple[str, str]) -> CachedPrefix | None:
+        """Return the entry of ``key`` unless it is missing or about to expire."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry.expires_at - REFRESH_MARGIN <= time.monotonic():
+            return None
+        return entry
+
+    def get(self, model: str, prefix: str) -> str | None:
+        """Return the cache name of ``prefix`` for ``model``, creating it if needed."""
+        key = (model, hashlib.sha256(prefix.encode()).hexdigest())
+        entry = self._fresh(key)
+        if entry is not None:
+            return entry.name
+        with self._lock:
+            creating = self._creating.setdefault(key, threading.Lock())
+        with creating:
+            # Another call may have created it while this one waited
+            entry = self._fresh(key)
+            if entry is not None:
+                return entry.name
+            try:
+                name = self._create(model, prefix)
+            except Exception as error:
+                # Prefixes below the provider minimum, or models without
+                # caching, are sent in full until the entry expires
+                name = None
+                logger.warning(
+                    f"Could not cache the prompt prefix for {model}: {error}"
+                )
+            entry = CachedPrefix(name, time.monotonic() + self.ttl)
+            with self._lock:
+                if name is not None:
+                    self.created += 1
+                self._entries[key] = entry
+        return entry.name
+
+    def invalidate(self, model: str, prefix: str) -> None:
+        """Forget the cache of ``prefix``, so the next ``get`` creates a new one."""
+        key = (model, hashlib.sha256(prefix.encode()).hexdigest())
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class GeminiContextCache(_TTLContextCache):
+    """Cached contents of the Gemini API, created with the ``google-genai`` client."""
+
+    def __init__(self, ttl: float = 3600.0):
+        """Initialize the cache, the API client is created on first use."""
+        super().__init__(ttl)
+        self._client = None
+
+    def _create(self, model: str, prefix: str) -> str:
+        """Upload ``prefix`` as the system instruction of a cached content."""
+        from google import genai
+        from google.genai import types
+
+        if self._client is None:
+            self._client = genai.Client()
+        cached = self._client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name="phantommail-prompt",
+                system_instruction=prefix,
+                ttl=f"{int(self.ttl)}s",
+            ),
+        )
+        return cached.name
+
+
+# The prefixes "uploaded" to the local stand-in, by cache name, with their
+# expiry. Shared like a provider's storage, so fake models can resolve names.
+_LOCAL_CONTENTS: dict[str, tuple[str, float]] = {}
+_LOCAL_NAMES = itertools.count(1)
+
+
+class LocalContextCache(_TTLContextCache):
+    """In-process stand-in for a provider context cache, used with the fake backend."""
+
+    def _create(self, model: str, prefix: str) -> str:
+        """Store ``prefix`` under a new cache name."""
+        name = f"cachedContents/local-{next(_LOCAL_NAMES)}"
+        _LOCAL_CONTENTS[name] = (prefix, time.monotonic() + self.ttl)
+        return name
+
+
+def resolve_local_cache(name: str) -> str | None:
+    """Return the prefix stored under a local cache name, None if gone or expired."""
+    stored = _LOCAL_CONTENTS.get(name)
+    if stored is None or stored[1] <= time.monotonic():
+        _LOCAL_CONTENTS.pop(name, None)
+        return None
+    return stored[0]
+
+
+def expire_local_cache(name: str) -> None:
+    """Drop a local cache before its time, as a provider might."""
+    _LOCAL_CONTENTS.pop(name, None)
+
+
+def is_cache_miss(error: Exception) -> bool:
+    """Whether ``error`` says the referenced cached content no longer exists."""
+    if getattr(error, "code", None) == 404:
+        return True
+    message = str(error).lower()
+    return "cachedcontent" in message.replace(" ", "") and (
+        "not found" in message or "expired" in message
+    )
+
+
+def create_context_cache(backend: str | None = None) -> ContextCache | None:
+    """Create the context cache that goes with a chat model backend.
+
+    Controlled by LLM_CONTEXT_CACHE ("off" disables it) and
+    LLM_CONTEXT_CACHE_TTL (seconds, 3600 by default).
+    """
+    if os.environ.get("LLM_CONTEXT_CACHE", "on").lower() in ("off", "0", "false"):
+        return None
+    ttl = float(os.environ.get("LLM_CONTEXT_CACHE_TTL", "3600"))
+    backend = backend or os.environ.get("LLM_BACKEND", "google")
+    if backend == "google":
+        return GeminiContextCache(ttl)
+    if backend == "fake":
+        return LocalContextCache(ttl)
+    return None
@@ -0,0 +1,345 @@
+"""Offline stand-in for the chat model, for benchmarks, profiling and tests.
+
+``FakeChatModel`` answers structured-output calls with schema-valid objects
+built from the prompt, after a simulated provider latency, and fails a
+configurable share of calls the way a provider would (server errors and 429s).
+"""
+
+import ast
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any, Protocol
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+from phantommail.helpers.template_emails import text_to_html
+from phantommail.llm.context_cache import resolve_local_cache
+
+
+class FakeLLMError(Exception):
+    """A simulated provider error.
+
+    ``code`` is the HTTP status the provider would have returned, 429 for rate
+    limiting, in which case ``retry_after`` holds the suggested wait in seconds.
+    """
+
+    def __init__(self, message: str, code: int = 500, retry_after: float | None = None):
+        """Initialize the error."""
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+
+
+class LatencyModel(Protocol):
+    """A distribution of response times."""
+
+    def sample(self, rng: random.Random) -> float:
+        """Return the next response time in seconds."""
+        ...
+
+
+class FixedLatency:
+    """Every call takes the same time."""
+
+    def __init__(self, seconds: float):
+        """Initialize the model."""
+        self.seconds = seconds
+
+    def sample(self, rng: random.Random) -> float:
+        """Return the fixed response time."""
+        return self.seconds
+
+
+class LognormalLatency:
+    """Lognormal response times, the usual shape of LLM latency (long right tail)."""
+
+    def __init__(self, median: float, sigma: float = 0.5):
+        """Initialize the model.
+
+        Args:
+            median: The median response time in seconds.
+            sigma: Standard deviation of the underlying normal distribution.
+
+        """
+        self.median = median
+        self.sigma = sigma
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a response time."""
+        return rng.lognormvariate(math.log(self.median), self.sigma)
+
+
+class TraceLatency:
+    """Replay recorded response times in order, starting over at the end."""
+
+    def __init__(self, samples: list[float]):
+        """Initialize the model."""
+        if not samples:
+            raise ValueError("A latency trace needs at least one sample")
+        self.samples = samples
+        self._position = 0
+
+    @classmethod
+    def from_file(cls, path: str | Path) -> "TraceLatency":
+        """Load a trace with one response time in seconds per line."""
+        lines = Path(path).read_text().splitlines()
+        return cls(
+            [
+                float(line)
+                for line in (line.strip() for line in lines)
+                if line and not line.startswith("#")
+            ]
+        )
+
+    def sample(self, rng: random.Random) -> float:
+        """Return the next recorded response time."""
+        seconds = self.samples[self._position]
+        self._position = (self._position + 1) % len(self.samples)
+        return seconds
+
+
+def parse_latency(spec: str) -> LatencyModel:
+    """Build a latency model from a spec string.
+
+    Accepted specs are "fixed:SECONDS", "lognormal:MEDIAN[,SIGMA]" and
+    "trace:PATH". A bare number is a fixed latency.
+    """
+    kind, _, argument = spec.partition(":")
+    if not argument:
+        return FixedLatency(float(kind or 0))
+    if kind == "fixed":
+        return FixedLatency(float(argument))
+    if kind == "lognormal":
+        return LognormalLatency(*(float(value) for value in argument.split(",")))
+    if kind == "trace":
+        return TraceLatency.from_file(argument)
+    raise ValueError(f"Unknown latency model {kind!r}")
+
+
+def _message_texts(messages: Any) -> list[str]:
+    """Return the text of every message of a chat model call."""
+    if isinstance(messages, str):
+        return [messages]
+    texts = []
+    for message in messages:
+        content = message.content if isinstance(message, BaseMessage) else message
+        if isinstance(content, list):
+            content = "\n".join(str(part) for part in content)
+        texts.append(str(content))
+    return texts
+
+
+def _data_section(text: str) -> tuple[str, str]:
+    """Split the data off the end of a message.
+
+    Returns the heading line before the data ("Email content:") without its
+    colon, or "" when there is none, and the data itself. Without a heading the
+    data is the last paragraph; a dict with a ``formatted_message`` is
+    replaced by that message.
+    """
+    lines = text.splitlines()
+    for position in range(len(lines) - 1, -1, -1):
+        line = lines[position].strip()
+        if line.endswith(":") and not line.startswith(("-", "#")):
+            section = "\n".join(part.strip() for part in lines[position + 1 :])
+            if section.strip():
+                return line[:-1], section.strip()
+
+    section = re.split(r"\n\s*\n", text.strip())[-1].strip()
+    try:
+        data = ast.literal_eval(section)
+    except (ValueError, SyntaxError):
+        data = None
+    if isinstance(data, dict) and "formatted_message" in data:
+        section = data["formatted_message"]
+    return "", section
+
+
+def _labelled_value(prompt: str, label: str) -> str | None:
+    """Return the value of a "- Label: value" line of the prompt."""
+    match = re.search(
+        rf"^\s*-\s*{re.escape(label)}:\s*(.+)$", prompt, re.IGNORECASE | re.MULTILINE
+    )
+    return match.group(1).strip() if match else None
+
+
+def _field_value(name: str, annotation: Any, prompt: str, request: str) -> Any:
+    """Pick a value for one field of the output schema.
+
+    ``prompt`` is the text of all messages, ``request`` the last message.
+    """
+    tagged = re.search(rf"<{name}>(.*?)</{name}>", prompt, re.DOTALL)
+    if tagged:
+        value = tagged.group(1).strip()
+        return None if value == "no attachment" else value
+
+    if name == "subject":
+        hint = re.search(r'e\.g\., "([^"]+)"', prompt)
+        if hint:
+            return hint.group(1)
+        heading, section = _data_section(request)
+        return (
+            _labelled_value(prompt, "Title")
+            or heading
+            or section.splitlines()[0].strip(" #-")[:78]
+        )
+    if name == "body_html":
+        return text_to_html(_data_section(request)[1])
+
+    value = _labelled_value(prompt, name.replace("_", " "))
+    if value is not None or annotation is not str:
+        return value
+    return name.replace("_", " ").capitalize()
+
+
+def build_structured_output(schema: type[BaseModel], messages: Any) -> BaseModel:
+    """Build a valid ``schema`` instance from the data in the prompt.
+
+    Fields wrapped in tags (``<body_html>...</body_html>``) take the tagged
+    text, ``subject`` takes the example subject of the prompt, ``body_html``
+    the data at the end of the last message and other fields a matching
+    "- Field name: value" line. Fields with nothing to go on keep their default.
+    """
+    texts = _message_texts(messages)
+    prompt = "\n".join(texts)
+    values = {}
+    for name, field in schema.model_fields.items():
+        value = _field_value(name, field.annotation, prompt, texts[-1])
+        if value is not None:
+            values[name] = value
+    return schema.model_validate(values)
+
+
+class FakeChatModel:
+    """Deterministic, offline replacement for the chat model.
+
+    Only structured output is supported, which is all the graph uses. The
+    output depends only on the prompt; latency and failures are drawn from a
+    random source seeded with ``seed``.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyModel | None = None,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: float = 1.0,
+        seed: int | None = None,
+        cached_content: str | None = None,
+    ):
+        """Initialize the fake model.
+
+        Args:
+            latency: Response time distribution, no delay by default.
+            error_rate: Share of calls failing with a server error (500).
+            rate_limit_rate: Share of calls rejected with a 429.
+            retry_after: Retry-After seconds reported with a 429.
+            seed: Seed for the latency and failure draws.
+            cached_content: Name of a ``LocalContextCache`` prefix prepended to
+                every call, which fails with a 404 once the prefix is gone.
+
+        """
+        self.latency = latency or FixedLatency(0.0)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.cached_content = cached_content
+        # Characters per streamed chunk, a few tokens like a real stream
+        self.stream_chunk_size = 64
+        self.calls = 0
+        self._rng = random.Random(seed)
+
+    @classmethod
+    def from_env(cls, cached_content: str | None = None) -> "FakeChatModel":
+        """Configure a fake model from the FAKE_LLM_* environment variables.
+
+        FAKE_LLM_LATENCY takes a ``parse_latency`` spec; FAKE_LLM_ERROR_RATE,
+        FAKE_LLM_RATE_LIMIT_RATE, FAKE_LLM_RETRY_AFTER and FAKE_LLM_SEED map to
+        the constructor arguments.
+        """
+        seed = os.environ.get("FAKE_LLM_SEED")
+        return cls(
+            latency=parse_latency(os.environ.get("FAKE_LLM_LATENCY", "0")),
+            error_rate=float(os.environ.get("FAKE_LLM_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.environ.get("FAKE_LLM_RATE_LIMIT_RATE", "0")),
+            retry_after=float(os.environ.get("FAKE_LLM_RETRY_AFTER", "1")),
+            seed=int(seed) if seed is not None else None,
+            cached_content=cached_content,
+        )
+
+    def _draw(self) -> tuple[float, FakeLLMError | None]:
+        """Draw the latency and outcome of the next call."""
+        self.calls += 1
+        delay = self.latency.sample(self._rng)
+        outcome = self._rng.random()
+        if outcome < self.rate_limit_rate:
+            # Rejections come back quickly, like a real 429
+            return min(delay, 0.1), FakeLLMError(
+                "Resource has been exhausted (simulated)",
+                code=429,
+                retry_after=self.retry_after,
+            )
+        if outcome < self.rate_limit_rate + self.error_rate:
+            return delay, FakeLLMError("Internal server error (simulated)")
+        return delay, None
+
+    def _with_cached_prefix(self, messages: Any) -> Any:
+        """Put the cached prefix back in front of the messages, as the provider would."""
+        if self.cached_content is None:
+            return messages
+        prefix = resolve_local_cache(self.cached_content)
+        if prefix is None:
+            raise FakeLLMError(
+                f"CachedContent not found: {self.cached_content} (simulated)", code=404
+            )
+        return [SystemMessage(content=prefix), *messages]
+
+    def with_structured_output(self, schema: type[BaseModel]) -> Runnable:
+        """Return a runnable that answers with instances of ``schema``."""
+
+        def invoke(messages: Any) -> BaseModel:
+            delay, error = self._draw()
+            time.sleep(delay)
+            if error is not None:
+                raise error
+            return build_structured_output(schema, self._with_cached_prefix(messages))
+
+        async def ainvoke(messages: Any) -> BaseModel:
+            delay, error = self._draw()
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return build_structured_output(schema, self._with_cached_prefix(messages))
+
+        return RunnableLambda(invoke, afunc=ainvoke)
+
+    async def astream_json(
+        self, schema: type[BaseModel], messages: Any, order: list[str]
+    ) -> AsyncIterator[str]:
+        """Stream the JSON of a structured answer in chunks, fields in ``order``.
+
+        The simulated latency is spread evenly over the text, so a field that
+        comes first is complete well before the whole answer.
+        """
+        delay, error = self._draw()
+        if error is not None:
+            await asyncio.sleep(delay)
+            raise error
+        answer = build_structured_output(schema, self._with_cached_prefix(messages))
+        values = answer.model_dump(mode="json")
+        text = json.dumps({name: values[name] for name in order if name in values})
+
+        chunks = max(1, len(text) // self.stream_chunk_size)
+        for position in range(chunks):
+            await asyncio.sleep(delay / chunks)
+            start = position * len(text) // chunks
+            yield text[start : (position + 1) * len(text) // chunks]
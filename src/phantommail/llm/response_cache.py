@@ -0,0 +1,199 @@
+"""Persistent exact-match cache of structured LLM answers, with a replay mode."""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+# Number of stored answers between two eviction passes
+EVICT_EVERY = 100
+
+
+class ResponseCacheMiss(LookupError):
+    """Raised in replay mode when an answer is not in the cache."""
+
+
+@dataclass
+class ResponseCacheStats:
+    """Hit/miss counters for the response cache."""
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary."""
+        return f"{self.hits} hit(s), {self.misses} miss(es), {self.stores} stored"
+
+
+class ResponseCache:
+    """SQLite-backed cache of structured answers, keyed on the exact request.
+
+    The key covers the model, temperature, output schema and the prompt with
+    its whitespace normalised. Entries older than ``ttl`` are dropped on read,
+    and once the cache holds more than ``max_entries`` the least recently used
+    entries are evicted. In replay mode every miss raises ``ResponseCacheMiss``
+    instead of falling through to the model.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_entries: int = 100_000,
+        ttl: float | None = None,
+        replay: bool = False,
+    ):
+        """Initialize the cache.
+
+        Args:
+            path: The SQLite database file, created if missing.
+            max_entries: Number of answers kept.
+            ttl: Seconds an answer stays valid, or None to keep it forever.
+            replay: Serve only from the cache and fail fast on a miss.
+
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.replay = replay
+        self.stats = ResponseCacheStats()
+        self._puts = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created REAL NOT NULL, used REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_used ON responses (used)"
+        )
+
+    @staticmethod
+    def make_key(
+        model: str,
+        temperature: float | None,
+        schema: type[BaseModel],
+        messages: list,
+    ) -> str:
+        """Return the cache key of one structured-output request."""
+        prompt = [
+            (
+                message.type if isinstance(message, BaseMessage) else "text",
+                re.sub(
+                    r"\s+",
+                    " ",
+                    str(
+                        message.content if isinstance(message, BaseMessage) else message
+                    ),
+                ).strip(),
+            )
+            for message in messages
+        ]
+        request = {
+            "model": model,
+            "temperature": temperature,
+            "schema": schema.model_json_schema(),
+            "prompt": prompt,
+        }
+        return hashlib.sha256(
+            json.dumps(request, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str, schema: type[BaseModel]) -> BaseModel | None:
+        """Return the cached answer for ``key``.
+
+        Raises:
+            ResponseCacheMiss: On a miss in replay mode.
+
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                self._connection.execute(
+                    "UPDATE responses SET used = ? WHERE key = ?", (now, key)
+                )
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+        if row is None:
+            if self.replay:
+                raise ResponseCacheMiss(f"No cached answer for request {key[:12]}")
+            return None
+        return schema.model_validate_json(row[0])
+
+    def put(self, key: str, value: BaseModel) -> None:
+        """Store an answer, evicting the least recently used beyond ``max_entries``."""
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, used) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value.model_dump_json(), now, now),
+            )
+            self._puts += 1
+            # Evicting scans the whole table, so it only runs every so often
+            if self._puts % EVICT_EVERY == 0 or self.max_entries < EVICT_EVERY:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                    "ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self.stats.stores += 1
+
+    def __len__(self) -> int:
+        """Return the number of cached answers."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        self._connection.close()
+
+
+def create_response_cache(
+    enabled: bool = False, replay: bool = False
+) -> ResponseCache | None:
+    """Create the response cache, or None when it is off.
+
+    The cache is on when ``enabled``, in replay mode or with ``LLM_CACHE=on``;
+    ``LLM_REPLAY=on`` turns on replay mode. Configured through
+    ``LLM_CACHE_PATH``, ``LLM_CACHE_MAX_ENTRIES`` and ``LLM_CACHE_TTL``
+    (seconds, unset keeps answers forever).
+    """
+    on = ("on", "1", "true")
+    replay = replay or os.environ.get("LLM_REPLAY", "off").lower() in on
+    enabled = enabled or os.environ.get("LLM_CACHE", "off").lower() in on
+    if not (enabled or replay):
+        return None
+    path = os.environ.get(
+        "LLM_CACHE_PATH", Path.home() / ".cache" / "phantommail" / "llm.sqlite"
+    )
+    ttl = os.environ.get("LLM_CACHE_TTL")
+    return ResponseCache(
+        path,
+        max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "100000")),
+        ttl=float(ttl) if ttl else None,
+        replay=replay,
+    )
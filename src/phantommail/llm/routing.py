@@ -0,0 +1,319 @@
+"""Route each kind of generation to its own chat model and record latencies."""
+
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import TypeVar
+
+from phantommail.llm.backends import ChatModel, create_chat_model
+from phantommail.llm.circuit_breaker import CircuitBreaker
+from phantommail.llm.context_cache import ContextCache, create_context_cache
+
+T = TypeVar("T")
+
+# A route is only hedged once this many latencies tell what slow means for it
+HEDGE_MIN_SAMPLES = 20
+
+
+@dataclass(frozen=True)
+class Route:
+    """The model settings for one kind of generation."""
+
+    model: str
+    temperature: float = 0.5
+    timeout: float | None = None
+
+
+# Keys are email types, "<type>.attachment" for calls that also write a PDF
+# attachment, and "default" for anything not listed
+DEFAULT_ROUTES = {
+    "default": Route("gemini-2.5-pro", 0.5, 120),
+    "order.attachment": Route("gemini-2.5-pro", 0.5, 120),
+    "declaration.attachment": Route("gemini-2.5-pro", 0.5, 120),
+    "order": Route("gemini-2.5-flash", 0.5, 60),
+    "declaration": Route("gemini-2.5-flash", 0.5, 60),
+    "price_request": Route("gemini-2.5-flash", 0.5, 60),
+    "waiting_costs": Route("gemini-2.5-flash", 0.5, 60),
+    "random": Route("gemini-2.5-flash", 0.7, 60),
+    "update_order": Route("gemini-2.5-flash-lite", 0.5, 30),
+    "question": Route("gemini-2.5-flash-lite", 0.5, 30),
+    "complaint": Route("gemini-2.5-flash-lite", 0.5, 30),
+}
+
+
+# Models in order of preference: a route whose model is listed falls back to
+# the models after it when that model fails or its circuit breaker is open
+DEFAULT_FALLBACKS = ["gemini-2.5-pro", "gemini-2.5-flash"]
+
+
+def load_fallbacks(spec: str | None = None) -> list[str]:
+    """Return the model fallback chain.
+
+    Args:
+        spec: Comma-separated model names, most preferred first. Defaults to
+            the LLM_FALLBACKS environment variable, or DEFAULT_FALLBACKS when
+            that is unset; an empty string disables fallbacks.
+
+    """
+    spec = spec if spec is not None else os.environ.get("LLM_FALLBACKS")
+    if spec is None:
+        return list(DEFAULT_FALLBACKS)
+    return [model.strip() for model in spec.split(",") if model.strip()]
+
+
+def load_routes(spec: str | None = None) -> dict[str, Route]:
+    """Return the routing table, with overrides applied to the defaults.
+
+    Args:
+        spec: JSON object, or the path of a JSON file, mapping route keys to
+            ``{"model": ..., "temperature": ..., "timeout": ...}``. Defaults to
+            the LLM_ROUTES environment variable.
+
+    """
+    spec = spec if spec is not None else os.environ.get("LLM_ROUTES", "")
+    routes = dict(DEFAULT_ROUTES)
+    if not spec.strip():
+        return routes
+
+    text = spec if spec.lstrip().startswith("{") else Path(spec).read_text()
+    for key, settings in json.loads(text).items():
+        routes[key] = Route(**settings)
+    return routes
+
+
+@dataclass
+class RouteStats:
+    """Latency of the calls made on one route."""
+
+    model: str
+    calls: int = 0
+    failures: int = 0
+    total_seconds: float = 0.0
+    samples: deque = field(default_factory=lambda: deque(maxlen=1000))
+    hedged: int = 0
+    hedge_wins: int = 0
+    fallbacks: int = 0
+    templated: int = 0
+
+    def percentile(self, fraction: float) -> float:
+        """Return a latency percentile (0..1) of the recent successful calls."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    @property
+    def mean(self) -> float:
+        """Mean latency of the successful calls."""
+        successes = self.calls - self.failures
+        return self.total_seconds / successes if successes else 0.0
+
+
+class ModelRouter:
+    """Hand out one shared chat model per route and track route latencies."""
+
+    def __init__(
+        self,
+        routes: dict[str, Route] | None = None,
+        backend: str | None = None,
+        context_cache: ContextCache | None = None,
+        fallbacks: list[str] | None = None,
+        breaker: Callable[[], CircuitBreaker] = CircuitBreaker.from_env,
+    ):
+        """Initialize the router.
+
+        Args:
+            routes: The routing table, ``load_routes()`` by default.
+            backend: The chat model backend, see ``create_chat_model``.
+            context_cache: Where static prompt prefixes are cached, by default
+                the cache of the backend, see ``create_context_cache``.
+            fallbacks: The model fallback chain, ``load_fallbacks()`` by
+                default.
+            breaker: Creates the circuit breaker of each model.
+
+        """
+        self.routes = routes if routes is not None else load_routes()
+        self.backend = backend
+        self.context_cache = (
+            context_cache
+            if context_cache is not None
+            else create_context_cache(backend)
+        )
+        self.fallbacks = fallbacks if fallbacks is not None else load_fallbacks()
+        self.breaker_factory = breaker
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.stats: dict[str, RouteStats] = {}
+        self._clients: dict[tuple[Route, str | None], ChatModel] = {}
+        self._lock = threading.Lock()
+
+    def route(self, key: str) -> Route:
+        """Return the route for ``key``, falling back to its email type."""
+        email_type = key.split(".", 1)[0]
+        return (
+            self.routes.get(key)
+            or self.routes.get(email_type)
+            or self.routes["default"]
+        )
+
+    def _resolve(self, key: str | Route) -> Route:
+        """Return ``key`` itself if it is a route, else its routing table entry."""
+        return key if isinstance(key, Route) else self.route(key)
+
+    def chain(self, key: str) -> list[Route]:
+        """Return the route for ``key`` followed by its fallback routes."""
+        route = self.route(key)
+        if route.model not in self.fallbacks:
+            return [route]
+        later = self.fallbacks[self.fallbacks.index(route.model) + 1 :]
+        return [route] + [replace(route, model=model) for model in later]
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """Return the circuit breaker of ``model``."""
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            breaker = self.breakers.setdefault(model, self.breaker_factory())
+        return breaker
+
+    def client(self, key: str | Route, cached_content: str | None = None) -> ChatModel:
+        """Return the chat model for ``key``, created once per distinct route.
+
+        ``key`` is a routing table key or a route, e.g. one of ``chain``. With
+        ``cached_content`` the model sends that cached prefix along with every
+        call, see ``cached_client``.
+        """
+        route = self._resolve(key)
+        with self._lock:
+            client = self._clients.get((route, cached_content))
+            if client is None:
+                client = create_chat_model(self.backend, route, cached_content)
+                self._clients[(route, cached_content)] = client
+        return client
+
+    def cached_client(self, key: str | Route, prefix: str) -> ChatModel | None:
+        """Return a chat model for ``key`` with ``prefix`` as cached context.
+
+        The prefix is registered with the context cache on first use. Calls
+        to the returned model leave the prefix out of their messages. None when
+        there is no context cache or the prefix could not be cached.
+        """
+        if self.context_cache is None:
+            return None
+        name = self.context_cache.get(self._resolve(key).model, prefix)
+        if name is None:
+            return None
+        return self.client(key, name)
+
+    def invalidate_prefix(
+        self, key: str | Route, prefix: str, cached_client: ChatModel
+    ) -> None:
+        """Drop a cached prefix the provider no longer has, and its chat model."""
+        self.context_cache.invalidate(self._resolve(key).model, prefix)
+        with self._lock:
+            for client_key, client in list(self._clients.items()):
+                if client is cached_client:
+                    del self._clients[client_key]
+
+    def route_stats(self, key: str) -> RouteStats:
+        """Return the statistics of route ``key``."""
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats.setdefault(key, RouteStats(self.route(key).model))
+        return stats
+
+    def record(self, key: str, seconds: float, failed: bool = False) -> None:
+        """Record the latency of one call made on route ``key``.
+
+        ``seconds`` is only kept for calls that succeeded.
+        """
+        stats = self.route_stats(key)
+        stats.calls += 1
+        if failed:
+            stats.failures += 1
+        else:
+            stats.total_seconds += seconds
+            stats.samples.append(seconds)
+
+    async def hedged(
+        self,
+        key: str,
+        call: Callable[[], Awaitable[T]],
+        fraction: float = 0.9,
+        served: asyncio.Event | None = None,
+    ) -> T:
+        """Run ``call``, and a duplicate of it once it is slow for route ``key``.
+
+        When the call has not finished after the ``fraction`` latency
+        percentile of the route, the same call is started a second time. The
+        first successful result wins and the other call is cancelled. Routes
+        with fewer than HEDGE_MIN_SAMPLES recorded latencies are not hedged.
+
+        A call that queues for a rate or concurrency limit first sets
+        ``served`` once it is past them: the delay counts from then, so a
+        backlog does not start hedges that only add to it.
+        """
+        stats = self.stats.get(key)
+        if stats is None or len(stats.samples) < HEDGE_MIN_SAMPLES:
+            return await call()
+
+        tasks = [asyncio.ensure_future(call())]
+        try:
+            if served is not None:
+                waiter = asyncio.ensure_future(served.wait())
+                try:
+                    await asyncio.wait(
+                        [tasks[0], waiter], return_when=asyncio.FIRST_COMPLETED
+                    )
+                finally:
+                    waiter.cancel()
+                if tasks[0].done():
+                    return tasks[0].result()
+            done, _ = await asyncio.wait(tasks, timeout=stats.percentile(fraction))
+            if done:
+                return tasks[0].result()
+
+            stats.hedged += 1
+            tasks.append(asyncio.ensure_future(call()))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            stats.hedge_wins += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def summary(self) -> list[str]:
+        """Return one line per used route with its call count and latencies."""
+        return [
+            f"{key} ({stats.model}): {stats.calls} call(s), {stats.failures} failed, "
+            f"mean {stats.mean:.1f}s, p50 {stats.percentile(0.5):.1f}s, "
+            f"p90 {stats.percentile(0.9):.1f}s"
+            + (
+                f", {stats.hedged} hedged ({stats.hedge_wins} won by the hedge)"
+                if stats.hedged
+                else ""
+            )
+            + (f", {stats.fallbacks} by a fallback model" if stats.fallbacks else "")
+            + (f", {stats.templated} from templates" if stats.templated else "")
+            for key, stats in sorted(self.stats.items())
+        ]
+
+    def breaker_summary(self) -> list[str]:
+        """Return one line per model whose circuit breaker saw a failure."""
+        return [
+            f"{model}: {breaker.summary()}"
+            for model, breaker in sorted(self.breakers.items())
+            if breaker.failures or breaker.refused
+        ]
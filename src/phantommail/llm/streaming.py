@@ -0,0 +1,121 @@
+"""Stream structured output and hand out each field as soon as it is complete."""
+
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+from langchain_core.language_models import BaseChatModel
+from pydantic import BaseModel
+
+from phantommail.llm.backends import ChatModel
+
+_WHITESPACE = " \t\r\n"
+
+
+class JsonObjectStream:
+    """Incremental parser for the JSON object a model streams.
+
+    Feed it the text chunks as they arrive; ``feed`` returns the top-level
+    members whose value is complete, each exactly once.
+    """
+
+    def __init__(self):
+        """Initialize the parser."""
+        self.fields: dict[str, Any] = {}
+        self.closed = False
+        self._buffer = ""
+        self._position = 0
+        self._decoder = json.JSONDecoder()
+
+    def _skip(self, characters: str) -> int:
+        """Return the first position from the current one not in ``characters``."""
+        position = self._position
+        while position < len(self._buffer) and self._buffer[position] in characters:
+            position += 1
+        return position
+
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        """Add a chunk of text and return the members it completed."""
+        self._buffer += text
+        completed = []
+        while not self.closed:
+            position = self._skip(_WHITESPACE + "{,")
+            if position >= len(self._buffer):
+                break
+            if self._buffer[position] == "}":
+                self.closed = True
+                break
+            try:
+                name, position = self._decoder.raw_decode(self._buffer, position)
+                while self._buffer[position] in _WHITESPACE:
+                    position += 1
+                if self._buffer[position] != ":":
+                    raise ValueError(f"Expected ':' after {name!r}")
+                position += 1
+                while self._buffer[position] in _WHITESPACE:
+                    position += 1
+                value, position = self._decoder.raw_decode(self._buffer, position)
+                # A number at the end of the buffer may still be growing
+                end = position
+                while self._buffer[end] in _WHITESPACE:
+                    end += 1
+            except (json.JSONDecodeError, IndexError):
+                break
+            self.fields[name] = value
+            completed.append((name, value))
+            self._position = end
+        return completed
+
+    def result(self) -> dict[str, Any]:
+        """Return the parsed object, raising if the stream stopped early."""
+        if not self.closed:
+            raise ValueError("The structured output stream ended before the object")
+        return self.fields
+
+
+def can_stream(llm: ChatModel) -> bool:
+    """Whether ``stream_json`` can stream the output of ``llm``."""
+    return hasattr(llm, "astream_json") or isinstance(llm, BaseChatModel)
+
+
+def _ordered_json_schema(
+    schema: type[BaseModel], first: Sequence[str]
+) -> dict[str, Any]:
+    """Return the JSON schema of ``schema`` with the ``first`` properties first."""
+    json_schema = schema.model_json_schema()
+    properties = json_schema["properties"]
+    order = [name for name in first if name in properties]
+    order += [name for name in properties if name not in order]
+    json_schema["properties"] = {name: properties[name] for name in order}
+    return json_schema
+
+
+async def stream_json(
+    llm: ChatModel,
+    schema: type[BaseModel],
+    messages: list,
+    first: Sequence[str] = (),
+) -> AsyncIterator[str]:
+    """Stream the raw JSON text of a structured-output call.
+
+    Args:
+        llm: A chat model for which ``can_stream`` is true.
+        schema: The structured output.
+        messages: The prompt.
+        first: Fields the model is asked to write before the others (Gemini
+            writes the properties in the order of the response schema).
+
+    """
+    json_schema = _ordered_json_schema(schema, first)
+    if hasattr(llm, "astream_json"):
+        async for text in llm.astream_json(
+            schema, messages, list(json_schema["properties"])
+        ):
+            yield text
+        return
+
+    bound = llm.bind(
+        response_mime_type="application/json", response_json_schema=json_schema
+    )
+    async for chunk in bound.astream(messages):
+        yield chunk.text
@@ -1,5 +1,6 @@
 """PhantomMail main entry point with interactive terminal menu."""
 
+import argparse
 import asyncio
 import os
 import sys
@@ -7,24 +8,355 @@ import sys
 from dotenv import load_dotenv
 
 from phantommail.cli.menu import InteractiveMenu, MenuSelection
-from phantommail.cli.runner import EmailRunner
+from phantommail.cli.producer import BufferProducer
+from phantommail.cli.runner import PIPELINE_STAGES, EmailRunner
+from phantommail.fakers.faker_pool import SEEDED_NOW
+from phantommail.helpers.corpus_export import (
+    COMPRESSIONS,
+    EXPORT_FORMATS,
+    create_exporter,
+)
+from phantommail.helpers.email_buffer import EmailBuffer, get_email_buffer
+from phantommail.helpers.html_to_pdf import shutdown_renderer
+from phantommail.helpers.send_ledger import SendLedger, create_send_ledger
+from phantommail.llm import LLM_BACKENDS
+from phantommail.llm.batching import LLMBatcher, create_batch_jobs
+from phantommail.llm.response_cache import create_response_cache
 from phantommail.logger import setup_logger
+from phantommail.transports import MAIL_TRANSPORTS, create_transport
 
 load_dotenv()
 logger = setup_logger(__name__)
 
 
-async def send_emails(selection: MenuSelection, sender_email: str):
+def parse_deadline(value: str) -> tuple[str, float]:
+    """Parse a ``STAGE=SECONDS`` deadline option."""
+    stage, _, seconds = value.partition("=")
+    if stage not in PIPELINE_STAGES:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage {stage!r}, expected one of {', '.join(PIPELINE_STAGES)}"
+        )
+    try:
+        return stage, float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid seconds in {value!r}") from None
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(
+        prog="phantommail", description="PhantomMail - Fake Email Generator"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of emails generated and sent in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--llm-rate",
+        type=float,
+        default=None,
+        help="Maximum LLM calls per second (default: unlimited)",
+    )
+    parser.add_argument(
+        "--send-rate",
+        type=float,
+        default=2.0,
+        help="Maximum sends per second (default: 2, Resend's default limit)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=MAIL_TRANSPORTS,
+        default=None,
+        help="How emails are delivered: the Resend API, an SMTP server, a local "
+        "Maildir, mbox or .eml directory, or nowhere (default: MAIL_TRANSPORT, "
+        "then resend)",
+    )
+    parser.add_argument(
+        "--export",
+        default=None,
+        metavar="DIR",
+        help="Write the emails, their attachments and the fake data they were "
+        "written from to a sharded corpus in DIR instead of sending them",
+    )
+    parser.add_argument(
+        "--export-format",
+        choices=EXPORT_FORMATS,
+        default="jsonl",
+        help="Corpus format: JSONL records, or mbox files or tar archives of "
+        ".eml files with a JSONL ground truth file per shard (default: jsonl)",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Emails per corpus shard (default: EXPORT_SHARD_SIZE, then 1000)",
+    )
+    parser.add_argument(
+        "--export-compression",
+        choices=list(COMPRESSIONS),
+        default=None,
+        help="Compression of the corpus shards (default: EXPORT_COMPRESSION, "
+        "then gzip)",
+    )
+    parser.add_argument(
+        "--send-batch",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Send emails without attachments in batch requests of up to N "
+        "(max 100); use with a --concurrency of at least N",
+    )
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt the LLM calls and sends in flight to the observed latency "
+        "and rate limits, up to --concurrency",
+    )
+    parser.add_argument(
+        "--llm-latency-target",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="With --adaptive, stop adding LLM calls once their p95 latency "
+        "exceeds this (default: grow until rate limited)",
+    )
+    parser.add_argument(
+        "--send-latency-target",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="With --adaptive, the same for sends",
+    )
+    parser.add_argument(
+        "--deadline",
+        action="append",
+        type=parse_deadline,
+        default=[],
+        metavar="STAGE=SECONDS",
+        help="Fail an email whose generate, render or send stage takes longer "
+        "than SECONDS; repeat for several stages",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Start a second LLM call when the first runs past the p90 latency "
+        "of its email type, and keep whichever answers first",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for reproducible email types and fake data; dates in seeded "
+        f"runs are relative to a clock frozen at {SEEDED_NOW:%Y-%m-%d %H:%M}",
+    )
+    generation = parser.add_mutually_exclusive_group()
+    generation.add_argument(
+        "--no-llm",
+        action="store_true",
+        help="Build emails from fake data and the example templates, without the LLM",
+    )
+    generation.add_argument(
+        "--slots",
+        action="store_true",
+        help="Have the LLM write only the slot values of order and customs "
+        "emails and render their HTML from the example templates",
+    )
+    parser.add_argument(
+        "--llm-backend",
+        choices=LLM_BACKENDS,
+        default=None,
+        help="Chat model backend; 'fake' simulates the LLM offline, see the "
+        "FAKE_LLM_* variables (default: LLM_BACKEND or google)",
+    )
+    parser.add_argument(
+        "--llm-cache",
+        action="store_true",
+        help="Cache LLM answers on disk and reuse them for identical prompts "
+        "(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL)",
+    )
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serve LLM answers only from the cache and fail on a miss; "
+        "combine with the --seed of the recorded run",
+    )
+    parser.add_argument(
+        "--ledger",
+        action="store_true",
+        help="Record every email and its send status in a SQLite ledger "
+        "(SEND_LEDGER_PATH), so the run can be resumed with --resume",
+    )
+    parser.add_argument(
+        "--resume",
+        nargs="?",
+        const="",
+        default=None,
+        metavar="RUN_ID",
+        help="Continue a recorded run, by default the latest one: skip its sent "
+        "emails and send the ones it generated unchanged",
+    )
+    parser.add_argument(
+        "--llm-batch",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Group up to N concurrent LLM calls per route into one batch; "
+        "use with a --concurrency of at least N",
+    )
+    parser.add_argument(
+        "--batch-jobs",
+        action="store_true",
+        help="Submit the --llm-batch batches as offline batch jobs (cheaper, "
+        "much slower), for bulk corpus generation",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream order and customs answers and start the PDF render as soon "
+        "as the attachment HTML is complete",
+    )
+    pipeline = parser.add_argument_group(
+        "pipeline mode",
+        "Run generation, PDF rendering and sending as separate stages with "
+        "their own workers and bounded queues",
+    )
+    pipeline.add_argument(
+        "--pipeline", action="store_true", help="Enable the staged pipeline"
+    )
+    pipeline.add_argument("--generate-workers", type=int, default=4)
+    pipeline.add_argument("--render-workers", type=int, default=2)
+    pipeline.add_argument("--send-workers", type=int, default=2)
+    pipeline.add_argument(
+        "--queue-size", type=int, default=16, help="Capacity of each stage queue"
+    )
+    buffer = parser.add_argument_group(
+        "pre-generation buffer",
+        "Keep a stock of generated emails per type (EMAIL_BUFFER_DIR, "
+        "EMAIL_BUFFER_SIZE per type) so runs only have to send",
+    )
+    buffer.add_argument(
+        "--buffer",
+        action="store_true",
+        help="Send emails from the buffer first, generating only what is missing",
+    )
+    buffer.add_argument(
+        "--fill-buffer",
+        action="store_true",
+        help="Run the producer that keeps the buffer full, instead of the menu",
+    )
+    buffer.add_argument(
+        "--buffer-rate",
+        type=float,
+        default=None,
+        help="Maximum emails per second the producer generates (default: unlimited)",
+    )
+    return parser.parse_args(argv)
+
+
+def create_runner(
+    sender_email: str,
+    args: argparse.Namespace,
+    buffer: EmailBuffer | None = None,
+    ledger: SendLedger | None = None,
+    resume: str | None = None,
+) -> EmailRunner:
+    """Create the email runner configured by the command line options."""
+    return EmailRunner(
+        sender_email,
+        concurrency=args.concurrency,
+        llm_rate=args.llm_rate,
+        send_rate=args.send_rate,
+        pipeline_workers=(
+            {
+                "generate": args.generate_workers,
+                "render": args.render_workers,
+                "send": args.send_workers,
+            }
+            if args.pipeline
+            else None
+        ),
+        queue_size=args.queue_size,
+        seed=args.seed,
+        generation_mode="template" if args.no_llm else "slots" if args.slots else "llm",
+        llm_backend=args.llm_backend,
+        stream_llm=args.stream,
+        buffer=buffer,
+        llm_cache=create_response_cache(args.llm_cache, args.replay),
+        llm_batcher=(
+            LLMBatcher(
+                args.llm_batch,
+                jobs=create_batch_jobs(args.llm_backend) if args.batch_jobs else None,
+            )
+            if args.llm_batch
+            else None
+        ),
+        adaptive=args.adaptive,
+        llm_latency_target=args.llm_latency_target,
+        send_latency_target=args.send_latency_target,
+        deadlines=dict(args.deadline),
+        hedge_llm=args.hedge,
+        transport=None if args.export else create_transport(args.transport),
+        send_batch=args.send_batch,
+        ledger=ledger,
+        resume=resume,
+        exporter=create_exporter(
+            args.export, args.export_format, args.shard_size, args.export_compression
+        ),
+    )
+
+
+async def send_emails(
+    selection: MenuSelection,
+    sender_email: str,
+    args: argparse.Namespace,
+    ledger: SendLedger | None = None,
+    resume: str | None = None,
+):
     """Send emails based on menu selection."""
-    runner = EmailRunner(sender_email)
+    runner = create_runner(
+        sender_email,
+        args,
+        get_email_buffer() if args.buffer else None,
+        ledger,
+        resume,
+    )
     results = await runner.run(selection)
     runner.print_summary(results)
 
 
+async def fill_buffer(args: argparse.Namespace):
+    """Keep the pre-generation buffer full until interrupted."""
+    buffer = get_email_buffer()
+    runner = create_runner(os.environ.get("SENDER_EMAIL", ""), args)
+    producer = BufferProducer(
+        buffer, runner.config, rate=args.buffer_rate, workers=args.concurrency
+    )
+    print(
+        f"Keeping {buffer.capacity} email(s) per type in {buffer.directory}, "
+        "press Ctrl+C to stop\n"
+    )
+    try:
+        await producer.run()
+    finally:
+        await shutdown_renderer()
+        print(f"\nGenerated {producer.produced} email(s), {producer.failed} failed")
+
+
 def main():
     """Run PhantomMail CLI."""
+    args = parse_args()
     print("\nPhantomMail - Fake Email Generator\n")
 
+    if args.fill_buffer:
+        try:
+            asyncio.run(fill_buffer(args))
+        except KeyboardInterrupt:
+            pass
+        return
+
     # Validate environment
     sender_email = os.environ.get("SENDER_EMAIL")
     if not sender_email:
@@ -32,27 +364,48 @@ def main():
         print("Please set it in your .env file or environment.")
         sys.exit(1)
 
-    resend_key = os.environ.get("RESEND_API_KEY")
-    if not resend_key:
+    # Exported emails are not sent, so no transport needs configuring
+    transport = (
+        None
+        if args.export
+        else args.transport or os.environ.get("MAIL_TRANSPORT", "resend")
+    )
+    if transport == "resend" and not os.environ.get("RESEND_API_KEY"):
         print("Error: RESEND_API_KEY environment variable not set.")
         print("Please set it in your .env file or environment.")
         sys.exit(1)
 
-    # Run interactive menu (synchronous - before async context)
-    menu = InteractiveMenu()
-    try:
-        selection = menu.run()
-    except KeyboardInterrupt:
-        print("\n\nOperation cancelled by user.")
-        sys.exit(0)
+    if transport == "smtp" and not os.environ.get("SMTP_HOST"):
+        print("Error: SMTP_HOST environment variable not set.")
+        print("Please set it in your .env file or environment.")
+        sys.exit(1)
 
-    if selection is None:
-        print("\nOperation cancelled.")
-        return
+    ledger = create_send_ledger(args.ledger or args.resume is not None)
+    resume = None
+    if args.resume is not None:
+        # A resumed run sends what it planned, without asking again
+        run = ledger.run(args.resume or None)
+        if run is None:
+            print(f"Error: no run {args.resume or 'to resume'} in {ledger.path}.")
+            sys.exit(1)
+        resume = run.run_id
+        selection = MenuSelection(**run.selection)
+    else:
+        # Run interactive menu (synchronous - before async context)
+        menu = InteractiveMenu()
+        try:
+            selection = menu.run()
+        except KeyboardInterrupt:
+            print("\n\nOperation cancelled by user.")
+            sys.exit(0)
+
+        if selection is None:
+            print("\nOperation cancelled.")
+            return
 
     # Execute email sending (async)
     try:
-        asyncio.run(send_emails(selection, sender_email))
+        asyncio.run(send_emails(selection, sender_email, args, ledger, resume))
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.")
         sys.exit(0)
@@ -1,6 +1,7 @@
+import base64
 from typing import List
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Email(BaseModel):
@@ -14,6 +15,26 @@ class Email(BaseModel):
     )
 
 
+class Attachment(BaseModel):
+    """A file attached to an email, holding its raw bytes.
+
+    The contents are kept as bytes all the way to the transport; encoding
+    (base64 or otherwise) happens only at the wire boundary.
+    """
+
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
+    filename: str = Field(..., description="The file name shown to the recipient")
+    content: bytes = Field(..., description="The raw file contents")
+    content_type: str = Field(
+        "application/pdf", description="The MIME type of the attachment"
+    )
+
+    def to_base64(self) -> str:
+        """Encode the contents as a base64 string."""
+        return base64.b64encode(self.content).decode("ascii")
+
+
 class FullEmail(Email):
     """A full email."""
 
@@ -25,6 +46,10 @@ class FullEmail(Email):
     bcc: List[str] | None = Field(
         None, description="List of BCC (blind carbon copy) recipient email addresses"
     )
-    attachments: List[str] | None = Field(
-        None, description="List of file paths or names for email attachments"
+    attachments: List[Attachment] | None = Field(
+        None, description="List of files attached to the email"
+    )
+    idempotency_key: str | None = Field(
+        None,
+        description="Key under which the mail service sends the email only once",
     )
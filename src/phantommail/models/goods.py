@@ -133,13 +133,17 @@ class Goods(BaseModel):
     description: str
 
     @classmethod
-    def random(cls) -> "Goods":
-        """Generate a random good with reasonable default values."""
-        name = random.choice(goods_list)
+    def random(cls, rng: random.Random | None = None) -> "Goods":
+        """Generate a random good with reasonable default values.
+
+        Values are drawn from ``rng``, the global random module by default.
+        """
+        rng = rng or random
+        name = rng.choice(goods_list)
         return cls(
             name=name,
-            quantity=random.randint(1, 100),
-            weight=random.randint(350, 1000),
-            volume=random.randint(10, 1000),
+            quantity=rng.randint(1, 100),
+            weight=rng.randint(350, 1000),
+            volume=rng.randint(10, 1000),
             description=f"A shipment of {name.lower()}",
         )
@@ -1,6 +1,5 @@
 """Email sending functionality using the Resend API."""
 
-import base64
 import os
 
 import resend
@@ -11,13 +10,14 @@ from phantommail.models.email import FullEmail
 logger = setup_logger(__name__)
 
 
-def send(email: FullEmail) -> str:
+def send(email: FullEmail, raise_errors: bool = False) -> str:
     """Send an email to the recipient with the given subject and body.
 
     Args:
         subject (str): The subject of the email.
         body (str): The body of the email.
         recipient_email (str): The email address of the recipient.
+        raise_errors (bool): Raise the Resend error instead of returning it.
 
     Returns:
         str: A message indicating that the email was sent successfully.
@@ -33,18 +33,25 @@ def send(email: FullEmail) -> str:
         "cc": email.cc,
         "bcc": email.bcc,
     }
-    if len(email.attachments) > 0:
+    if email.attachments:
+        # Resend accepts base64 content, encode only at the wire boundary
         params["attachments"] = [
             {
-                "content": list(base64.b64decode(attachment.encode("utf-8"))),
-                "filename": f"attachment_{i}.pdf",
+                "content": attachment.to_base64(),
+                "filename": attachment.filename,
+                "content_type": attachment.content_type,
             }
-            for i, attachment in enumerate(email.attachments)
+            for attachment in email.attachments
         ]
     try:
-        email = resend.Emails.send(params)
+        options: resend.Emails.SendOptions = (
+            {"idempotency_key": email.idempotency_key} if email.idempotency_key else {}
+        )
+        email = resend.Emails.send(params, options)
         logger.info("Email sent successfully! ")
         return "Email sent successfully!"
     except Exception as e:
         logger.error(f"Error sending email: {e}")
+        if raise_errors:
+            raise
         return f"Error sending email: {e}"
@@ -0,0 +1,26 @@
+"""Mail transports for the phantommail package."""
+
+from phantommail.transports.base import (
+    MAIL_TRANSPORTS,
+    DeliveryError,
+    Transport,
+    create_transport,
+)
+from phantommail.transports.batching import BatchingTransport
+from phantommail.transports.resend_api import ResendTransport
+from phantommail.transports.sinks import EmlSink, MaildirSink, MboxSink, NullSink
+from phantommail.transports.smtp import SMTPTransport
+
+__all__ = [
+    "MAIL_TRANSPORTS",
+    "DeliveryError",
+    "Transport",
+    "create_transport",
+    "BatchingTransport",
+    "ResendTransport",
+    "SMTPTransport",
+    "MaildirSink",
+    "MboxSink",
+    "EmlSink",
+    "NullSink",
+]
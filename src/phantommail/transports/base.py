@@ -0,0 +1,94 @@
+import os
+import random
+from pathlib import Path
+from typing import Protocol
+
+from phantommail.models.email import FullEmail
+
+# Transports accepted by ``create_transport`` and the MAIL_TRANSPORT variable
+MAIL_TRANSPORTS = ("resend", "smtp", "maildir", "mbox", "eml", "null")
+
+
+class DeliveryError(Exception):
+    """A send the transport gave up on.
+
+    ``code`` is the status the service answered the last attempt with, and
+    ``retry_after`` the seconds it asked to wait, if any. ``permanent`` tells
+    that sending the same email again would fail the same way.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        code: int | None = None,
+        retry_after: float | None = None,
+        permanent: bool = False,
+    ):
+        """Initialize the error."""
+        super().__init__(message)
+        self.code = code
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+
+class Transport(Protocol):
+    """What the send node needs from a mail transport."""
+
+    async def send(self, email: FullEmail) -> str:
+        """Deliver ``email`` and return the id the service gave it."""
+        ...
+
+    async def aclose(self) -> None:
+        """Release the connections of the transport."""
+        ...
+
+
+def backoff_delay(attempt: int, base: float, cap: float = 30.0) -> float:
+    """Return the wait before retry ``attempt`` (0-based), with full jitter.
+
+    Drawing the whole wait at random keeps concurrent senders that failed
+    together from retrying together.
+    """
+    return random.uniform(0.0, min(cap, base * 2**attempt))
+
+
+def create_transport(name: str | None = None) -> Transport:
+    """Create the mail transport ``name``.
+
+    The local sinks write under MAIL_SINK_PATH, by default in
+    ``~/.cache/phantommail/outbox`` (``outbox.mbox`` for "mbox").
+
+    Args:
+        name: "resend" for the Resend API, "smtp" for an SMTP server
+            configured by the SMTP_* variables, "maildir", "mbox" or "eml" to
+            keep the emails locally, or "null" to drop them. Defaults to the
+            MAIL_TRANSPORT environment variable, then "resend".
+
+    """
+    name = name or os.environ.get("MAIL_TRANSPORT", "resend")
+    # Imported here, the transports import this module for DeliveryError
+    if name == "resend":
+        from phantommail.transports.resend_api import ResendTransport
+
+        return ResendTransport.from_env()
+    if name == "smtp":
+        from phantommail.transports.smtp import SMTPTransport
+
+        return SMTPTransport.from_env()
+
+    from phantommail.transports import sinks
+
+    outbox = Path.home() / ".cache" / "phantommail" / "outbox"
+    if name == "maildir":
+        return sinks.MaildirSink(os.environ.get("MAIL_SINK_PATH", outbox))
+    if name == "mbox":
+        return sinks.MboxSink(
+            os.environ.get("MAIL_SINK_PATH", outbox.with_suffix(".mbox"))
+        )
+    if name == "eml":
+        return sinks.EmlSink(os.environ.get("MAIL_SINK_PATH", outbox))
+    if name == "null":
+        return sinks.NullSink()
+    raise ValueError(
+        f"Unknown mail transport {name!r}, expected one of {', '.join(MAIL_TRANSPORTS)}"
+    )
@@ -0,0 +1,136 @@
+"""Group ready emails into batch requests to the mail service."""
+
+import asyncio
+
+from phantommail.helpers.rate_limiter import TokenBucket
+from phantommail.logger import setup_logger
+from phantommail.models.email import FullEmail
+from phantommail.transports.base import DeliveryError
+from phantommail.transports.resend_api import MAX_BATCH, ResendTransport
+
+logger = setup_logger(__name__)
+
+
+class BatchingTransport:
+    """Collect ready emails and send them in batch requests.
+
+    Emails without attachments wait up to ``max_wait`` seconds for others and
+    go out ``max_batch`` at a time through the batch endpoint, each caller
+    getting the result of its own email. Emails with attachments, which the
+    batch endpoint does not take, are sent one by one, as are the emails of a
+    batch the endpoint refuses as a whole. Every request, batch or single,
+    takes a token from ``rate_limiter``. An email whose caller is cancelled
+    before its batch goes out is left out of the batch.
+    """
+
+    def __init__(
+        self,
+        transport: ResendTransport,
+        max_batch: int = MAX_BATCH,
+        max_wait: float = 0.5,
+        rate_limiter: TokenBucket | None = None,
+    ):
+        """Initialize the batching transport.
+
+        Args:
+            transport: Sends the batches and the single emails.
+            max_batch: Most emails per batch request.
+            max_wait: Seconds the first email of a batch waits for others.
+            rate_limiter: Paces the requests to the service.
+
+        """
+        if not 1 <= max_batch <= MAX_BATCH:
+            raise ValueError(f"max_batch must be between 1 and {MAX_BATCH}")
+        self.transport = transport
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.rate_limiter = rate_limiter
+        self.requests = 0
+        self.batches = 0
+        self.emails = 0
+        self._pending: list[tuple[FullEmail, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._running: set[asyncio.Task] = set()
+
+    async def send(self, email: FullEmail) -> str:
+        """Queue ``email`` for the next batch and return its id once sent."""
+        self.emails += 1
+        if email.attachments:
+            return await self._send_one(email)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((email, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush
+            )
+        return await future
+
+    def _flush(self) -> None:
+        """Submit the queued emails as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch = [entry for entry in self._pending if not entry[1].cancelled()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.create_task(self._submit(batch))
+        # Keep a reference until the batch is done, the loop only holds weak ones
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _acquire(self) -> None:
+        """Wait for the rate limiter and count one request."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        self.requests += 1
+
+    async def _send_one(self, email: FullEmail) -> str:
+        """Send a single email outside of any batch."""
+        await self._acquire()
+        return await self.transport.send(email)
+
+    async def _submit(self, batch: list[tuple[FullEmail, asyncio.Future]]) -> None:
+        """Send one batch and hand every result to the email it belongs to."""
+        try:
+            await self._acquire()
+            # Callers may have given up while the batch waited for a token
+            batch = [entry for entry in batch if not entry[1].cancelled()]
+            if not batch:
+                return
+            emails = [email for email, _ in batch]
+            self.batches += 1
+            results = await self.transport.send_batch(emails)
+        except DeliveryError as error:
+            if error.code is None or error.code == 429 or error.code >= 500:
+                results = [error] * len(batch)
+            else:
+                logger.warning(f"Batch refused, sending its emails one by one: {error}")
+                results = await asyncio.gather(
+                    *(self._send_one(email) for email in emails),
+                    return_exceptions=True,
+                )
+        except Exception as error:
+            results = [error] * len(batch)
+
+        for (_, future), result in zip(batch, results, strict=True):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def aclose(self) -> None:
+        """Send what is still queued, then close the underlying transport."""
+        self._flush()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        await self.transport.aclose()
+
+    def summary(self) -> str:
+        """Return a one-line human readable summary."""
+        return f"{self.emails} email(s) in {self.requests} request(s)"
@@ -0,0 +1,40 @@
+"""Build the RFC 5322 message of a ``FullEmail``."""
+
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+from phantommail.models.email import FullEmail
+
+
+def to_mime(email: FullEmail, message_id: str | None = None) -> EmailMessage:
+    """Return ``email`` as a MIME message, attachments included.
+
+    Bcc recipients are left out of the headers, the transport adds them to the
+    envelope only. An email with an idempotency key gets a Message-ID derived
+    from it, so every attempt to send it carries the same one.
+    """
+    message = EmailMessage()
+    message["From"] = email.sender
+    message["To"] = ", ".join(email.to)
+    if email.cc:
+        message["Cc"] = ", ".join(email.cc)
+    message["Subject"] = email.subject
+    message["Date"] = formatdate(localtime=True)
+    if message_id is None and email.idempotency_key:
+        message_id = f"<{email.idempotency_key}@phantommail>"
+    message["Message-ID"] = message_id or make_msgid(domain="phantommail")
+    message.set_content(email.body_html, subtype="html")
+    for attachment in email.attachments or []:
+        maintype, _, subtype = attachment.content_type.partition("/")
+        message.add_attachment(
+            attachment.content,
+            maintype=maintype,
+            subtype=subtype or "octet-stream",
+            filename=attachment.filename,
+        )
+    return message
+
+
+def recipients(email: FullEmail) -> list[str]:
+    """Return every envelope recipient of ``email``, Bcc included."""
+    return [*email.to, *(email.cc or []), *(email.bcc or [])]
@@ -0,0 +1,217 @@
+"""Send emails through the Resend HTTP API without blocking the event loop."""
+
+import asyncio
+import itertools
+import os
+import uuid
+from typing import Any
+
+import httpx
+
+from phantommail.helpers.rate_limiter import retry_after
+from phantommail.logger import setup_logger
+from phantommail.models.email import FullEmail
+from phantommail.transports.base import DeliveryError, backoff_delay
+
+logger = setup_logger(__name__)
+
+RESEND_API_URL = "https://api.resend.com"
+
+# Answers worth another attempt: rate limited or a problem on Resend's side
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Most emails the batch endpoint takes per request
+MAX_BATCH = 100
+
+
+def resend_payload(email: FullEmail) -> dict:
+    """Return the body of the Resend ``POST /emails`` request for ``email``."""
+    payload = {
+        "from": email.sender,
+        "to": email.to,
+        "subject": email.subject,
+        "html": email.body_html,
+    }
+    if email.cc:
+        payload["cc"] = email.cc
+    if email.bcc:
+        payload["bcc"] = email.bcc
+    if email.attachments:
+        # Resend accepts base64 content, encode only at the wire boundary
+        payload["attachments"] = [
+            {
+                "content": attachment.to_base64(),
+                "filename": attachment.filename,
+                "content_type": attachment.content_type,
+            }
+            for attachment in email.attachments
+        ]
+    return payload
+
+
+class ResendTransport:
+    """Resend API client on a pooled, keep-alive ``httpx.AsyncClient``.
+
+    Connections are reused across sends, up to ``pool_size`` at once. Rate
+    limits, server errors and network errors are retried with exponential
+    backoff and full jitter, waiting at least the Retry-After Resend sent.
+    Every attempt of a send carries the same idempotency key, so a retry
+    after a lost answer does not deliver the email twice.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        pool_size: int = 10,
+        timeout: float = 30.0,
+        connect_timeout: float = 5.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        base_url: str = RESEND_API_URL,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """Initialize the transport, the HTTP client is created on first use.
+
+        Args:
+            api_key: The Resend API key, RESEND_API_KEY by default.
+            pool_size: Maximum connections open at once, all kept alive.
+            timeout: Seconds a request may take.
+            connect_timeout: Seconds opening a connection may take.
+            retries: Attempts after the first one.
+            backoff: Base of the exponential backoff in seconds.
+            base_url: The API endpoint.
+            transport: An httpx transport replacing the network, for tests.
+
+        """
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.base_url = base_url
+        self.sent = 0
+        self.retried = 0
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+
+    @classmethod
+    def from_env(cls) -> "ResendTransport":
+        """Configure the transport from the RESEND_* environment variables.
+
+        RESEND_POOL_SIZE, RESEND_TIMEOUT (seconds) and RESEND_RETRIES map to
+        the constructor arguments.
+        """
+        return cls(
+            pool_size=int(os.environ.get("RESEND_POOL_SIZE", "10")),
+            timeout=float(os.environ.get("RESEND_TIMEOUT", "30")),
+            retries=int(os.environ.get("RESEND_RETRIES", "3")),
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use."""
+        if self._client is None:
+            api_key = self.api_key or os.environ["RESEND_API_KEY"]
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {api_key}"},
+                limits=httpx.Limits(
+                    max_connections=self.pool_size,
+                    max_keepalive_connections=self.pool_size,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def _post(
+        self, path: str, payload: Any, headers: dict[str, str] | None = None
+    ) -> Any:
+        """POST ``payload`` to ``path``, retrying failures, and return the answer.
+
+        Raises:
+            DeliveryError: When Resend refused the request, or kept failing.
+            httpx.TransportError: When the network kept failing.
+
+        """
+        headers = {"Idempotency-Key": str(uuid.uuid4()), **(headers or {})}
+        for attempt in itertools.count():
+            try:
+                response = await self.client.post(path, json=payload, headers=headers)
+            except httpx.TransportError as error:
+                if attempt >= self.retries:
+                    raise
+                logger.warning(f"Resend request failed, retrying: {error!r}")
+                wait = 0.0
+            else:
+                if response.is_success:
+                    return response.json()
+                wait = retry_after(response) or 0.0
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt >= self.retries
+                ):
+                    raise DeliveryError(
+                        f"Resend answered {response.status_code}: {response.text}",
+                        code=response.status_code,
+                        retry_after=wait or None,
+                        permanent=response.status_code not in RETRY_STATUSES,
+                    )
+                logger.warning(f"Resend answered {response.status_code}, retrying")
+            self.retried += 1
+            await asyncio.sleep(max(wait, backoff_delay(attempt, self.backoff)))
+
+    async def send(self, email: FullEmail) -> str:
+        """Send ``email`` and return its Resend id, see ``_post`` for errors."""
+        logger.info(f"Sending email to {email.to} with subject: {email.subject}")
+        answer = await self._post(
+            "/emails",
+            resend_payload(email),
+            headers=(
+                {"Idempotency-Key": email.idempotency_key}
+                if email.idempotency_key
+                else None
+            ),
+        )
+        self.sent += 1
+        logger.info("Email sent successfully!")
+        return answer.get("id", "")
+
+    async def send_batch(self, emails: list[FullEmail]) -> list[str | DeliveryError]:
+        """Send up to MAX_BATCH emails without attachments in one request.
+
+        The batch is validated permissively, so Resend sends the valid emails
+        and reports the others. Returns the id of every email, or the error
+        Resend reported for it, in the order of ``emails``.
+        """
+        logger.info(f"Sending a batch of {len(emails)} email(s)")
+        answer = await self._post(
+            "/emails/batch",
+            [resend_payload(email) for email in emails],
+            headers={"x-batch-validation": "permissive"},
+        )
+        errors = {
+            error["index"]: DeliveryError(
+                error.get("message", "Refused by Resend"), permanent=True
+            )
+            for error in answer.get("errors") or []
+        }
+        # The ids of the accepted emails come in the order they were sent
+        ids = iter(item["id"] for item in answer.get("data") or [])
+        results = []
+        for index in range(len(emails)):
+            result = errors.get(index) or next(ids, None)
+            results.append(
+                result
+                if result is not None
+                else DeliveryError(f"Resend returned no id for email {index}")
+            )
+        self.sent += sum(isinstance(result, str) for result in results)
+        return results
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,106 @@
+"""Transports that keep the emails locally instead of delivering them."""
+
+import asyncio
+import itertools
+import mailbox
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from phantommail.models.email import FullEmail
+from phantommail.transports.mime import to_mime
+
+
+class MaildirSink:
+    """Store every email as a new message of a Maildir."""
+
+    def __init__(self, path: str | Path):
+        """Initialize the sink, creating the Maildir if missing."""
+        self.path = Path(path)
+        self.sent = 0
+        self._maildir = mailbox.Maildir(self.path, create=True)
+
+    async def send(self, email: FullEmail) -> str:
+        """Add ``email`` to the Maildir and return its Message-ID."""
+        message = to_mime(email)
+        await asyncio.to_thread(self._maildir.add, message)
+        self.sent += 1
+        return message["Message-ID"]
+
+    async def aclose(self) -> None:
+        """Do nothing, every message is written when it is added."""
+
+
+class MboxSink:
+    """Append every email to an mbox file."""
+
+    def __init__(self, path: str | Path):
+        """Initialize the sink, creating the mbox file if missing."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sent = 0
+        self._mbox = mailbox.mbox(self.path, create=True)
+        # Appends from worker threads must not interleave
+        self._lock = threading.Lock()
+
+    def _append(self, message) -> None:
+        """Append one message and flush it to disk."""
+        with self._lock:
+            self._mbox.lock()
+            try:
+                self._mbox.add(message)
+                self._mbox.flush()
+            finally:
+                self._mbox.unlock()
+
+    async def send(self, email: FullEmail) -> str:
+        """Append ``email`` to the mbox and return its Message-ID."""
+        message = to_mime(email)
+        await asyncio.to_thread(self._append, message)
+        self.sent += 1
+        return message["Message-ID"]
+
+    async def aclose(self) -> None:
+        """Close the mbox file."""
+        with self._lock:
+            self._mbox.close()
+
+
+class EmlSink:
+    """Write every email to its own .eml file in a directory."""
+
+    def __init__(self, directory: str | Path):
+        """Initialize the sink, creating the directory if missing."""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.sent = 0
+        self._numbers = itertools.count(1)
+
+    async def send(self, email: FullEmail) -> str:
+        """Write ``email`` to a new .eml file and return its Message-ID."""
+        message = to_mime(email)
+        # Names sort in sending order and never clash across processes
+        name = f"{next(self._numbers):06d}-{os.getpid()}-{uuid.uuid4().hex[:8]}.eml"
+        await asyncio.to_thread((self.directory / name).write_bytes, bytes(message))
+        self.sent += 1
+        return message["Message-ID"]
+
+    async def aclose(self) -> None:
+        """Do nothing, every file is complete when it is written."""
+
+
+class NullSink:
+    """Accept and drop every email, to benchmark everything but delivery."""
+
+    def __init__(self):
+        """Initialize the sink."""
+        self.sent = 0
+
+    async def send(self, email: FullEmail) -> str:
+        """Count ``email`` and return a made-up id."""
+        self.sent += 1
+        return f"null-{self.sent}"
+
+    async def aclose(self) -> None:
+        """Do nothing."""
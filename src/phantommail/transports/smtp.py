@@ -0,0 +1,280 @@
+"""Deliver emails over SMTP on a pool of persistent, authenticated sessions."""
+
+import asyncio
+import os
+import re
+import smtplib
+import ssl
+import threading
+from dataclasses import dataclass
+from email.policy import SMTP
+from typing import Literal
+
+from phantommail.logger import setup_logger
+from phantommail.models.email import FullEmail
+from phantommail.transports.base import DeliveryError
+from phantommail.transports.mime import recipients, to_mime
+
+logger = setup_logger(__name__)
+
+SMTPSecurity = Literal["starttls", "ssl", "none"]
+
+
+@dataclass
+class _Session:
+    """An open SMTP connection and the number of emails it carried."""
+
+    smtp: smtplib.SMTP
+    messages: int = 0
+
+
+def _envelope_address(address: str) -> str:
+    """Return ``address`` as the bracketed path of a MAIL FROM or RCPT TO command.
+
+    Display names are dropped as ``SMTP.sendmail`` does, and line breaks are
+    refused so a header value cannot inject commands into the pipeline.
+    """
+    path = smtplib.quoteaddr(address)
+    if "\r" in path or "\n" in path:
+        raise ValueError(f"Line break in email address {address!r}")
+    return path
+
+
+def _dot_stuff(data: bytes) -> bytes:
+    """Return ``data`` as the DATA payload, terminating line included."""
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return re.sub(rb"(?m)^\.", b"..", data) + b".\r\n"
+
+
+class SMTPTransport:
+    """SMTP delivery over a pool of persistent, authenticated sessions.
+
+    Up to ``pool_size`` connections are opened as needed and kept between
+    sends, so the handshake, TLS and login are paid once per connection. A
+    connection carries up to ``max_messages`` emails before it is replaced,
+    as servers limit messages per session. When the server announces
+    PIPELINING, MAIL FROM, every RCPT TO and DATA go out in one round trip.
+    smtplib blocks, so every send runs in a worker thread on its own session.
+    Recipients the server refuses while accepting others are logged and the
+    email goes to the rest, as with ``smtplib.SMTP.sendmail``.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: str | None = None,
+        password: str | None = None,
+        security: SMTPSecurity = "starttls",
+        pool_size: int = 4,
+        max_messages: int = 100,
+        timeout: float = 30.0,
+    ):
+        """Initialize the transport, connections are opened on first use.
+
+        Args:
+            host: The SMTP server.
+            port: Its port, 587 for submission with STARTTLS.
+            username: Login name, None to send without authenticating.
+            password: Login password.
+            security: "starttls" to upgrade the connection, "ssl" for
+                implicit TLS (usually port 465), or "none".
+            pool_size: Maximum connections open at once.
+            max_messages: Emails sent over a connection before it is renewed.
+            timeout: Seconds a connection may wait on the server.
+
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.pool_size = pool_size
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self.sent = 0
+        self.connections = 0
+        self.pipelined = 0
+        self.refused = 0
+        self._idle: list[_Session] = []
+        # Worker threads take and return idle sessions concurrently
+        self._idle_lock = threading.Lock()
+        self._slots = asyncio.Semaphore(pool_size)
+
+    @classmethod
+    def from_env(cls) -> "SMTPTransport":
+        """Configure the transport from the SMTP_* environment variables.
+
+        SMTP_HOST (required), SMTP_PORT, SMTP_USERNAME, SMTP_PASSWORD,
+        SMTP_SECURITY, SMTP_POOL_SIZE and SMTP_MAX_MESSAGES map to the
+        constructor arguments.
+        """
+        return cls(
+            host=os.environ["SMTP_HOST"],
+            port=int(os.environ.get("SMTP_PORT", "587")),
+            username=os.environ.get("SMTP_USERNAME"),
+            password=os.environ.get("SMTP_PASSWORD"),
+            security=os.environ.get("SMTP_SECURITY", "starttls"),
+            pool_size=int(os.environ.get("SMTP_POOL_SIZE", "4")),
+            max_messages=int(os.environ.get("SMTP_MAX_MESSAGES", "100")),
+        )
+
+    def _connect(self) -> _Session:
+        """Open, secure and authenticate a new connection."""
+        context = ssl.create_default_context()
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(
+                self.host, self.port, timeout=self.timeout, context=context
+            )
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.ehlo()
+            if self.security == "starttls":
+                smtp.starttls(context=context)
+                smtp.ehlo()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+        except BaseException:
+            # A refused handshake or login leaves nothing worth pooling
+            smtp.close()
+            raise
+        self.connections += 1
+        return _Session(smtp)
+
+    @staticmethod
+    def _close(session: _Session) -> None:
+        """Say goodbye to the server, ignoring a connection already gone."""
+        try:
+            session.smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            session.smtp.close()
+
+    def _take_idle(self) -> _Session | None:
+        """Take an idle session from the pool, None when there is none."""
+        with self._idle_lock:
+            return self._idle.pop() if self._idle else None
+
+    def _put_idle(self, session: _Session) -> None:
+        """Return a usable session to the pool."""
+        with self._idle_lock:
+            self._idle.append(session)
+
+    def _transaction(
+        self, smtp: smtplib.SMTP, sender: str, to: list[str], data: bytes
+    ) -> dict[str, tuple[int, bytes]]:
+        """Run one mail transaction, pipelining the envelope if the server can.
+
+        Returns the recipients the server refused, the email went to the others.
+        """
+        if not smtp.has_extn("pipelining"):
+            return smtp.sendmail(sender, to, data)
+
+        smtp.send(
+            f"MAIL FROM:{_envelope_address(sender)}\r\n"
+            + "".join(f"RCPT TO:{_envelope_address(address)}\r\n" for address in to)
+            + "DATA\r\n"
+        )
+        # Every pipelined command gets its reply, read them all to stay in step
+        mail_reply = smtp.getreply()
+        refused = {}
+        for address in to:
+            code, reply = smtp.getreply()
+            if code not in (250, 251):
+                refused[address] = (code, reply)
+        data_reply = smtp.getreply()
+        if data_reply[0] != 354:
+            smtp.rset()
+            if mail_reply[0] != 250:
+                raise smtplib.SMTPSenderRefused(*mail_reply, sender)
+            if len(refused) == len(to):
+                raise smtplib.SMTPRecipientsRefused(refused)
+            raise smtplib.SMTPDataError(*data_reply)
+
+        smtp.send(_dot_stuff(data))
+        code, reply = smtp.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, reply)
+        self.pipelined += 1
+        return refused
+
+    def _deliver(self, email: FullEmail) -> str:
+        """Send ``email`` on an idle or new session, return its Message-ID."""
+        message = to_mime(email)
+        data = message.as_bytes(policy=SMTP)
+        session = self._take_idle()
+        try:
+            while True:
+                fresh = session is None
+                if session is None:
+                    session = self._connect()
+                try:
+                    refused = self._transaction(
+                        session.smtp, email.sender, recipients(email), data
+                    )
+                    break
+                except smtplib.SMTPServerDisconnected:
+                    # The server closed an idle session, retry on a new one
+                    if fresh:
+                        raise
+                    session = None
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # The server answered within a transaction, so the session is
+            # still usable; a refused connection never became one
+            if session is not None and session.smtp.sock is not None:
+                self._put_idle(session)
+            raise
+        except BaseException:
+            if session is not None:
+                self._close(session)
+            raise
+
+        session.messages += 1
+        if session.messages < self.max_messages:
+            self._put_idle(session)
+        else:
+            self._close(session)
+        if refused:
+            self.refused += len(refused)
+            logger.warning(
+                f"SMTP server refused {len(refused)} recipient(s) of "
+                f"{message['Message-ID']}: {refused}"
+            )
+        return message["Message-ID"]
+
+    async def send(self, email: FullEmail) -> str:
+        """Send ``email`` and return its Message-ID.
+
+        Raises:
+            DeliveryError: When the server refused the email.
+
+        """
+        logger.info(f"Sending email to {email.to} with subject: {email.subject}")
+        async with self._slots:
+            try:
+                message_id = await asyncio.to_thread(self._deliver, email)
+            except smtplib.SMTPResponseException as error:
+                reply = error.smtp_error
+                if isinstance(reply, bytes):
+                    reply = reply.decode("utf-8", "replace")
+                raise DeliveryError(
+                    f"SMTP server answered {error.smtp_code}: {reply}",
+                    code=error.smtp_code,
+                    # 5xx replies are final, 4xx ones ask to try again later
+                    permanent=error.smtp_code >= 500,
+                ) from error
+            except smtplib.SMTPRecipientsRefused as error:
+                raise DeliveryError(
+                    f"SMTP server refused every recipient: {error.recipients}",
+                    permanent=all(code >= 500 for code, _ in error.recipients.values()),
+                ) from error
+        self.sent += 1
+        return message_id
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        with self._idle_lock:
+            sessions, self._idle = self._idle, []
+        for session in sessions:
+            await asyncio.to_thread(self._close, session)
@@ -0,0 +1,36 @@
+import httpx
+import pytest
+
+from phantommail.models.email import FullEmail
+from phantommail.transports import ResendTransport
+
+
+@pytest.fixture
+def make_email():
+    """Build a text-only email, any field overridden by keyword."""
+
+    def make(**overrides) -> FullEmail:
+        fields = {
+            "sender": "sender@example.com",
+            "to": ["to@example.com"],
+            "subject": "Question",
+            "body_html": "<p>Hello</p>",
+        }
+        return FullEmail(**{**fields, **overrides})
+
+    return make
+
+
+@pytest.fixture
+def make_resend():
+    """Build a Resend transport answered by ``handler`` instead of the service."""
+
+    def make(handler, **options) -> ResendTransport:
+        return ResendTransport(
+            api_key="re_test",
+            backoff=0.001,
+            transport=httpx.MockTransport(handler),
+            **options,
+        )
+
+    return make
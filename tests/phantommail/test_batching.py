@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.graphs.prompts import QUESTION_PROMPT
+from phantommail.llm import FakeChatModel, FakeLLMError, ModelRouter, Route
+from phantommail.llm.batching import LLMBatcher, LocalBatchJobs
+from phantommail.models.email import Email
+
+
+def prompt(subject: str) -> list:
+    return [HumanMessage(content=f"<subject>{subject}</subject>")]
+
+
+async def generate_all(batcher, subjects, llm=None, router=None):
+    router = router or ModelRouter({"default": Route("m")}, backend="fake")
+    return await asyncio.gather(
+        *(
+            batcher.generate(router, "question", Email, prompt(subject), llm)
+            for subject in subjects
+        ),
+        return_exceptions=True,
+    )
+
+
+def test_concurrent_calls_share_a_batch_and_get_their_own_answer():
+    batcher = LLMBatcher(max_batch=10, max_wait=0.01)
+    answers = asyncio.run(generate_all(batcher, ["a", "b", "c"], FakeChatModel()))
+
+    assert [answer.subject for answer in answers] == ["a", "b", "c"]
+    assert (batcher.calls, batcher.batches) == (3, 1)
+
+
+def test_full_batches_are_submitted_without_waiting():
+    batcher = LLMBatcher(max_batch=2, max_wait=60)
+    answers = asyncio.run(generate_all(batcher, ["a", "b", "c", "d"], FakeChatModel()))
+
+    assert [answer.subject for answer in answers] == ["a", "b", "c", "d"]
+    assert batcher.batches == 2
+
+
+def test_failures_reach_every_caller():
+    batcher = LLMBatcher(max_wait=0.01)
+    answers = asyncio.run(
+        generate_all(batcher, ["a", "b"], FakeChatModel(error_rate=1.0))
+    )
+
+    assert all(isinstance(answer, FakeLLMError) for answer in answers)
+
+
+def test_offline_batch_jobs_round_trip_through_jsonl(tmp_path):
+    jobs = LocalBatchJobs(tmp_path)
+    batcher = LLMBatcher(max_wait=0.01, jobs=jobs, poll_interval=0.01)
+    answers = asyncio.run(generate_all(batcher, ["x", "y"]))
+
+    assert [answer.subject for answer in answers] == ["x", "y"]
+    assert len((tmp_path / "local-1.input.jsonl").read_text().splitlines()) == 2
+    assert '"custom_id"' in (tmp_path / "local-1.output.jsonl").read_text()
+
+
+def test_nodes_send_their_calls_through_the_batcher():
+    llm = FakeChatModel()
+    batcher = LLMBatcher(max_wait=0.01)
+    config = {"configurable": {"llm": llm, "llm_batcher": batcher}}
+    nodes = GraphNodes()
+
+    async def generate():
+        return await asyncio.gather(
+            *(
+                nodes._generate_email(
+                    QUESTION_PROMPT, {"question": q}, config, route="question"
+                )
+                for q in ["Where?", "When?"]
+            )
+        )
+
+    asyncio.run(generate())
+    assert (batcher.calls, batcher.batches) == (2, 1)
+
+
+def test_batch_size_must_be_positive():
+    with pytest.raises(ValueError):
+        LLMBatcher(max_batch=0)
@@ -0,0 +1,103 @@
+import asyncio
+
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.llm import FakeChatModel, ModelRouter, Route
+from phantommail.llm.circuit_breaker import CircuitBreaker
+from phantommail.llm.response_cache import ResponseCache
+from phantommail.llm.routing import load_fallbacks
+
+
+def test_breaker_opens_at_the_failure_threshold():
+    breaker = CircuitBreaker(failure_threshold=0.5, window=4, min_calls=4)
+    for success in [True, False, True]:
+        breaker.record(success)
+    assert breaker.state == "closed"
+
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.refused == 1
+
+
+def test_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(min_calls=1, reset_timeout=0)
+    breaker.record(False)
+    assert breaker.state == "half_open"
+
+    breaker.reset_timeout = 60
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == "open"
+
+    breaker.reset_timeout = 0
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.opened == 2
+
+
+def test_routes_fall_back_along_the_chain():
+    router = ModelRouter(
+        {"default": Route("pro", 0.2, 60), "question": Route("lite")},
+        fallbacks=["pro", "flash"],
+    )
+
+    assert router.chain("order") == [Route("pro", 0.2, 60), Route("flash", 0.2, 60)]
+    assert router.chain("question") == [Route("lite")]
+    assert load_fallbacks("") == []
+    assert load_fallbacks(" a, b ") == ["a", "b"]
+
+
+def failing_router(*failing: str) -> ModelRouter:
+    router = ModelRouter(
+        {"default": Route("pro")},
+        backend="fake",
+        fallbacks=["pro", "flash"],
+        breaker=lambda: CircuitBreaker(min_calls=2),
+    )
+    for model in failing:
+        router._clients[(Route(model), None)] = FakeChatModel(error_rate=1.0)
+    return router
+
+
+def test_failed_calls_go_to_the_next_model():
+    router = failing_router("pro")
+    config = {"configurable": {"llm_router": router}}
+
+    result = asyncio.run(GraphNodes().generate_question({}, config))
+
+    assert result["subject"] != "Question about a transport"
+    stats = router.stats["question"]
+    assert stats.fallbacks == 1
+    # Only the failure of the route's own model is in the route's stats
+    assert (stats.calls, stats.failures) == (1, 1)
+    assert router.breakers["pro"].failures == 1
+
+
+def test_fallback_answers_are_not_cached_under_the_route_model(tmp_path):
+    router = failing_router("pro")
+    cache = ResponseCache(tmp_path / "llm.sqlite")
+    config = {"configurable": {"llm_router": router, "llm_cache": cache}}
+
+    asyncio.run(GraphNodes().generate_question({}, config))
+
+    assert router.stats["question"].fallbacks == 1
+    assert cache.stats.stores == 0
+    assert len(cache) == 0
+
+
+def test_open_breakers_are_skipped_and_templates_keep_emails_flowing():
+    router = failing_router("pro", "flash")
+    config = {"configurable": {"llm_router": router}}
+    nodes = GraphNodes()
+
+    for _ in range(3):
+        result = asyncio.run(nodes.generate_question({}, config))
+        assert result["subject"] == "Question about a transport"
+
+    assert router.stats["question"].templated == 3
+    # Both breakers opened after two failures, the third email skipped them
+    assert router.breakers["pro"].refused == 1
+    assert router.breakers["flash"].refused == 1
+    assert router.breaker_summary()[0].startswith("flash: open, 2 call(s)")
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.llm import FakeChatModel, FakeLLMError, ModelRouter, Route
+from phantommail.models.email import Email
+from phantommail.llm.context_cache import (
+    LocalContextCache,
+    expire_local_cache,
+    is_cache_miss,
+    resolve_local_cache,
+)
+
+
+def test_prefix_is_created_once_per_model():
+    cache = LocalContextCache()
+
+    name = cache.get("m", "static prefix")
+    assert cache.get("m", "static prefix") == name
+    assert cache.get("other", "static prefix") != name
+    assert cache.created == 2
+    assert resolve_local_cache(name) == "static prefix"
+
+
+def test_invalidated_or_expiring_prefix_is_recreated():
+    cache = LocalContextCache()
+    name = cache.get("m", "prefix")
+    cache.invalidate("m", "prefix")
+    assert cache.get("m", "prefix") != name
+
+    # A TTL inside the refresh margin is renewed on every use
+    short = LocalContextCache(ttl=30)
+    assert short.get("m", "prefix") != short.get("m", "prefix")
+
+
+def test_slow_creation_blocks_only_its_own_prefix():
+    release = threading.Event()
+
+    class Slow(LocalContextCache):
+        def _create(self, model, prefix):
+            if prefix == "slow":
+                assert release.wait(5)
+            return super()._create(model, prefix)
+
+    cache = Slow()
+    names = []
+    waiting = [
+        threading.Thread(target=lambda: names.append(cache.get("m", "slow")))
+        for _ in range(3)
+    ]
+    for thread in waiting:
+        thread.start()
+
+    # Another prefix is created while the slow one is under way
+    assert cache.get("m", "fast") is not None
+    release.set()
+    for thread in waiting:
+        thread.join()
+
+    assert len(set(names)) == 1
+    assert cache.created == 2
+
+
+def test_failed_creation_falls_back_to_the_full_prompt():
+    class Failing(LocalContextCache):
+        def _create(self, model, prefix):
+            raise RuntimeError("prefix too small")
+
+    router = ModelRouter({"default": Route("m")}, "fake", Failing())
+    assert router.cached_client("order", "prefix") is None
+
+
+def test_fake_model_resolves_and_misses_cached_prefixes():
+    cache = LocalContextCache()
+    name = cache.get("m", "<subject>Cached</subject>")
+    runnable = FakeChatModel(cached_content=name).with_structured_output(Email)
+    assert runnable.invoke([]).subject == "Cached"
+
+    expire_local_cache(name)
+    with pytest.raises(FakeLLMError) as error:
+        runnable.invoke([])
+    assert is_cache_miss(error.value)
+
+
+def test_nodes_send_the_prefix_once_and_recreate_it_on_miss():
+    router = ModelRouter({"default": Route("m")}, "fake", LocalContextCache())
+    config = {"configurable": {"llm_router": router}}
+    nodes = GraphNodes()
+
+    first = asyncio.run(nodes.generate_declaration({}, config))
+    asyncio.run(nodes.generate_declaration({}, config))
+    assert first["attachment_html"][0]
+    assert router.context_cache.created <= 2  # one per customs example
+
+    created = router.context_cache.created
+    for entry in router.context_cache._entries.values():
+        expire_local_cache(entry.name)
+    again = asyncio.run(nodes.generate_declaration({}, config))
+    assert again["attachment_html"][0]
+    assert router.context_cache.created == created + 1
+    assert router.stats["declaration.attachment"].failures == 0
@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+import email
+import gzip
+import json
+import lzma
+import mailbox
+import tarfile
+
+import pytest
+
+from phantommail.cli.menu import MenuSelection
+from phantommail.cli.runner import EmailRunner
+from phantommail.helpers.corpus_export import CorpusExporter
+from phantommail.helpers.email_buffer import BufferedEmail, EmailBuffer
+from phantommail.models.email import Attachment
+
+
+@pytest.fixture
+def export(make_email):
+    """Export ``count`` numbered orders and their ground truth, return the ids."""
+
+    def run(exporter: CorpusExporter, count: int, **overrides) -> list[str]:
+        async def scenario():
+            ids = [
+                await exporter.write(
+                    make_email(
+                        subject=f"Order {n}",
+                        body_html=f"<p>Order {n}</p>\nFrom Antwerp to Ghent",
+                        **overrides,
+                    ),
+                    "order",
+                    {
+                        "order_ref": f"TO-{n}",
+                        "loading_date": datetime.date(2026, 1, n + 1),
+                    },
+                )
+                for n in range(count)
+            ]
+            await exporter.aclose()
+            return ids
+
+        return asyncio.run(scenario())
+
+    return run
+
+
+def read_lines(path) -> list[dict]:
+    with gzip.open(path, "rt") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_jsonl_records_are_sharded_with_their_ground_truth(tmp_path, export):
+    exporter = CorpusExporter(tmp_path, "jsonl", shard_size=2)
+    attachment = Attachment(filename="order.pdf", content=b"%PDF")
+
+    ids = export(exporter, 5, attachments=[attachment])
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert manifest["emails"] == 5
+    assert [shard["count"] for shard in manifest["shards"]] == [2, 2, 1]
+    records = [
+        record
+        for shard in manifest["shards"]
+        for record in read_lines(tmp_path / shard["emails"])
+    ]
+    assert [record["message_id"] for record in records] == ids
+    assert records[4]["subject"] == "Order 4"
+    assert records[4]["ground_truth"] == {
+        "order_ref": "TO-4",
+        "loading_date": "2026-01-05",
+    }
+    assert records[0]["attachments"][0]["content"] == attachment.to_base64()
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_mbox_shards_come_with_a_ground_truth_file(tmp_path, export):
+    exporter = CorpusExporter(tmp_path, "mbox", shard_size=10)
+
+    ids = export(exporter, 3)
+
+    mbox_path = tmp_path / "outbox.mbox"
+    mbox_path.write_bytes(
+        gzip.decompress((tmp_path / "emails-00000.mbox.gz").read_bytes())
+    )
+    messages = list(mailbox.mbox(mbox_path))
+    assert [message["Message-ID"] for message in messages] == ids
+    assert messages[0]["X-PhantomMail-Type"] == "order"
+    assert ">From Antwerp" in messages[0].get_payload(decode=True).decode()
+    truth = read_lines(tmp_path / "ground-truth-00000.jsonl.gz")
+    assert [line["message_id"] for line in truth] == ids
+    assert truth[2]["ground_truth"]["order_ref"] == "TO-2"
+
+
+def test_eml_shards_are_tar_archives(tmp_path, export):
+    exporter = CorpusExporter(tmp_path, "eml", shard_size=10, compression="xz")
+
+    ids = export(exporter, 3)
+
+    truth = [
+        json.loads(line)
+        for line in lzma.open(tmp_path / "ground-truth-00000.jsonl.xz", "rt")
+    ]
+    with tarfile.open(tmp_path / "emails-00000.tar.xz") as archive:
+        for n, (line, message_id) in enumerate(zip(truth, ids, strict=True)):
+            message = email.message_from_bytes(archive.extractfile(line["file"]).read())
+            assert message["Message-ID"] == message_id
+            assert message["Subject"] == f"Order {n}"
+            assert line["ground_truth"]["order_ref"] == f"TO-{n}"
+
+
+def test_a_second_export_continues_after_the_last_shard(tmp_path, export):
+    export(CorpusExporter(tmp_path, shard_size=2), 3)
+    export(CorpusExporter(tmp_path, shard_size=2), 1)
+
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    assert [shard["emails"] for shard in manifest["shards"]] == [
+        "emails-00000.jsonl.gz",
+        "emails-00001.jsonl.gz",
+        "emails-00002.jsonl.gz",
+    ]
+    assert manifest["emails"] == 4
+    with pytest.raises(ValueError, match="holds a jsonl corpus"):
+        CorpusExporter(tmp_path, "mbox")
+
+
+def test_runner_exports_generated_emails_instead_of_sending(tmp_path):
+    exporter = CorpusExporter(tmp_path)
+    runner = EmailRunner(
+        "sender@example.com", generation_mode="template", exporter=exporter
+    )
+
+    results = asyncio.run(
+        runner.run(MenuSelection("price_request", 3, ["to@example.com"]))
+    )
+
+    assert results["success"] == 3
+    records = read_lines(tmp_path / "emails-00000.jsonl.gz")
+    assert {record["email_type"] for record in records} == {"price_request"}
+    for record in records:
+        truth = record["ground_truth"]
+        assert truth["origin"] in record["subject"]
+        assert truth["destination"] in record["subject"]
+
+
+def test_buffered_emails_are_exported_with_their_ground_truth(tmp_path):
+    buffer = EmailBuffer(tmp_path / "buffer")
+    buffer.put(
+        BufferedEmail(
+            email_type="question",
+            subject="Where is TO-7?",
+            body_html="<p>Where is TO-7?</p>",
+            email_attributes={"order_ref": "TO-7"},
+        )
+    )
+    runner = EmailRunner(
+        "sender@example.com",
+        generation_mode="template",
+        buffer=buffer,
+        # Batching does not apply to exports
+        send_batch=10,
+        exporter=CorpusExporter(tmp_path / "corpus"),
+    )
+
+    results = asyncio.run(runner.run(MenuSelection("question", 1, ["to@example.com"])))
+
+    assert results["success"] == 1
+    [record] = read_lines(tmp_path / "corpus" / "emails-00000.jsonl.gz")
+    assert record["subject"] == "Where is TO-7?"
+    assert record["ground_truth"] == {"order_ref": "TO-7"}
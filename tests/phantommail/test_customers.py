@@ -0,0 +1,56 @@
+import pytest
+
+from phantommail.fakers.customers import (
+    Customer,
+    CustomerStore,
+    get_customer_store,
+)
+
+
+def make_customer(company_name, country):
+    return Customer.from_row(
+        {
+            "company_name": company_name,
+            "vat_number": "BE0123456789",
+            "address": "Kipdorpbrug 1",
+            "city": "Antwerpen",
+            "postal_code": "2000",
+            "country": country,
+            "email": "info@example.com",
+            "phone": "+32 3 123 45 67",
+        }
+    )
+
+
+def test_store_is_loaded_once():
+    assert get_customer_store() is get_customer_store()
+    assert len(get_customer_store()) > 0
+
+
+def test_derived_fields():
+    customer = make_customer("Van Der Meer Logistics B.V.", "Belgium")
+    assert customer.formatted_address == "Kipdorpbrug 1, 2000 Antwerpen, Belgium"
+    assert customer.website == "www.vandermeerlogisticsbv.com"
+    assert (customer.locale, customer.language) == ("nl_BE", "Dutch")
+
+
+def test_unknown_country_defaults_to_english():
+    customer = make_customer("Acme", "Lithuania")
+    assert (customer.locale, customer.language) == ("en_GB", "English")
+
+
+def test_lookup_by_country():
+    store = CustomerStore(
+        [make_customer("A", "Belgium"), make_customer("B", "Belgium"), make_customer("C", "Spain")]
+    )
+    assert [c.company_name for c in store.by_country("Belgium")] == ["A", "B"]
+    assert store.random("Spain").company_name == "C"
+    assert store.by_country("France") == ()
+    with pytest.raises(KeyError):
+        store.random("France")
+
+
+def test_customers_are_immutable():
+    customer = get_customer_store().random()
+    with pytest.raises(AttributeError):
+        customer.company_name = "Other"
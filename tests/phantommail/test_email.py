@@ -0,0 +1,25 @@
+import base64
+
+from phantommail.models.email import Attachment, FullEmail
+
+
+def test_attachment_keeps_raw_bytes():
+    content = b"%PDF-1.7\x00\xff"
+    attachment = Attachment(filename="attachment_0.pdf", content=content)
+    email = FullEmail(
+        sender="sender@example.com",
+        to=["to@example.com"],
+        subject="Subject",
+        body_html="<p>Body</p>",
+        attachments=[attachment],
+    )
+
+    assert email.attachments[0].content is content
+    assert email.attachments[0].content_type == "application/pdf"
+    assert base64.b64decode(attachment.to_base64()) == content
+
+
+def test_attachment_json_round_trip():
+    attachment = Attachment(filename="attachment_0.pdf", content=b"\x00\x01\x02")
+    restored = Attachment.model_validate_json(attachment.model_dump_json())
+    assert restored == attachment
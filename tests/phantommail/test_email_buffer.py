@@ -0,0 +1,62 @@
+import asyncio
+
+from phantommail.cli.producer import BufferProducer
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.helpers.email_buffer import BufferedEmail, EmailBuffer
+from phantommail.models.email import Attachment
+
+
+def make_email(subject: str, email_type: str = "order") -> BufferedEmail:
+    return BufferedEmail(
+        email_type=email_type,
+        subject=subject,
+        body_html="<p>Hi</p>",
+        attachments=[Attachment(filename="a.pdf", content=b"%PDF\x00\xff")],
+    )
+
+
+def test_emails_are_taken_oldest_first_and_persisted(tmp_path):
+    buffer = EmailBuffer(tmp_path)
+    assert buffer.put(make_email("first"))
+    assert buffer.put(make_email("second"))
+
+    reopened = EmailBuffer(tmp_path)
+    assert reopened.count("order") == 2
+    first = reopened.take("order")
+    assert first.subject == "first"
+    assert first.attachments[0].content == b"%PDF\x00\xff"
+    assert reopened.take("order").subject == "second"
+    assert reopened.take("order") is None
+
+
+def test_capacity_is_per_type(tmp_path):
+    buffer = EmailBuffer(tmp_path, capacity=1)
+
+    assert buffer.put(make_email("one"))
+    assert not buffer.put(make_email("two"))
+    assert buffer.put(make_email("other", email_type="question"))
+    assert buffer.deficits(["order", "question", "random"]) == {
+        "order": 0,
+        "question": 0,
+        "random": 1,
+    }
+
+
+def test_producer_fills_every_type_to_capacity(tmp_path):
+    buffer = EmailBuffer(tmp_path, capacity=2)
+    config = {"configurable": {"generation_mode": "template"}}
+    producer = BufferProducer(
+        buffer, config, email_types=["question", "update_order"], workers=2
+    )
+
+    assert asyncio.run(producer.fill()) == 4
+    assert buffer.deficits(["question", "update_order"]) == {
+        "question": 0,
+        "update_order": 0,
+    }
+    assert buffer.take("question").subject == "Question about a transport"
+
+
+def test_buffered_state_skips_generation():
+    state = {"email_type": "order", "subject": "Ready", "email": "<p>Hi</p>"}
+    assert GraphNodes().email_types(state, {}) == "buffered"
@@ -0,0 +1,114 @@
+import asyncio
+import random
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.llm import FakeChatModel, FakeLLMError, create_chat_model
+from phantommail.llm.fake import (
+    FixedLatency,
+    LognormalLatency,
+    TraceLatency,
+    parse_latency,
+)
+from phantommail.models.email import Email
+
+
+def test_structured_output_from_prompt():
+    prompt = """Generate a fake transport order email.
+    Make the subject reference the order (e.g., "Order A-123 - Update request")
+
+    <body_html>
+    <p>Dear carrier</p>
+    </body_html>
+
+    <attachment_html>
+    no attachment
+    </attachment_html>
+    """
+    runnable = FakeChatModel().with_structured_output(Email)
+    email = runnable.invoke([HumanMessage(content=prompt)])
+
+    assert isinstance(email, Email)
+    assert email.subject == "Order A-123 - Update request"
+    assert email.body_html == "<p>Dear carrier</p>"
+    assert email.attachment_html is None
+
+
+def test_structured_output_is_deterministic():
+    messages = [
+        SystemMessage(content="You generate fake emails."),
+        HumanMessage(content="Email content:\nHello,\n\nWhere is my order?"),
+    ]
+    runnable = FakeChatModel().with_structured_output(Email)
+
+    first = asyncio.run(runnable.ainvoke(messages))
+    assert first == runnable.invoke(messages)
+    assert first.body_html == "<p>Hello,</p>\n<p>Where is my order?</p>"
+
+
+def test_latency_models(tmp_path):
+    rng = random.Random(1)
+    assert FixedLatency(2.0).sample(rng) == 2.0
+
+    samples = [LognormalLatency(10.0, 0.5).sample(rng) for _ in range(2000)]
+    assert 9.0 < sorted(samples)[1000] < 11.0
+
+    trace = tmp_path / "trace.txt"
+    trace.write_text("# seconds\n1.5\n\n3\n")
+    model = TraceLatency.from_file(trace)
+    assert [model.sample(rng) for _ in range(3)] == [1.5, 3.0, 1.5]
+
+
+def test_parse_latency():
+    assert parse_latency("0.5").seconds == 0.5
+    assert parse_latency("fixed:2").seconds == 2.0
+    model = parse_latency("lognormal:12,0.6")
+    assert (model.median, model.sigma) == (12.0, 0.6)
+    with pytest.raises(ValueError):
+        parse_latency("normal:1")
+
+
+def test_simulated_errors():
+    runnable = FakeChatModel(rate_limit_rate=1.0, retry_after=7).with_structured_output(
+        Email
+    )
+    with pytest.raises(FakeLLMError) as error:
+        runnable.invoke("Generate an email")
+    assert (error.value.code, error.value.retry_after) == (429, 7)
+
+    runnable = FakeChatModel(error_rate=1.0).with_structured_output(Email)
+    with pytest.raises(FakeLLMError) as error:
+        runnable.invoke("Generate an email")
+    assert error.value.code == 500
+
+
+def test_error_rates_are_reproducible():
+    def outcomes(seed):
+        model = FakeChatModel(error_rate=0.3, seed=seed)
+        return [model._draw()[1] is None for _ in range(50)]
+
+    assert outcomes(3) == outcomes(3)
+    assert 20 < sum(outcomes(3)) < 50
+
+
+def test_backend_selection(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "fake")
+    monkeypatch.setenv("FAKE_LLM_LATENCY", "fixed:0.25")
+    model = create_chat_model()
+    assert isinstance(model, FakeChatModel)
+    assert model.latency.seconds == 0.25
+
+    with pytest.raises(ValueError):
+        create_chat_model("openai")
+
+
+def test_node_uses_configured_llm():
+    nodes = GraphNodes()
+    config = {"configurable": {"llm": FakeChatModel()}}
+
+    result = asyncio.run(nodes.generate_price_request({}, config))
+
+    assert result["subject"].startswith("Transport inquiry ")
+    assert result["email"].startswith("<p>")
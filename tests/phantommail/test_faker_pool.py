@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from phantommail.fakers.declaration import DeclarationGenerator
+from phantommail.fakers.faker_pool import FakerPool, seed_task
+from phantommail.fakers.price_request import PriceRequestGenerator
+from phantommail.fakers.transport import TransportOrderGenerator
+
+
+def test_borrowed_instances_are_exclusive():
+    pool = FakerPool()
+    with pool.borrow("nl_BE") as first, pool.borrow("nl_BE") as second:
+        assert first is not second
+    # Both are returned to the pool and reused
+    with pool.borrow("nl_BE") as again:
+        assert again in (first, second)
+
+
+def test_task_seed_makes_output_reproducible():
+    pool = FakerPool()
+
+    def draw(seed):
+        seed_task(seed)
+        try:
+            with pool.borrow("de_DE") as faker:
+                return faker.name(), faker.city()
+        finally:
+            seed_task(None)
+
+    assert draw("run:1") == draw("run:1")
+    assert draw("run:1") != draw("run:2")
+
+
+def test_task_seed_makes_generators_reproducible():
+    def generate(seed):
+        seed_task(seed)
+        try:
+            return (
+                PriceRequestGenerator().generate_price_request(),
+                TransportOrderGenerator().generate(),
+                DeclarationGenerator().generate_declaration(),
+            )
+        finally:
+            seed_task(None)
+
+    assert generate("1:0") == generate("1:0")
+    assert generate("1:0") != generate("1:1")
+
+
+def test_task_seeds_are_isolated_between_asyncio_tasks():
+    pool = FakerPool()
+
+    async def draw(seed, delay):
+        seed_task(seed)
+        names = []
+        for _ in range(3):
+            with pool.borrow("fr_FR") as faker:
+                names.append(faker.name())
+            await asyncio.sleep(delay)
+        return names
+
+    async def scenario():
+        return await asyncio.gather(draw("a", 0.002), draw("b", 0.001))
+
+    assert asyncio.run(scenario()) == asyncio.run(scenario())
+
+
+def test_pool_is_thread_safe():
+    pool = FakerPool()
+    pool.warm(["en_GB"], size=2)
+    errors = []
+
+    def work():
+        try:
+            for _ in range(50):
+                with pool.borrow("en_GB") as faker:
+                    faker.name()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from phantommail.helpers import html_to_pdf
+from phantommail.helpers.html_to_pdf import PdfRenderer
+
+
+class StubChromium:
+    """Launch stand-in browsers, counting pages in flight."""
+
+    def __init__(self):
+        self.browsers: list[StubBrowser] = []
+        self.crashes = 0
+        self.active = 0
+        self.peak = 0
+
+    async def launch(self, headless: bool):
+        browser = StubBrowser(self)
+        self.browsers.append(browser)
+        return browser
+
+
+class StubPlaywright:
+    def __init__(self):
+        self.chromium = StubChromium()
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+
+class StubBrowser:
+    def __init__(self, chromium: StubChromium):
+        self.chromium = chromium
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    async def new_context(self):
+        return StubContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class StubContext:
+    def __init__(self, browser: StubBrowser):
+        self.browser = browser
+
+    async def new_page(self):
+        return StubPage(self.browser)
+
+    async def close(self):
+        pass
+
+
+class StubPage:
+    def __init__(self, browser: StubBrowser):
+        self.browser = browser
+        self.html = ""
+
+    async def set_content(self, html: str):
+        self.html = html
+
+    async def pdf(self, **options) -> bytes:
+        chromium = self.browser.chromium
+        if chromium.crashes:
+            chromium.crashes -= 1
+            self.browser.connected = False
+            raise RuntimeError("Target closed")
+        chromium.active += 1
+        chromium.peak = max(chromium.peak, chromium.active)
+        await asyncio.sleep(0.01)
+        chromium.active -= 1
+        return f"%PDF {self.html}".encode()
+
+
+@pytest.fixture
+def chromium(monkeypatch):
+    playwright = StubPlaywright()
+    monkeypatch.setattr(html_to_pdf, "async_playwright", lambda: playwright)
+    return playwright.chromium
+
+
+def test_browser_is_recycled_after_max_renders(chromium):
+    renderer = PdfRenderer(max_renders_per_browser=2)
+
+    async def scenario():
+        for n in range(5):
+            await renderer.render(f"<p>{n}</p>")
+        await renderer.close()
+
+    asyncio.run(scenario())
+
+    assert len(chromium.browsers) == 3
+    assert all(browser.closed for browser in chromium.browsers)
+
+
+def test_crashed_browser_is_replaced_and_the_render_retried_once(chromium):
+    renderer = PdfRenderer()
+    chromium.crashes = 1
+
+    assert asyncio.run(renderer.render("<p>1</p>")) == b"%PDF <p>1</p>"
+    first, second = chromium.browsers
+    assert first.closed and not second.closed
+
+    chromium.crashes = 2
+    with pytest.raises(RuntimeError, match="Target closed"):
+        asyncio.run(renderer.render("<p>2</p>"))
+    # One relaunch, then the second crash is final
+    assert len(chromium.browsers) == 3
+    assert all(browser.closed for browser in chromium.browsers)
+
+
+def test_renders_in_flight_are_bounded_by_max_pages(chromium):
+    renderer = PdfRenderer(max_pages=2)
+
+    async def scenario():
+        return await asyncio.gather(*(renderer.render(f"<p>{n}</p>") for n in range(6)))
+
+    pdfs = asyncio.run(scenario())
+
+    assert pdfs == [f"%PDF <p>{n}</p>".encode() for n in range(6)]
+    assert chromium.peak == 2
+    # Renders share one browser, each in its own context
+    assert len(chromium.browsers) == 1
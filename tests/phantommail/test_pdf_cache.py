@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from phantommail.helpers.pdf_cache import PdfCache
+
+OPTIONS = {"format": "A4", "scale": 1.0}
+
+
+def test_key_depends_on_html_and_options():
+    key = PdfCache.make_key("<p>a</p>", OPTIONS)
+    assert key == PdfCache.make_key("<p>a</p>", dict(reversed(OPTIONS.items())))
+    assert key != PdfCache.make_key("<p>b</p>", OPTIONS)
+    assert key != PdfCache.make_key("<p>a</p>", {**OPTIONS, "scale": 0.9})
+
+
+def test_memory_hit_and_miss_counters():
+    cache = PdfCache(None)
+    key = PdfCache.make_key("<p>a</p>", OPTIONS)
+
+    assert cache.get(key) is None
+    cache.put(key, b"%PDF-1", render_seconds=2.0)
+    assert cache.get(key) == b"%PDF-1"
+
+    assert cache.stats.misses == 1
+    assert cache.stats.memory_hits == 1
+    assert cache.stats.saved_seconds == 2.0
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    key = PdfCache.make_key("<p>a</p>", OPTIONS)
+    PdfCache(tmp_path).put(key, b"%PDF-1")
+
+    cache = PdfCache(tmp_path)
+    assert cache.get(key) == b"%PDF-1"
+    assert cache.stats.disk_hits == 1
+    # Promoted to the memory tier
+    assert cache.get(key) == b"%PDF-1"
+    assert cache.stats.memory_hits == 1
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = PdfCache(None, max_memory_bytes=10)
+    cache.put("a", b"12345")
+    cache.put("b", b"12345")
+    cache.get("a")
+    cache.put("c", b"12345")
+
+    assert cache.get("a") == b"12345"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"12345"
+
+
+def test_disk_tier_respects_size_budget(tmp_path):
+    cache = PdfCache(tmp_path, max_disk_bytes=20, max_memory_bytes=0)
+    for key in ("aa", "bb", "cc", "dd", "ee"):
+        cache.put(key, b"12345")
+
+    # Past the budget, the oldest entries go until 90% of it is left
+    remaining = sorted(path.stem for path in tmp_path.glob("*/*.pdf"))
+    assert remaining == ["cc", "dd", "ee"]
+
+
+def test_concurrent_writes_of_one_key_leave_no_temp_files(tmp_path):
+    cache = PdfCache(tmp_path)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda n: cache.put("aa", f"%PDF {n}".encode()), range(32)))
+
+    assert [path.suffix for path in tmp_path.glob("*/*")] == [".pdf"]
+    assert PdfCache(tmp_path).get("aa").startswith(b"%PDF ")
@@ -0,0 +1,78 @@
+import asyncio
+
+from phantommail.cli.pipeline import Pipeline, Stage
+
+
+def run_pipeline(pipeline, items):
+    done = []
+
+    def on_done(item, error):
+        done.append((item, error))
+
+    asyncio.run(pipeline.run(items, on_done))
+    return done
+
+
+def test_items_flow_through_all_stages():
+    async def add_one(item):
+        await asyncio.sleep(0)
+        return item + 1
+
+    async def double(item):
+        return item * 2
+
+    pipeline = Pipeline(
+        [Stage("add", add_one, workers=3), Stage("double", double, workers=2)]
+    )
+    done = run_pipeline(pipeline, range(10))
+
+    assert sorted(item for item, _ in done) == [(i + 1) * 2 for i in range(10)]
+    assert all(error is None for _, error in done)
+    assert [stage["processed"] for stage in pipeline.stats()] == [10, 10]
+
+
+def test_failures_are_reported_and_not_forwarded():
+    async def check(item):
+        if item % 3 == 0:
+            raise ValueError(f"bad {item}")
+        return item
+
+    async def identity(item):
+        return item
+
+    pipeline = Pipeline([Stage("check", check), Stage("next", identity)])
+    done = run_pipeline(pipeline, range(6))
+
+    failed = sorted(item for item, error in done if error is not None)
+    assert failed == [0, 3]
+    stats = pipeline.stats()
+    assert stats[0]["failed"] == 2
+    assert stats[1]["processed"] == 4
+
+
+def test_bounded_queues_limit_items_in_flight():
+    in_flight = 0
+    peak = 0
+
+    async def produce(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        return item
+
+    async def slow_consume(item):
+        nonlocal in_flight
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        return item
+
+    pipeline = Pipeline(
+        [
+            Stage("produce", produce, workers=4, queue_size=2),
+            Stage("consume", slow_consume, workers=1, queue_size=2),
+        ]
+    )
+    run_pipeline(pipeline, range(50))
+
+    # Queued items plus the ones held by blocked or busy workers
+    assert peak <= 2 + 4 + 1
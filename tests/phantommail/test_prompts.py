@@ -0,0 +1,41 @@
+from langchain_core.messages import SystemMessage
+
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.graphs.prompts import UPDATE_ORDER_PROMPT, order_prompt
+from phantommail.llm import FakeChatModel
+
+
+def test_order_prompts_are_built_once_with_a_static_prefix():
+    prompt = order_prompt(2)
+    assert order_prompt(2) is prompt
+
+    first = prompt.format_messages(transport_details="one")
+    second = prompt.format_messages(transport_details="two")
+    assert isinstance(first[0], SystemMessage)
+    assert first[0].content == second[0].content
+    assert "<attachment_html>" in first[0].content
+    assert first[-1].content.endswith("one")
+
+
+def test_orders_without_attachment_say_so():
+    system = order_prompt(1).format_messages(transport_details="x")[0]
+    assert "no attachment" in system.content
+
+
+def test_only_the_request_message_changes_per_email():
+    messages = UPDATE_ORDER_PROMPT.format_messages(
+        language="English",
+        order_ref="ORD-1",
+        tracking_ref="TRK-1",
+        formatted_message="Any news?",
+    )
+    assert "ORD-1" not in messages[0].content
+    assert "ORD-1" in messages[-1].content
+
+
+def test_structured_runnables_are_cached_per_model():
+    nodes = GraphNodes()
+    llm, other = FakeChatModel(), FakeChatModel()
+
+    assert nodes._structured(llm) is nodes._structured(llm)
+    assert nodes._structured(other) is not nodes._structured(llm)
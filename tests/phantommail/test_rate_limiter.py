@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from google.genai.errors import ClientError
+from langchain_core.exceptions import ModelTimeoutError
+from langchain_google_genai.chat_models import GoogleRateLimitError
+
+from phantommail.helpers.rate_limiter import (
+    AdaptiveLimiter,
+    TokenBucket,
+    is_overload,
+    retry_after,
+)
+from phantommail.llm import FakeLLMError
+
+
+def test_burst_up_to_capacity_is_immediate():
+    async def scenario():
+        bucket = TokenBucket(rate=1, capacity=3)
+        started = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) < 0.1
+
+
+def test_acquire_is_paced_by_rate():
+    async def scenario():
+        bucket = TokenBucket(rate=20, capacity=1)
+        started = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(5)))
+        return time.monotonic() - started
+
+    # One token up front, the remaining four at 20 per second
+    assert asyncio.run(scenario()) == pytest.approx(0.2, abs=0.1)
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_acquire_beyond_capacity_fails_instead_of_waiting_forever():
+    bucket = TokenBucket(rate=10, capacity=2)
+    with pytest.raises(ValueError, match="bucket of 2"):
+        asyncio.run(bucket.acquire(3))
+
+
+def test_adaptive_limit_doubles_per_round_trip_in_slow_start():
+    async def scenario():
+        limiter = AdaptiveLimiter(maximum=8)
+        for _ in range(3):
+            await limiter.run(lambda: asyncio.sleep(0))
+        return limiter.current
+
+    assert asyncio.run(scenario()) == 4
+
+
+def test_adaptive_limit_bounds_calls_in_flight():
+    async def scenario():
+        limiter = AdaptiveLimiter(maximum=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(limiter.run(call) for _ in range(10)))
+        return peak
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_overload_halves_the_limit_once_and_honours_retry_after():
+    async def scenario():
+        limiter = AdaptiveLimiter(maximum=8, minimum=1)
+        limiter.limit = 8.0
+        attempts = 0
+
+        async def call():
+            nonlocal attempts
+            attempts += 1
+            if attempts <= 4:
+                await asyncio.sleep(0.01)
+                raise FakeLLMError("Too many requests", code=429, retry_after=0.1)
+            return "ok"
+
+        started = time.monotonic()
+        answers = await asyncio.gather(*(limiter.run(call) for _ in range(4)))
+        return answers, time.monotonic() - started, limiter
+
+    answers, elapsed, limiter = asyncio.run(scenario())
+    assert answers == ["ok"] * 4
+    assert elapsed >= 0.1
+    # The four rejections of one burst count as a single back-off
+    assert limiter.backoffs == 1
+
+
+def test_latency_above_target_stops_growth():
+    async def scenario():
+        limiter = AdaptiveLimiter(maximum=8, target_latency=0.001)
+        for _ in range(3):
+            await limiter.run(lambda: asyncio.sleep(0.01))
+        return limiter.current
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_other_errors_are_not_retried():
+    async def scenario():
+        limiter = AdaptiveLimiter(maximum=4)
+
+        async def call():
+            raise FakeLLMError("Internal server error")
+
+        with pytest.raises(FakeLLMError):
+            await limiter.run(call)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+    assert (limiter.in_flight, limiter.backoffs) == (0, 0)
+
+
+class _Response:
+    status_code = 503
+    headers = {"Retry-After": "2"}
+
+
+class _HTTPError(Exception):
+    response = _Response()
+
+
+def test_overload_detection_and_retry_after():
+    assert is_overload(FakeLLMError("quota", code=429))
+    assert is_overload(_HTTPError())
+    assert is_overload(TimeoutError())
+    assert not is_overload(FakeLLMError("broken", code=500))
+    assert retry_after(FakeLLMError("quota", code=429, retry_after=1.5)) == 1.5
+    assert retry_after(_HTTPError()) == 2.0
+    assert retry_after(ValueError()) is None
+
+
+def test_gemini_rate_limits_and_timeouts_are_overload():
+    response = httpx.Response(429, headers={"Retry-After": "7"})
+    cause = ClientError(429, {"error": {"message": "Quota exceeded"}}, response)
+    try:
+        raise GoogleRateLimitError("Error calling model") from cause
+    except GoogleRateLimitError as error:
+        rate_limited = error
+
+    assert is_overload(rate_limited)
+    assert retry_after(rate_limited) == 7.0
+    assert is_overload(ModelTimeoutError("Request timed out"))
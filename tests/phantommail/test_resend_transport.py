@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.models.email import Attachment
+from phantommail.transports import DeliveryError
+
+
+def test_send_posts_the_email_and_returns_its_id(make_email, make_resend):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"id": "email-1"})
+
+    transport = make_resend(handler)
+    email = make_email(attachments=[Attachment(filename="order.pdf", content=b"%PDF")])
+
+    assert asyncio.run(transport.send(email)) == "email-1"
+    request = requests[0]
+    assert request.url == "https://api.resend.com/emails"
+    assert request.headers["Authorization"] == "Bearer re_test"
+    body = json.loads(request.content)
+    assert body["from"] == "sender@example.com"
+    assert "cc" not in body
+    assert body["attachments"][0] == {
+        "content": "JVBERg==",
+        "filename": "order.pdf",
+        "content_type": "application/pdf",
+    }
+
+
+def test_rate_limits_and_network_errors_are_retried_with_one_key(
+    make_email, make_resend
+):
+    answers = iter(
+        [
+            httpx.ConnectError("refused"),
+            httpx.Response(429, headers={"Retry-After": "0"}),
+            httpx.Response(200, json={"id": "email-2"}),
+        ]
+    )
+    keys = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        keys.append(request.headers["Idempotency-Key"])
+        answer = next(answers)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    transport = make_resend(handler)
+
+    assert asyncio.run(transport.send(make_email())) == "email-2"
+    assert transport.retried == 2
+    assert len(set(keys)) == 1
+
+
+def test_refused_emails_are_not_retried(make_email, make_resend):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(422, json={"message": "Invalid `to` field"})
+
+    with pytest.raises(DeliveryError) as error:
+        asyncio.run(make_resend(handler).send(make_email()))
+    assert error.value.code == 422
+    assert len(calls) == 1
+
+
+def test_retries_give_up_with_the_last_status(make_email, make_resend):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503, headers={"Retry-After": "0"})
+
+    transport = make_resend(handler, retries=2)
+    with pytest.raises(DeliveryError) as error:
+        asyncio.run(transport.send(make_email()))
+    assert (error.value.code, transport.retried) == (503, 2)
+
+
+def test_send_node_uses_the_configured_transport(make_resend):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"id": "email-3"})
+
+    transport = make_resend(handler)
+    state = {
+        "recipients": ["to@example.com"],
+        "email": "<p>Hello</p>",
+        "subject": "Question",
+        "messages": [],
+    }
+    config = {
+        "configurable": {"sender": "sender@example.com", "mail_transport": transport}
+    }
+
+    async def scenario():
+        await GraphNodes().send_email(state, config)
+        await transport.aclose()
+
+    asyncio.run(scenario())
+    assert transport.sent == 1
+
+
+def test_email_idempotency_key_is_sent_on_every_attempt(make_email, make_resend):
+    keys = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        keys.append(request.headers["Idempotency-Key"])
+        if len(keys) == 1:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"id": "email-4"})
+
+    transport = make_resend(handler)
+
+    asyncio.run(transport.send(make_email(idempotency_key="run-7")))
+
+    assert keys == ["run-7", "run-7"]
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from phantommail.cli.menu import MenuSelection
+from phantommail.cli.runner import EmailRunner
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.graphs.prompts import QUESTION_PROMPT
+from phantommail.llm import FakeChatModel
+from phantommail.llm.response_cache import ResponseCache, ResponseCacheMiss
+from phantommail.models.email import Email
+from phantommail.transports.sinks import NullSink
+
+
+def email(subject: str) -> Email:
+    return Email(subject=subject, body_html="<p>Body</p>")
+
+
+def test_key_normalises_whitespace_but_not_content():
+    key = ResponseCache.make_key(
+        "m", 0.5, Email, [SystemMessage("Be  brief"), HumanMessage("Hi\n there")]
+    )
+
+    assert key == ResponseCache.make_key(
+        "m", 0.5, Email, [SystemMessage("Be brief "), HumanMessage("Hi there")]
+    )
+    assert key != ResponseCache.make_key(
+        "m", 0.7, Email, [SystemMessage("Be brief"), HumanMessage("Hi there")]
+    )
+    assert key != ResponseCache.make_key(
+        "m", 0.5, Email, [HumanMessage("Be brief"), HumanMessage("Hi there")]
+    )
+
+
+def test_answers_persist_across_instances(tmp_path):
+    ResponseCache(tmp_path / "llm.sqlite").put("k", email("Cached"))
+
+    cache = ResponseCache(tmp_path / "llm.sqlite")
+    assert cache.get("k", Email).subject == "Cached"
+    assert cache.get("other", Email) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    cache = ResponseCache(tmp_path / "llm.sqlite", max_entries=2, ttl=-1)
+    cache.put("old", email("old"))
+    assert cache.get("old", Email) is None
+
+    cache = ResponseCache(tmp_path / "lru.sqlite", max_entries=2)
+    cache.put("a", email("a"))
+    cache.put("b", email("b"))
+    cache.get("a", Email)
+    cache.put("c", email("c"))
+    assert len(cache) == 2
+    assert cache.get("b", Email) is None
+    assert cache.get("a", Email).subject == "a"
+
+
+def test_replay_fails_fast_on_a_miss(tmp_path):
+    cache = ResponseCache(tmp_path / "llm.sqlite", replay=True)
+    with pytest.raises(ResponseCacheMiss):
+        cache.get("missing", Email)
+
+
+def test_nodes_reuse_cached_answers(tmp_path):
+    llm = FakeChatModel()
+    cache = ResponseCache(tmp_path / "llm.sqlite")
+    config = {"configurable": {"llm": llm, "llm_cache": cache}}
+    values = {"question": "Where is my truck?"}
+
+    async def generate():
+        return await GraphNodes()._generate_email(
+            QUESTION_PROMPT, values, config, route="question"
+        )
+
+    first = asyncio.run(generate())
+    second = asyncio.run(generate())
+
+    assert first == second
+    assert llm.calls == 1
+    assert cache.stats.hits == 1
+
+
+def test_replay_never_calls_the_model(tmp_path):
+    llm = FakeChatModel()
+    cache = ResponseCache(tmp_path / "llm.sqlite", replay=True)
+    config = {"configurable": {"llm": llm, "llm_cache": cache}}
+
+    with pytest.raises(ResponseCacheMiss):
+        asyncio.run(GraphNodes().generate_question({}, config))
+    assert llm.calls == 0
+
+
+def test_seeded_run_replays_from_the_recorded_answers(tmp_path):
+    selection = MenuSelection("price_request", 4, ["to@example.com"])
+
+    def run(cache):
+        runner = EmailRunner(
+            "sender@example.com",
+            send_rate=None,
+            seed=7,
+            llm_backend="fake",
+            llm_cache=cache,
+            transport=NullSink(),
+        )
+        return asyncio.run(runner.run(selection))
+
+    record = ResponseCache(tmp_path / "llm.sqlite")
+    recorded = run(record)
+    replay = ResponseCache(tmp_path / "llm.sqlite", replay=True)
+    replayed = run(replay)
+
+    assert recorded["success"] == replayed["success"] == 4
+    assert record.stats.stores > 0
+    assert (replay.stats.hits, replay.stats.misses) == (record.stats.stores, 0)
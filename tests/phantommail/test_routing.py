@@ -0,0 +1,173 @@
+import asyncio
+import json
+
+import pytest
+
+from phantommail.graphs.nodes import DeadlineExceeded, GraphNodes
+from phantommail.helpers.rate_limiter import AdaptiveLimiter
+from phantommail.llm import FakeChatModel, ModelRouter, Route, load_routes
+from phantommail.llm.fake import TraceLatency
+from phantommail.llm.routing import HEDGE_MIN_SAMPLES
+
+
+def test_route_lookup_falls_back_to_type_and_default():
+    router = ModelRouter(
+        {
+            "default": Route("big"),
+            "order": Route("small"),
+            "order.attachment": Route("big", 0.2),
+        }
+    )
+
+    assert router.route("order.attachment") == Route("big", 0.2)
+    assert router.route("order") == Route("small")
+    assert router.route("declaration.attachment") == Route("big")
+
+
+def test_clients_are_created_once_per_route():
+    router = ModelRouter(
+        {"default": Route("a"), "question": Route("a"), "order": Route("b")},
+        backend="fake",
+    )
+
+    assert router.client("question") is router.client("default")
+    assert router.client("order") is not router.client("question")
+
+
+def test_load_routes_overrides_defaults(tmp_path):
+    routes = load_routes('{"question": {"model": "tiny", "timeout": 5}}')
+    assert routes["question"] == Route("tiny", 0.5, 5)
+    assert routes["default"].model == "gemini-2.5-pro"
+
+    path = tmp_path / "routes.json"
+    path.write_text(json.dumps({"default": {"model": "other"}}))
+    assert load_routes(str(path))["default"] == Route("other")
+
+
+def test_latency_is_recorded_per_route():
+    router = ModelRouter({"default": Route("m")})
+    for seconds in [1.0, 2.0, 3.0, 4.0]:
+        router.record("question", seconds)
+    router.record("question", 9.0, failed=True)
+
+    stats = router.stats["question"]
+    assert (stats.calls, stats.failures) == (5, 1)
+    assert stats.mean == 2.5
+    assert stats.percentile(0.5) == 3.0
+    assert router.summary() == [
+        "question (m): 5 call(s), 1 failed, mean 2.5s, p50 3.0s, p90 4.0s"
+    ]
+
+
+def test_nodes_record_the_route_of_each_call():
+    router = ModelRouter(backend="fake")
+    config = {"configurable": {"llm_router": router}}
+
+    asyncio.run(GraphNodes().generate_update_order({}, config))
+
+    assert list(router.stats) == ["update_order"]
+    assert isinstance(router.client("update_order"), FakeChatModel)
+
+
+def seeded_router(seconds: float = 0.01) -> ModelRouter:
+    router = ModelRouter({"default": Route("m")}, backend="fake")
+    for _ in range(HEDGE_MIN_SAMPLES):
+        router.record("question", seconds)
+    return router
+
+
+def test_slow_calls_are_hedged_and_the_first_answer_wins():
+    router = seeded_router()
+    delays = iter([5.0, 0.0])
+    cancelled = []
+
+    async def call():
+        try:
+            delay = next(delays)
+            await asyncio.sleep(delay)
+            return delay
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        answer = await router.hedged("question", call)
+        await asyncio.sleep(0)
+        return answer
+
+    assert asyncio.run(scenario()) == 0.0
+    assert cancelled == [True]
+    stats = router.stats["question"]
+    assert (stats.hedged, stats.hedge_wins) == (1, 1)
+
+
+def test_routes_without_enough_latencies_are_not_hedged():
+    router = ModelRouter({"default": Route("m")})
+    router.record("question", 0.01)
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+
+    asyncio.run(router.hedged("question", call))
+    assert len(calls) == 1
+
+
+def test_a_failed_hedge_leaves_the_original_call_running():
+    router = seeded_router()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("hedge failed")
+        await asyncio.sleep(0.05)
+        return "original"
+
+    assert asyncio.run(router.hedged("question", call)) == "original"
+    assert router.stats["question"].hedge_wins == 0
+
+
+def test_nodes_hedge_calls_slower_than_the_route_p90():
+    router = seeded_router()
+    llm = FakeChatModel(latency=TraceLatency([5.0, 0.0]))
+    config = {"configurable": {"llm": llm, "llm_router": router, "hedge_llm": True}}
+
+    result = asyncio.run(GraphNodes().generate_question({}, config))
+    assert result["subject"]
+    assert llm.calls == 2
+
+
+def test_time_queued_for_a_slot_is_neither_latency_nor_a_reason_to_hedge():
+    router = seeded_router(0.1)
+    llm = FakeChatModel(latency=TraceLatency([0.04]))
+    limiter = AdaptiveLimiter(maximum=1)
+    config = {
+        "configurable": {
+            "llm": llm,
+            "llm_router": router,
+            "llm_limiter": limiter,
+            "hedge_llm": True,
+        }
+    }
+
+    async def scenario():
+        nodes = GraphNodes()
+        await asyncio.gather(*(nodes.generate_question({}, config) for _ in range(4)))
+
+    asyncio.run(scenario())
+
+    # The last call queued for three others, longer than the p90 of 0.1s
+    stats = router.stats["question"]
+    assert llm.calls == 4
+    assert stats.hedged == 0
+    assert max(list(stats.samples)[-4:]) < 0.1
+
+
+def test_stages_past_their_deadline_are_cancelled():
+    llm = FakeChatModel(latency=TraceLatency([5.0]))
+    config = {"configurable": {"llm": llm, "deadlines": {"generate": 0.05}}}
+
+    with pytest.raises(DeadlineExceeded, match="generate stage"):
+        asyncio.run(GraphNodes().generate_question({}, config))
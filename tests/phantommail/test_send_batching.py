@@ -0,0 +1,127 @@
+import asyncio
+import itertools
+import json
+
+import httpx
+import pytest
+
+from phantommail.models.email import Attachment, FullEmail
+from phantommail.transports import BatchingTransport, DeliveryError
+
+
+class ResendStandIn:
+    """Answer the Resend email endpoints like the service would."""
+
+    def __init__(self, refuse_batches: bool = False):
+        self.requests: list[tuple[str, object]] = []
+        self.refuse_batches = refuse_batches
+        self._ids = itertools.count(1)
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        self.requests.append((request.url.path, body))
+        if request.url.path == "/emails":
+            return httpx.Response(200, json={"id": f"id-{next(self._ids)}"})
+        if self.refuse_batches:
+            return httpx.Response(422, json={"message": "Batch not allowed"})
+        data, errors = [], []
+        for index, email in enumerate(body):
+            if "@" not in email["to"][0]:
+                errors.append({"index": index, "message": "Invalid `to` field"})
+            else:
+                data.append({"id": f"id-{next(self._ids)}"})
+        return httpx.Response(200, json={"data": data, "errors": errors})
+
+
+@pytest.fixture
+def make_batching(make_resend):
+    """Build a batching transport over a Resend transport answered by ``stand_in``."""
+
+    def make(stand_in: ResendStandIn, **options) -> BatchingTransport:
+        return BatchingTransport(make_resend(stand_in), **options)
+
+    return make
+
+
+def send_all(batching: BatchingTransport, emails: list[FullEmail]) -> list:
+    async def scenario():
+        try:
+            return await asyncio.gather(
+                *(batching.send(email) for email in emails), return_exceptions=True
+            )
+        finally:
+            await batching.aclose()
+
+    return asyncio.run(scenario())
+
+
+def test_concurrent_emails_share_one_request(make_email, make_batching):
+    stand_in = ResendStandIn()
+    batching = make_batching(stand_in, max_wait=0.01)
+
+    ids = send_all(batching, [make_email() for _ in range(5)])
+
+    assert ids == ["id-1", "id-2", "id-3", "id-4", "id-5"]
+    assert [path for path, _ in stand_in.requests] == ["/emails/batch"]
+    assert batching.summary() == "5 email(s) in 1 request(s)"
+
+
+def test_full_batches_go_out_without_waiting(make_email, make_batching):
+    stand_in = ResendStandIn()
+    batching = make_batching(stand_in, max_batch=2, max_wait=60)
+
+    send_all(batching, [make_email() for _ in range(4)])
+
+    assert [len(body) for _, body in stand_in.requests] == [2, 2]
+
+
+def test_item_errors_reach_their_own_email(make_email, make_batching):
+    stand_in = ResendStandIn()
+    batching = make_batching(stand_in, max_wait=0.01)
+
+    results = send_all(
+        batching, [make_email(), make_email(to=["nobody"]), make_email()]
+    )
+
+    assert results[0] == "id-1"
+    assert isinstance(results[1], DeliveryError)
+    assert results[2] == "id-2"
+
+
+def test_attachments_and_refused_batches_are_sent_one_by_one(make_email, make_batching):
+    stand_in = ResendStandIn(refuse_batches=True)
+    batching = make_batching(stand_in, max_wait=0.01)
+    with_attachment = make_email(
+        attachments=[Attachment(filename="order.pdf", content=b"%PDF")]
+    )
+
+    results = send_all(batching, [with_attachment, make_email(), make_email()])
+
+    assert all(result.startswith("id-") for result in results)
+    paths = [path for path, _ in stand_in.requests]
+    assert paths.count("/emails/batch") == 1
+    assert paths.count("/emails") == 3
+
+
+def test_cancelled_callers_are_left_out_of_the_batch(make_email, make_batching):
+    stand_in = ResendStandIn()
+    batching = make_batching(stand_in, max_wait=0.01)
+
+    async def scenario():
+        kept = asyncio.create_task(batching.send(make_email(subject="Kept")))
+        dropped = asyncio.create_task(batching.send(make_email(subject="Dropped")))
+        await asyncio.sleep(0)
+        dropped.cancel()
+        try:
+            return await kept
+        finally:
+            await batching.aclose()
+
+    assert asyncio.run(scenario()) == "id-1"
+    [(_, body)] = stand_in.requests
+    assert [email["subject"] for email in body] == ["Kept"]
+
+
+def test_batch_size_is_bounded_by_the_endpoint(make_batching):
+    with pytest.raises(ValueError):
+        make_batching(ResendStandIn(), max_batch=101)
@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+
+from phantommail.cli.menu import MenuSelection
+from phantommail.cli.runner import EmailRunner
+from phantommail.graphs import nodes
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.helpers.send_ledger import SendLedger
+from phantommail.models.email import FullEmail
+from phantommail.transports import DeliveryError
+
+
+class FlakyTransport:
+    """Keep the emails it is sent, failing those of the given indexes."""
+
+    def __init__(self, failures: dict[int, DeliveryError] | None = None):
+        self.failures = failures or {}
+        self.emails: list[FullEmail] = []
+
+    async def send(self, email: FullEmail) -> str:
+        index = int(email.idempotency_key.rsplit("-", 1)[1])
+        if index in self.failures:
+            raise self.failures[index]
+        self.emails.append(email)
+        return f"id-{index}"
+
+    async def aclose(self) -> None:
+        pass
+
+
+def test_concurrent_sends_share_a_commit(tmp_path):
+    ledger = SendLedger(tmp_path / "ledger.sqlite", batch_size=50)
+    run_id = ledger.start_run({}, ["question"] * 200)
+
+    async def scenario():
+        await asyncio.gather(
+            *(
+                ledger.sent(SendLedger.key(run_id, index), f"id-{index}")
+                for index in range(200)
+            )
+        )
+
+    asyncio.run(scenario())
+
+    # Every send returned once committed, all of them in the same commit
+    assert SendLedger(ledger.path).counts(run_id) == {"sent": 200}
+    assert (ledger.writes, ledger.commits) == (200, 1)
+
+
+def test_generated_emails_are_committed_before_returning(tmp_path, make_email):
+    path = tmp_path / "ledger.sqlite"
+    ledger = SendLedger(path, flush_interval=60)
+    run_id = ledger.start_run({}, ["question", "order"])
+    key = SendLedger.key(run_id, 1)
+
+    asyncio.run(
+        ledger.generated(
+            key,
+            make_email(subject="Order 1", idempotency_key=key),
+            {"order_ref": "TO-1"},
+        )
+    )
+
+    # Another connection sees the email, as a resumed run would
+    [_, entry] = SendLedger(path).entries(run_id)
+    assert (entry.status, entry.stored) == ("generated", True)
+    email, attributes = SendLedger(path).stored(key)
+    assert (email.subject, attributes) == ("Order 1", {"order_ref": "TO-1"})
+
+
+def test_failures_are_dead_lettered_when_permanent_or_repeated(tmp_path):
+    ledger = SendLedger(tmp_path / "ledger.sqlite", max_attempts=2)
+    run_id = ledger.start_run({}, ["question"] * 3)
+    busy = DeliveryError("Rate limited", code=429)
+
+    async def scenario():
+        ledger.failed(SendLedger.key(run_id, 0), DeliveryError("Bad", permanent=True))
+        ledger.failed(SendLedger.key(run_id, 1), busy)
+        ledger.failed(SendLedger.key(run_id, 2), busy)
+        ledger.failed(SendLedger.key(run_id, 2), busy)
+        await ledger.flush()
+
+    asyncio.run(scenario())
+
+    assert [entry.status for entry in ledger.entries(run_id)] == [
+        "dead",
+        "failed",
+        "dead",
+    ]
+    assert ledger.dead_letters(run_id) == [
+        (0, "question", "Bad"),
+        (2, "question", "Rate limited"),
+    ]
+
+
+def test_resumed_run_sends_only_what_is_left_and_unchanged(tmp_path):
+    ledger = SendLedger(tmp_path / "ledger.sqlite")
+    selection = MenuSelection("question", 4, ["to@example.com"])
+    transport = FlakyTransport(
+        {
+            1: DeliveryError("Resend answered 503", code=503),
+            2: DeliveryError("Resend answered 422", code=422, permanent=True),
+        }
+    )
+    runner = EmailRunner(
+        "sender@example.com",
+        send_rate=None,
+        generation_mode="template",
+        transport=transport,
+        ledger=ledger,
+    )
+
+    first = asyncio.run(runner.run(selection))
+
+    assert (first["success"], first["failed"]) == (2, 2)
+    generated = ledger.email(SendLedger.key(runner.run_id, 1))
+
+    resumed = FlakyTransport()
+    runner = EmailRunner(
+        "sender@example.com",
+        send_rate=None,
+        generation_mode="template",
+        transport=resumed,
+        ledger=ledger,
+        resume=runner.run_id,
+    )
+    second = asyncio.run(runner.run(selection))
+
+    assert (second["total"], second["success"]) == (1, 1)
+    [email] = resumed.emails
+    assert email.idempotency_key == SendLedger.key(runner.run_id, 1)
+    assert (email.subject, email.body_html) == (generated.subject, generated.body_html)
+    assert ledger.counts(runner.run_id) == {"sent": 3, "dead": 1}
+
+
+def test_batched_sends_are_refused_with_a_ledger(tmp_path):
+    with pytest.raises(ValueError, match="ledger"):
+        EmailRunner(
+            "sender@example.com",
+            transport=FlakyTransport(),
+            send_batch=10,
+            ledger=SendLedger(tmp_path / "ledger.sqlite"),
+        )
+
+
+def test_resend_errors_are_recorded_as_failures_not_message_ids(tmp_path, monkeypatch):
+    def send(email, raise_errors=False):
+        if raise_errors:
+            raise RuntimeError("Resend is down")
+        return "Error sending email: Resend is down"
+
+    monkeypatch.setattr(nodes, "send", send)
+    ledger = SendLedger(tmp_path / "ledger.sqlite")
+    run_id = ledger.start_run({}, ["question"])
+    key = SendLedger.key(run_id, 0)
+    state = {
+        "idempotency_key": key,
+        "recipients": ["to@example.com"],
+        "email": "<p>Hello</p>",
+        "subject": "Question",
+        "messages": [],
+    }
+    config = {"configurable": {"sender": "sender@example.com", "send_ledger": ledger}}
+
+    async def scenario():
+        with pytest.raises(RuntimeError, match="Resend is down"):
+            await GraphNodes().send_email(state, config)
+        await ledger.flush()
+
+    asyncio.run(scenario())
+
+    [entry] = ledger.entries(run_id)
+    assert entry.status == "failed"
+    assert ledger.email(key).subject == "Question"
@@ -0,0 +1,318 @@
+import asyncio
+import base64
+import email
+import email.policy
+import mailbox
+import socket
+import socketserver
+import threading
+
+import pytest
+
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.models.email import Attachment
+from phantommail.transports import (
+    DeliveryError,
+    EmlSink,
+    MaildirSink,
+    MboxSink,
+    NullSink,
+    SMTPTransport,
+    create_transport,
+)
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """A local SMTP server keeping what it receives."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, pipelining: bool = True):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.pipelining = pipelining
+        self.clients = []
+        self.logins = []
+        self.messages = []
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    @property
+    def connections(self) -> int:
+        return len(self.clients)
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.clients.append(self.request)
+        self.reply("220 stand-in ESMTP")
+        sender, recipients = None, []
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                extensions = ["PIPELINING"] if server.pipelining else []
+                for extension in ["stand-in", *extensions, "AUTH PLAIN"]:
+                    self.reply(f"250-{extension}")
+                self.reply("250 8BITMIME")
+            elif verb == "AUTH":
+                credentials = base64.b64decode(command.split()[2]).split(b"\0")
+                if credentials[2] != b"secret":
+                    self.reply("535 Authentication failed")
+                    continue
+                server.logins.append(credentials[1].decode())
+                self.reply("235 Authenticated")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip("<>"), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = command[8:].strip("<>")
+                if address.startswith("refused"):
+                    self.reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                if not recipients:
+                    self.reply("554 No valid recipients")
+                    continue
+                self.reply("354 Go ahead")
+                data = b""
+                while (chunk := self.rfile.readline()) != b".\r\n":
+                    data += chunk[1:] if chunk.startswith(b".") else chunk
+                with server.lock:
+                    server.messages.append((sender, recipients, data))
+                self.reply("250 Queued")
+            elif verb == "RSET":
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("250 OK")
+
+
+@pytest.fixture(params=[True, False], ids=["pipelining", "plain"])
+def smtp_server(request):
+    server = SMTPStandIn(pipelining=request.param)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_transport(server: SMTPStandIn, **options) -> SMTPTransport:
+    return SMTPTransport(
+        "127.0.0.1",
+        server.port,
+        **{"username": "mailer", "password": "secret", "security": "none", **options},
+    )
+
+
+def test_emails_share_pooled_authenticated_sessions(smtp_server, make_email):
+    transport = make_transport(smtp_server, pool_size=2)
+    emails = [make_email(subject=f"Order {n}") for n in range(10)]
+
+    async def main():
+        ids = await asyncio.gather(*(transport.send(e) for e in emails))
+        await transport.aclose()
+        return ids
+
+    ids = asyncio.run(main())
+
+    assert len(set(ids)) == 10
+    assert len(smtp_server.messages) == 10
+    assert transport.connections <= 2
+    assert smtp_server.logins == ["mailer"] * transport.connections
+    assert transport.pipelined == (10 if smtp_server.pipelining else 0)
+    subjects = {
+        email.message_from_bytes(data)["Subject"] for _, _, data in smtp_server.messages
+    }
+    assert subjects == {f"Order {n}" for n in range(10)}
+
+
+def test_envelope_carries_every_recipient_and_the_body_survives(
+    smtp_server, make_email
+):
+    transport = make_transport(smtp_server)
+    sent = make_email(
+        body_html="<p>Hello</p>\n.\n<p>Bye</p>",
+        cc=["cc@example.com"],
+        bcc=["bcc@example.com"],
+        attachments=[Attachment(filename="order.pdf", content=b"%PDF")],
+    )
+
+    message_id = asyncio.run(transport.send(sent))
+
+    sender, recipients, data = smtp_server.messages[0]
+    assert sender == "sender@example.com"
+    assert recipients == ["to@example.com", "cc@example.com", "bcc@example.com"]
+    message = email.message_from_bytes(data, policy=email.policy.default)
+    assert message["Message-ID"] == message_id
+    assert "Bcc" not in message
+    assert message.get_body().get_content().splitlines()[1] == "."
+    [attachment] = message.iter_attachments()
+    assert attachment.get_filename() == "order.pdf"
+    assert attachment.get_content() == b"%PDF"
+
+
+def test_sessions_are_renewed_after_max_messages(smtp_server, make_email):
+    transport = make_transport(smtp_server, pool_size=1, max_messages=2)
+
+    async def main():
+        for n in range(5):
+            await transport.send(make_email(subject=f"Order {n}"))
+
+    asyncio.run(main())
+
+    assert len(smtp_server.messages) == 5
+    assert transport.connections == smtp_server.connections == 3
+
+
+def test_refused_email_raises_and_keeps_the_session(smtp_server, make_email):
+    transport = make_transport(smtp_server, pool_size=1)
+
+    async def main():
+        with pytest.raises(DeliveryError):
+            await transport.send(make_email(to=["refused@example.com"]))
+        return await transport.send(make_email())
+
+    assert asyncio.run(main())
+    assert len(smtp_server.messages) == 1
+    assert transport.connections == 1
+
+
+def test_partially_refused_recipients_are_counted_and_the_rest_served(
+    smtp_server, make_email
+):
+    transport = make_transport(smtp_server)
+
+    asyncio.run(
+        transport.send(make_email(to=["to@example.com", "refused@example.com"]))
+    )
+
+    [(_, recipients, _)] = smtp_server.messages
+    assert recipients == ["to@example.com"]
+    assert transport.refused == 1
+
+
+def test_failed_login_leaves_nothing_in_the_pool(smtp_server, make_email):
+    transport = make_transport(smtp_server, password="wrong")
+
+    async def main():
+        with pytest.raises(DeliveryError) as error:
+            await transport.send(make_email())
+        await transport.aclose()
+        return error.value
+
+    error = asyncio.run(main())
+
+    assert (error.code, error.permanent) == (535, True)
+    assert transport._idle == []
+    assert smtp_server.messages == []
+
+
+def test_envelope_addresses_drop_display_names(smtp_server, make_email):
+    transport = make_transport(smtp_server)
+
+    asyncio.run(
+        transport.send(
+            make_email(
+                sender='"PhantomMail" <sender@example.com>',
+                to=["Someone <to@example.com>"],
+            )
+        )
+    )
+
+    [(sender, recipients, _)] = smtp_server.messages
+    assert (sender, recipients) == ("sender@example.com", ["to@example.com"])
+
+
+def test_a_session_closed_by_the_server_is_replaced(smtp_server, make_email):
+    transport = make_transport(smtp_server, pool_size=1)
+
+    async def main():
+        await transport.send(make_email())
+        # The server drops the idle connection
+        smtp_server.clients[0].shutdown(socket.SHUT_RDWR)
+        await transport.send(make_email())
+
+    asyncio.run(main())
+
+    assert len(smtp_server.messages) == 2
+    assert transport.connections == 2
+
+
+def test_local_sinks_keep_every_email(tmp_path, make_email):
+    sinks = [
+        MaildirSink(tmp_path / "maildir"),
+        MboxSink(tmp_path / "outbox.mbox"),
+        EmlSink(tmp_path / "eml"),
+    ]
+
+    async def main():
+        for sink in sinks:
+            for n in range(3):
+                await sink.send(make_email(subject=f"Order {n}"))
+            await sink.aclose()
+
+    asyncio.run(main())
+
+    for box in (
+        mailbox.Maildir(tmp_path / "maildir"),
+        mailbox.mbox(tmp_path / "outbox.mbox"),
+    ):
+        assert sorted(message["Subject"] for message in box) == [
+            "Order 0",
+            "Order 1",
+            "Order 2",
+        ]
+    files = sorted((tmp_path / "eml").iterdir())
+    assert [email.message_from_bytes(f.read_bytes())["Subject"] for f in files] == [
+        "Order 0",
+        "Order 1",
+        "Order 2",
+    ]
+    assert all(sink.sent == 3 for sink in sinks)
+
+
+def test_create_transport_selects_the_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("MAIL_SINK_PATH", str(tmp_path / "outbox"))
+    monkeypatch.setenv("SMTP_HOST", "mail.example.com")
+    monkeypatch.setenv("SMTP_POOL_SIZE", "8")
+
+    assert isinstance(create_transport("null"), NullSink)
+    assert isinstance(create_transport("eml"), EmlSink)
+    smtp = create_transport("smtp")
+    assert isinstance(smtp, SMTPTransport)
+    assert (smtp.host, smtp.port, smtp.pool_size) == ("mail.example.com", 587, 8)
+    monkeypatch.setenv("MAIL_TRANSPORT", "maildir")
+    assert isinstance(create_transport(), MaildirSink)
+    with pytest.raises(ValueError, match="Unknown mail transport"):
+        create_transport("pigeon")
+
+
+def test_send_node_delivers_through_a_local_sink(tmp_path):
+    sink = EmlSink(tmp_path)
+    state = {
+        "recipients": ["to@example.com"],
+        "email": "<p>Hello</p>",
+        "subject": "Question",
+        "messages": [],
+    }
+    config = {"configurable": {"sender": "sender@example.com", "mail_transport": sink}}
+
+    asyncio.run(GraphNodes().send_email(state, config))
+
+    [path] = tmp_path.iterdir()
+    assert email.message_from_bytes(path.read_bytes())["Subject"] == "Question"
@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import pytest
+
+from phantommail.graphs import nodes
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.llm import FakeChatModel
+from phantommail.llm.fake import FixedLatency
+from phantommail.llm.streaming import JsonObjectStream, stream_json
+from phantommail.models.email import Email
+
+
+def test_fields_are_reported_once_complete():
+    parser = JsonObjectStream()
+    text = json.dumps({"attachment_html": '<p>a, "b"}</p>', "count": 12, "x": None})
+
+    seen = []
+    for position in range(0, len(text), 5):
+        seen += parser.feed(text[position : position + 5])
+
+    assert seen == [
+        ("attachment_html", '<p>a, "b"}</p>'),
+        ("count", 12),
+        ("x", None),
+    ]
+    assert parser.result() == json.loads(text)
+
+
+def test_numbers_wait_for_their_end():
+    parser = JsonObjectStream()
+    assert parser.feed('{"count": 12') == []
+    assert parser.feed("3}") == [("count", 123)]
+
+
+def test_incomplete_stream_is_an_error():
+    parser = JsonObjectStream()
+    parser.feed('{"subject": "Hi"')
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+def test_fake_model_streams_the_first_field_first():
+    llm = FakeChatModel()
+    messages = ["<attachment_html>PDF</attachment_html> <body_html>Body</body_html>"]
+
+    async def collect():
+        return [
+            text
+            async for text in stream_json(llm, Email, messages, ["attachment_html"])
+        ]
+
+    text = "".join(asyncio.run(collect()))
+    assert text.startswith('{"attachment_html": "PDF"')
+    assert Email.model_validate_json(text).body_html == "Body"
+
+
+def test_attachment_is_rendered_while_the_answer_streams(monkeypatch):
+    events = []
+
+    async def fake_create_pdf(html):
+        events.append("render")
+        return b"%PDF"
+
+    monkeypatch.setattr(nodes, "create_pdf", fake_create_pdf)
+    llm = FakeChatModel(latency=FixedLatency(0.05))
+    llm.stream_chunk_size = 16
+    config = {"configurable": {"llm": llm, "stream_llm": True}}
+
+    async def generate():
+        task = asyncio.create_task(GraphNodes().generate_declaration({}, config))
+        while not task.done():
+            if events == ["render"]:
+                events.append("still streaming")
+            await asyncio.sleep(0)
+        return await task
+
+    result = asyncio.run(generate())
+
+    assert result["attachment_html"] == []
+    assert result["attachments"][0].content == b"%PDF"
+    assert events == ["render", "still streaming"]
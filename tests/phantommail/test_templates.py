@@ -0,0 +1,95 @@
+import asyncio
+from importlib import resources
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from phantommail.fakers.declaration import DeclarationGenerator
+from phantommail.fakers.transport import TransportOrderGenerator
+from phantommail.graphs.nodes import GraphNodes
+from phantommail.graphs.prompts import slot_prompt, slot_schema
+from phantommail.helpers.template_emails import (
+    declaration_email,
+    order_email,
+    text_to_html,
+)
+from phantommail.helpers.templates import SlotTemplate, load_template
+
+TEMPLATES = sorted(
+    path.name
+    for path in resources.files("phantommail.examples").iterdir()
+    if path.name.endswith(".html")
+)
+
+
+def test_render_fills_and_escapes_slots():
+    template = SlotTemplate("<p>{{name|Jane}} from {{company|ACME<br>Ltd}}</p>")
+
+    assert template.slots == {"name", "company"}
+    assert template.example() == "<p>Jane from ACME<br>Ltd</p>"
+    assert (
+        template.render({"company": "Smith & Co\nLondon"})
+        == "<p>Jane from Smith &amp; Co<br>London</p>"
+    )
+
+
+@pytest.mark.parametrize("name", TEMPLATES)
+def test_example_templates_have_slots(name):
+    template = load_template(name)
+
+    assert template.slots
+    assert "{{" not in template.example()
+
+
+@pytest.mark.parametrize("number", range(1, 7))
+def test_order_email_without_llm(number):
+    order = TransportOrderGenerator().generate()
+    email = order_email(order, number)
+
+    assert email.subject.startswith("Transport order ")
+    assert "{{" not in email.body_html
+    assert (email.attachment_html is None) == (number in [1, 6])
+    if email.attachment_html is not None:
+        assert order.loading_date.strftime("%d.%m.%Y") in email.attachment_html
+
+
+@pytest.mark.parametrize("number", [1, 2])
+def test_declaration_email_without_llm(number):
+    declaration = DeclarationGenerator().generate_declaration()
+    email = declaration_email(declaration, number)
+
+    assert declaration.reference_number in email.subject
+    assert str(declaration.total_packages) in email.attachment_html
+
+
+def test_text_to_html():
+    assert text_to_html("Hello,\n\nLine 1\nLine <2>\n") == (
+        "<p>Hello,</p>\n<p>Line 1<br>Line &lt;2&gt;</p>"
+    )
+
+
+@pytest.mark.parametrize("kind,number", [("order", 1), ("order", 2), ("customs", 2)])
+def test_slot_schema_covers_the_template_slots(kind, number):
+    schema = slot_schema(kind, number)
+    system = slot_prompt(kind, number).format_messages(details="x")[0].content
+
+    slots = load_template(f"{kind}_{number}_email.html").slots
+    assert slots <= set(schema.model_fields)
+    assert all(f"- {slot}: " in system for slot in slots)
+    assert "<" not in system.split("with an example value:")[1]
+
+
+class SlotModel:
+    """Answers slot prompts with a fixed MRN."""
+
+    def with_structured_output(self, schema):
+        return RunnableLambda(lambda messages: schema(subject="Docs", mrn="MRN-TEST-1"))
+
+
+def test_slot_mode_renders_llm_values_and_fills_the_rest():
+    config = {"configurable": {"llm": SlotModel(), "generation_mode": "slots"}}
+    result = asyncio.run(GraphNodes().generate_declaration({}, config))
+
+    assert result["subject"] == "Docs"
+    assert "MRN-TEST-1" in result["attachment_html"][0]
+    assert "{{" not in result["email"] + result["attachment_html"][0]
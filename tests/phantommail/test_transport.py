@@ -13,7 +13,7 @@ def generator():
 
 
 def test_generate_client(generator):
-    client = generator.generate_client()
+    client = generator.generate_client(Faker())
     assert isinstance(client, Client)
     assert isinstance(client.name, str)
     assert isinstance(client.sender_name, str)